@@ -0,0 +1,87 @@
+"""
+Micro-benchmarks of NoteAnalyticsService across corpus sizes.
+
+Usage:
+    python -m benchmarks.analytics --sizes 1000 10000 100000 --output bench.jsonl
+    python -m benchmarks.analytics --baseline bench.jsonl --threshold 0.2
+
+Every line of the output is a JSON object describing one (method, corpus size) pair.
+When a baseline is given, the process exits with status 1 if any method got slower than the threshold.
+"""
+import argparse
+import sys
+
+from benchmarks.corpus import CorpusGenerator
+from benchmarks.utils import BenchmarkUtils
+from src.thirdweb.analytic.service import NoteAnalyticsService
+
+METHODS = {
+    "get_total_word_count": {},
+    "get_average_note_length": {},
+    "get_most_common_words": {"min_count": 3},
+    "get_most_common_phrases": {"n": 2, "min_count": 3},
+    "get_longest_notes": {"top_n": 3},
+    "get_shortest_notes": {"top_n": 3},
+}
+
+
+def run(sizes: list[int], repeat: int, seed: int) -> list[dict]:
+    """Benchmark every public analytics method on corpora of the given sizes."""
+    generator = CorpusGenerator(seed=seed)
+    environment = BenchmarkUtils.environment()
+    results = []
+
+    for size in sizes:
+        notes = generator.generate(notes_count=size)
+        words = sum(len(note["content"].split()) for note in notes)
+        service = NoteAnalyticsService(notes=notes)
+
+        for method, kwargs in METHODS.items():
+            call = lambda: getattr(service, method)(**kwargs)  # noqa: E731
+            results.append({
+                "benchmark": "analytics",
+                "method": method,
+                "params": kwargs,
+                "notes": size,
+                "words": words,
+                "repeat": repeat,
+                **BenchmarkUtils.measure_time(call, repeat=repeat),
+                "peak_memory_bytes": BenchmarkUtils.measure_peak_memory(call),
+                **environment,
+            })
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark NoteAnalyticsService.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="File for JSON lines results (stdout by default).")
+    parser.add_argument("--baseline", help="Previous results to compare median timings against.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative slowdown.")
+    args = parser.parse_args()
+
+    results = run(sizes=args.sizes, repeat=args.repeat, seed=args.seed)
+    BenchmarkUtils.write_results(results, output=args.output)
+
+    if args.baseline:
+        regressions = BenchmarkUtils.find_regressions(
+            results=results,
+            baseline=BenchmarkUtils.read_results(args.baseline),
+            key=lambda result: (result["method"], result["notes"]),
+            threshold=args.threshold,
+        )
+        for regression in regressions:
+            print(
+                f"REGRESSION {regression['method']} @ {regression['notes']} notes: "
+                f"{regression['baseline_median_s']:.6f}s -> {regression['median_s']:.6f}s "
+                f"(x{regression['ratio']:.2f})",
+                file=sys.stderr,
+            )
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
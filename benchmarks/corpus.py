@@ -0,0 +1,86 @@
+import string
+
+import numpy as np
+
+from src.config import STOPWORDS
+
+
+class CorpusGenerator:
+    """
+    Generates synthetic note corpora whose word frequencies follow a Zipf distribution,
+    which is close to what real prose looks like: a handful of very frequent words
+    (mostly stopwords) and a long tail of rare ones.
+    """
+
+    STOPWORD_RATIO = 0.4
+    PUNCTUATION_RATIO = 0.08
+    CAPITALIZED_RATIO = 0.05
+
+    def __init__(self, vocabulary_size: int = 20_000, zipf_exponent: float = 1.1, seed: int = 42):
+        self._rng = np.random.default_rng(seed)
+        self.vocabulary = self._build_vocabulary(vocabulary_size)
+        self.stopwords = np.array(sorted(STOPWORDS))
+        self._weights = self._zipf_weights(vocabulary_size, zipf_exponent)
+
+    def generate(self, notes_count: int, mean_words: int = 120, max_words: int = 500) -> list[dict]:
+        """
+        Generate `notes_count` notes shaped like the dicts produced by `ApiHelper._fetch_all_notes`.
+
+        :param notes_count: Number of notes in the corpus.
+        :type notes_count: int
+        :param mean_words: Mean note length in words (lengths are log-normally distributed).
+        :type mean_words: int
+        :param max_words: Upper bound of a note length, mirrors the schema word limit.
+        :type max_words: int
+        :returns: A list of note dictionaries.
+        :rtype: list[dict]
+        """
+        lengths = self._rng.lognormal(mean=np.log(mean_words), sigma=0.6, size=notes_count)
+        lengths = np.clip(lengths.astype(int), 1, max_words)
+        words = self._generate_words(int(lengths.sum()))
+        bounds = np.concatenate(([0], np.cumsum(lengths)))
+        return [
+            {
+                "id": index + 1,
+                "title": f"Note {index + 1}",
+                "content": " ".join(words[bounds[index]:bounds[index + 1]]),
+                "summarization": "",
+                "version_number": 1,
+                "created_at": "2025-03-01T00:00:00",
+                "updated_at": "2025-03-01T00:00:00",
+            }
+            for index in range(notes_count)
+        ]
+
+    def _generate_words(self, words_count: int) -> np.ndarray:
+        """Helper method to draw the words of the whole corpus at once."""
+        is_stopword = self._rng.random(words_count) < self.STOPWORD_RATIO
+        words = np.where(
+            is_stopword,
+            self._rng.choice(self.stopwords, size=words_count),
+            self._rng.choice(self.vocabulary, size=words_count, p=self._weights),
+        ).astype(object)
+
+        capitalized = self._rng.random(words_count) < self.CAPITALIZED_RATIO
+        words[capitalized] = [word.capitalize() for word in words[capitalized]]
+
+        punctuated = self._rng.random(words_count) < self.PUNCTUATION_RATIO
+        words[punctuated] = [
+            word + self._rng.choice([".", ",", "!", "?", ";"])
+            for word in words[punctuated]
+        ]
+        return words
+
+    def _build_vocabulary(self, size: int) -> np.ndarray:
+        """Helper method to create `size` pseudo-words of 3 to 10 lowercase letters."""
+        letters = np.array(list(string.ascii_lowercase))
+        lengths = self._rng.integers(3, 11, size=size)
+        return np.array(
+            ["".join(self._rng.choice(letters, size=length)) for length in lengths]
+        )
+
+    @staticmethod
+    def _zipf_weights(size: int, exponent: float) -> np.ndarray:
+        """Helper method to compute normalized Zipf probabilities for ranks 1..size."""
+        weights = 1.0 / np.arange(1, size + 1) ** exponent
+        return weights / weights.sum()
@@ -0,0 +1,117 @@
+"""
+Scaling of the phrase analytics (NoteAnalyticsService.get_most_common_phrases) with the corpus size,
+next to the tuple-in-a-Counter implementation it replaces.
+
+Usage:
+    python -m benchmarks.phrases --sizes 5000 10000 20000 40000 --output bench.jsonl
+    python -m benchmarks.phrases --max-exponent 1.15
+
+Every line of the output is a JSON object describing one (implementation, n, corpus size) triple,
+followed by one summary line per (implementation, n) with the fitted scaling exponent: the slope of
+log(median time) over log(words), 1.0 for linear scaling. The process exits with status 1 if the
+exponent of the hashed implementation exceeds `--max-exponent`.
+"""
+import argparse
+import string
+import sys
+from collections import Counter
+
+import numpy as np
+
+from benchmarks.corpus import CorpusGenerator
+from benchmarks.utils import BenchmarkUtils
+from src.config import STOPWORDS
+from src.thirdweb.analytic.service import NoteAnalyticsService
+
+
+def _count_tuples(notes: list[dict], n: int, min_count: int) -> dict:
+    """Reference implementation: every phrase is a tuple of strings counted by a Counter."""
+    counter = Counter()
+    for note in notes:
+        run = []
+        for raw in note["content"].split():
+            word = raw.lower().strip(string.punctuation)
+            if not word or word in STOPWORDS:
+                run = []
+                continue
+            run.append(word)
+            if len(run) >= n:
+                counter[tuple(run[-n:])] += 1
+            if raw.endswith((".", "!", "?", ";", ":", ",")):
+                run = []
+    return {" ".join(phrase): count for phrase, count in counter.items() if count > min_count}
+
+
+IMPLEMENTATIONS = {
+    "hashed": lambda notes, n, min_count: NoteAnalyticsService(notes=notes).get_most_common_phrases(
+        n=n, min_count=min_count
+    ),
+    "tuples": _count_tuples,
+}
+
+
+def run(sizes: list[int], ngrams: list[int], repeat: int, seed: int, min_count: int) -> list[dict]:
+    """Time every implementation on corpora of the given sizes and fit its scaling exponent."""
+    generator = CorpusGenerator(seed=seed)
+    environment = BenchmarkUtils.environment()
+    corpora = {size: generator.generate(notes_count=size) for size in sizes}
+    results = []
+
+    for implementation, count in IMPLEMENTATIONS.items():
+        for n in ngrams:
+            points = []
+            for size, notes in corpora.items():
+                words = sum(len(note["content"].split()) for note in notes)
+                call = lambda: count(notes, n, min_count)  # noqa: E731
+                timings = BenchmarkUtils.measure_time(call, repeat=repeat)
+                points.append((words, timings["median_s"]))
+                results.append({
+                    "benchmark": "phrases",
+                    "implementation": implementation,
+                    "n": n,
+                    "notes": size,
+                    "words": words,
+                    "repeat": repeat,
+                    **timings,
+                    "peak_memory_bytes": BenchmarkUtils.measure_peak_memory(call),
+                    **environment,
+                })
+
+            words, seconds = np.log([point[0] for point in points]), np.log([point[1] for point in points])
+            results.append({
+                "benchmark": "phrases",
+                "implementation": implementation,
+                "n": n,
+                "scaling_exponent": float(np.polyfit(words, seconds, deg=1)[0]) if len(points) > 1 else None,
+                **environment,
+            })
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the scaling of the phrase analytics.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5_000, 10_000, 20_000, 40_000])
+    parser.add_argument("--ngrams", type=int, nargs="+", default=[2, 3])
+    parser.add_argument("--min-count", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="File for JSON lines results (stdout by default).")
+    parser.add_argument("--max-exponent", type=float, default=1.15, help="Allowed scaling exponent (1.0 = linear).")
+    args = parser.parse_args()
+
+    results = run(
+        sizes=args.sizes, ngrams=args.ngrams, repeat=args.repeat, seed=args.seed, min_count=args.min_count
+    )
+    BenchmarkUtils.write_results(results, output=args.output)
+
+    superlinear = [
+        result for result in results
+        if result["implementation"] == "hashed" and (result.get("scaling_exponent") or 0) > args.max_exponent
+    ]
+    for result in superlinear:
+        print(f"SUPERLINEAR n={result['n']}: exponent {result['scaling_exponent']:.2f}", file=sys.stderr)
+    return 1 if superlinear else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
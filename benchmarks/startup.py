@@ -0,0 +1,113 @@
+"""
+Cold start of a worker: the time to import the application and to answer its first request, in fresh
+interpreters, with numpy and httpx imported lazily (as the application does) or eagerly (as it used to),
+followed by an import-time report of the application (`python -X importtime`).
+
+Usage:
+    python -m benchmarks.startup --repeat 10 --output bench.jsonl
+    python -m benchmarks.startup --top 30
+
+Needs the settings of the application (.env or environment variables); the first request is answered
+by /metrics, so no database or network access is made.
+Every line of the output is a JSON object: one per mode with the import and time-to-first-request timings,
+then one per module of the report, the slowest (cumulative, including the modules it imports) first.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+from benchmarks.utils import BenchmarkUtils
+
+# runs in a fresh interpreter, prints the seconds to import the application and to answer the first request
+_CHILD = """
+import asyncio, sys, time
+start = time.perf_counter()
+if sys.argv[1] == "eager":
+    import numpy, httpx
+from src.backend.api import app
+imported = time.perf_counter() - start
+
+async def first_request():
+    messages = []
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/metrics", "raw_path": b"/metrics", "query_string": b"", "headers": [], "root_path": "",
+        "client": ("benchmark", 0), "server": ("benchmark", 80),
+    }
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        messages.append(message)
+    await app(scope, receive, send)
+    assert messages[0]["status"] == 200, messages[0]
+
+asyncio.run(first_request())
+print(imported, time.perf_counter() - start)
+"""
+
+MODES = ("lazy", "eager")
+
+
+def _run_child(mode: str) -> tuple[float, float]:
+    result = subprocess.run([sys.executable, "-c", _CHILD, mode], capture_output=True, text=True, check=True)
+    imported, first_request = result.stdout.split()
+    return float(imported), float(first_request)
+
+
+def _import_report(top: int) -> list[dict]:
+    """Parses `python -X importtime` of the application into the `top` slowest modules."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.backend.api"], capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        modules.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_s": int(self_us) / 1e6,
+            "cumulative_s": int(cumulative_us) / 1e6,
+        })
+    return sorted(modules, key=lambda module: module["cumulative_s"], reverse=True)[:top]
+
+
+def run(repeat: int, top: int) -> list[dict]:
+    """Start `repeat` fresh interpreters per mode, alternating the modes so both see the same machine load."""
+    environment = BenchmarkUtils.environment()
+    timings = {mode: [] for mode in MODES}
+    for _ in range(repeat):
+        for mode in MODES:
+            timings[mode].append(_run_child(mode))
+
+    results = []
+    for mode, runs in timings.items():
+        results.append({
+            "benchmark": "startup",
+            "mode": mode,
+            "repeat": repeat,
+            "import_median_s": statistics.median(run[0] for run in runs),
+            "first_request_median_s": statistics.median(run[1] for run in runs),
+            "first_request_min_s": min(run[1] for run in runs),
+            **environment,
+        })
+    for module in _import_report(top):
+        results.append({"benchmark": "startup", "report": "import_time", **module, **environment})
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the cold start of the application.")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--top", type=int, default=20, help="Number of modules in the import-time report.")
+    parser.add_argument("--output", help="File for JSON lines results (stdout by default).")
+    args = parser.parse_args()
+
+    BenchmarkUtils.write_results(run(repeat=args.repeat, top=args.top), output=args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""
+Throughput benchmark of the local extractive summarizer.
+
+Usage:
+    python -m benchmarks.summarizer --notes 5000 --output bench.jsonl
+
+Reports notes per second on a single core, one JSON line per corpus size.
+"""
+import argparse
+import sys
+import time
+
+from benchmarks.corpus import CorpusGenerator
+from benchmarks.utils import BenchmarkUtils
+from src.thirdweb.summarizer.service import ExtractiveSummarizer
+
+
+def run(sizes: list[int], seed: int) -> list[dict]:
+    """Summarize synthetic corpora of the given sizes one note after another."""
+    generator = CorpusGenerator(seed=seed)
+    summarizer = ExtractiveSummarizer()
+    environment = BenchmarkUtils.environment()
+    results = []
+
+    for size in sizes:
+        notes = generator.generate(notes_count=size)
+        start = time.perf_counter()
+        for note in notes:
+            summarizer.summarize_text(note["content"])
+        elapsed = time.perf_counter() - start
+
+        results.append({
+            "benchmark": "extractive_summarizer",
+            "notes": size,
+            "seconds": elapsed,
+            "notes_per_second": size / elapsed,
+            **environment,
+        })
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ExtractiveSummarizer throughput.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 5_000])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="File for JSON lines results (stdout by default).")
+    args = parser.parse_args()
+
+    BenchmarkUtils.write_results(run(sizes=args.sizes, seed=args.seed), output=args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional, TextIO
+
+
+class BenchmarkUtils:
+    @staticmethod
+    def measure_time(func: Callable[[], Any], repeat: int) -> dict:
+        """
+        Run `func` `repeat` times and return wall-clock statistics in seconds.
+
+        :param func: Zero-argument callable to be measured.
+        :type func: Callable[[], Any]
+        :param repeat: How many times the callable is executed.
+        :type repeat: int
+        :returns: A dictionary with min, median, mean and max timings.
+        :rtype: dict
+        """
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+
+        return {
+            "min_s": min(timings),
+            "median_s": statistics.median(timings),
+            "mean_s": statistics.fmean(timings),
+            "max_s": max(timings),
+        }
+
+    @staticmethod
+    def measure_peak_memory(func: Callable[[], Any]) -> int:
+        """
+        Run `func` once under tracemalloc and return the peak of allocated bytes.
+        Kept apart from timing because tracing allocations slows the code down.
+        """
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return peak
+
+    @staticmethod
+    def environment() -> dict:
+        """Describe the interpreter the results were produced on."""
+        import numpy
+
+        return {
+            "python": platform.python_version(),
+            "numpy": numpy.__version__,
+            "machine": platform.machine(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+
+    @staticmethod
+    def write_results(results: list[dict], output: Optional[str] = None) -> None:
+        """Write results as JSON lines to `output`, or to stdout if it is not set."""
+        stream: TextIO = open(output, "w") if output else sys.stdout
+        try:
+            for result in results:
+                stream.write(json.dumps(result) + "\n")
+        finally:
+            if output:
+                stream.close()
+
+    @staticmethod
+    def read_results(path: str) -> list[dict]:
+        """Read JSON lines previously produced by `write_results`."""
+        with open(path) as file:
+            return [json.loads(line) for line in file if line.strip()]
+
+    @staticmethod
+    def find_regressions(
+            results: list[dict],
+            baseline: list[dict],
+            key: Callable[[dict], tuple],
+            threshold: float,
+    ) -> list[dict]:
+        """
+        Compare median timings against a baseline run.
+
+        :param results: Results of the current run.
+        :param baseline: Results of a previous run.
+        :param key: Function identifying the same measurement in both runs.
+        :param threshold: Allowed relative slowdown, e.g. 0.2 for 20%.
+        :returns: One entry per measurement slower than the allowed threshold.
+        :rtype: list[dict]
+        """
+        previous = {key(result): result for result in baseline}
+        regressions = []
+        for result in results:
+            old = previous.get(key(result))
+            if not old or not old["median_s"]:
+                continue
+
+            ratio = result["median_s"] / old["median_s"]
+            if ratio > 1 + threshold:
+                regressions.append({**result, "baseline_median_s": old["median_s"], "ratio": ratio})
+        return regressions
@@ -1,12 +1,46 @@
-from fastapi import FastAPI, Request, HTTPException, APIRouter
+import asyncio
+import hmac
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from typing import Annotated, Optional
+
+from fastapi import FastAPI, Request, HTTPException, APIRouter, Query, Header, Depends
 from fastapi.exceptions import RequestValidationError
 
-from src.backend.utils.enums import ErrorMessages
+from src.config import env_config
+from src.backend.utils.enums import ErrorMessages, SummarizerEngine, Granularity, TimeField, ExportFormat, NoteSortKey
 from src.backend.utils.exceptions import InputLengthFieldError, InputEmptyFieldError
 from src.backend.utils.helper import ApiHelper
-from src.backend.utils.schemas import NotePostSchema, NotePutSchema
-from src.database.session import SessionDepends
-
+from src.backend.utils.metrics import Metrics
+from src.backend.utils.schemas import NotePostSchema, NotePutSchema, NoteFilterSchema, NoteBulkPatchSchema
+from src.database.database.models import NoteModel
+from src.database.session import SessionDepends, engine
+
+
+def get_tenant_id(
+        x_tenant_id: str = Header(
+            default=NoteModel.DEFAULT_TENANT,
+            max_length=64,
+            pattern=r"^[A-Za-z0-9_.-]+$",
+            description="Tenant owning the notes; every note, analytic and rollup is scoped to it.",
+        ),
+        x_gateway_secret: Optional[str] = Header(
+            default=None,
+            description="Secret shared with the gateway, required when 'TENANT_HEADER_SECRET' is configured.",
+        ),
+) -> str:
+    """
+    Tenant of the request, named by the 'X-Tenant-ID' header that the gateway sets (the default tenant if none).
+    The header is trusted as is unless 'TENANT_HEADER_SECRET' is set, in which case the request must also carry
+    that secret in 'X-Gateway-Secret', so a client reaching the API around the gateway cannot pick its tenant.
+    """
+    secret = env_config.TENANT_HEADER_SECRET
+    if secret and not hmac.compare_digest((x_gateway_secret or "").encode(), secret.encode()):
+        raise HTTPException(status_code=401, detail=ErrorMessages.TENANT_UNTRUSTED.value)
+    return x_tenant_id
+
+
+TenantDepends = Annotated[str, Depends(get_tenant_id)]
 
 crud_router = APIRouter(
     tags=["crud"],
@@ -17,49 +51,191 @@ crud_router = APIRouter(
 @crud_router.post(
     path="/post",
     summary="Create a new note",
-    description="<h1>Creates a new note in the database with the provided data.</h1>"
+    description="<h1>Creates a new note in the database with the provided data. "
+                "The 'engine' parameter selects the AI or the local extractive summarization.</h1>"
 )
-async def create_note(data: NotePostSchema, session: SessionDepends):
+async def create_note(
+        data: NotePostSchema,
+        session: SessionDepends,
+        tenant_id: TenantDepends,
+        engine: SummarizerEngine = SummarizerEngine.AI,
+):
     data_dict = dict(data)
     data_dict["version_number"] = 1
-    return await ApiHelper.create_note(data=data_dict, session=session)
+    return await ApiHelper.create_note(data=data_dict, session=session, tenant_id=tenant_id, engine=engine)
 
 
 @crud_router.get(
     path="/get/{id}",
     summary="Get note by ID",
-    description="<h1>Fetches a note from the database based on the provided ID.</h1>"
+    description="<h1>Fetches a note from the database based on the provided ID. The response carries an ETag; "
+                "send it back in 'If-None-Match' to get a 304 while the note is unchanged.</h1>"
 )
-async def get_note_by_id(id: int, session: SessionDepends):
-    return await ApiHelper.get_note_by_id(id=id, session=session)
+async def get_note_by_id(
+        id: int,
+        session: SessionDepends,
+        tenant_id: TenantDepends,
+        if_none_match: Optional[str] = Header(default=None),
+):
+    return await ApiHelper.get_note_by_id(id=id, session=session, tenant_id=tenant_id, if_none_match=if_none_match)
 
 
 @crud_router.get(
     path="/get",
     summary="Get all notes",
-    description="<h1>Fetches all notes stored in the database.</h1>"
+    description="<h1>Fetches all notes stored in the database, optionally only those with a title prefix, "
+                "created or updated within a time range or within a word count range, "
+                "ordered by 'sort' (ascending unless 'descending').</h1>"
 )
-async def get_all_notes(session: SessionDepends):
-    return await ApiHelper.get_all_notes(session=session)
+async def get_all_notes(
+        session: SessionDepends,
+        tenant_id: TenantDepends,
+        title_prefix: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        updated_from: Optional[datetime] = None,
+        updated_to: Optional[datetime] = None,
+        min_words: Optional[int] = Query(default=None, ge=0),
+        max_words: Optional[int] = Query(default=None, ge=0),
+        sort: NoteSortKey = NoteSortKey.ID,
+        descending: bool = False,
+):
+    filters = {
+        "title_prefix": title_prefix,
+        "created_from": created_from,
+        "created_to": created_to,
+        "updated_from": updated_from,
+        "updated_to": updated_to,
+        "min_words": min_words,
+        "max_words": max_words,
+    }
+    filters = {key: value for key, value in filters.items() if value is not None and value != ""}
+    return await ApiHelper.get_all_notes(
+        session=session, tenant_id=tenant_id, filters=filters, sort=sort, descending=descending
+    )
 
 
 @crud_router.put(
     path="/update/{id}",
     summary="Update a note",
-    description="<h1>Updates an existing note in the database based on the provided ID and data.</h1>"
+    description="<h1>Updates an existing note in the database based on the provided ID and data. "
+                "With 'If-Match', the note is only updated if its ETag still matches (412 otherwise).</h1>"
 )
-async def update_note(id: int, data: NotePutSchema, session: SessionDepends):
+async def update_note(
+        id: int,
+        data: NotePutSchema,
+        session: SessionDepends,
+        tenant_id: TenantDepends,
+        engine: SummarizerEngine = SummarizerEngine.AI,
+        if_match: Optional[str] = Header(default=None),
+):
     updated_data = data.model_dump(exclude_unset=True)
-    return await ApiHelper.update_note(id=id, session=session, data=updated_data)
+    return await ApiHelper.update_note(
+        id=id, session=session, tenant_id=tenant_id, data=updated_data, engine=engine, if_match=if_match
+    )
+
+
+@crud_router.get(
+    path="/summarize/{id}/stream",
+    summary="Stream a note summarization",
+    description="<h1>Regenerates the summarization of a note, streams its tokens as server-sent events "
+                "and stores the final text in the note.</h1>"
+)
+async def stream_summarization(id: int, session: SessionDepends, tenant_id: TenantDepends):
+    return await ApiHelper.stream_summarization(id=id, session=session, tenant_id=tenant_id)
+
+
+@crud_router.get(
+    path="/changes",
+    summary="Stream note changes",
+    description="<h1>Streams the creations, updates and deletions of notes as server-sent events carrying the note ID "
+                "and 'version_number'; the event ID is the sequence of the change. A reconnecting client sends its "
+                "last event ID in 'Last-Event-ID' (or 'since') to get the changes it missed first; a 'reset' event "
+                "means they are no longer kept and the notes must be fetched again.</h1>"
+)
+async def stream_changes(
+        tenant_id: TenantDepends,
+        since: Optional[int] = Query(default=None, ge=0),
+        last_event_id: Optional[int] = Header(default=None, ge=0),
+):
+    # the header is what browsers send when they reconnect on their own
+    since = last_event_id if last_event_id is not None else since
+    return await ApiHelper.stream_changes(tenant_id=tenant_id, since=since)
+
+
+@crud_router.get(
+    path="/export",
+    summary="Export notes",
+    description="<h1>Streams all notes, and their versions with 'include_versions', as gzip-compressed NDJSON "
+                "or CSV. Every note is followed by its versions; pass the last exported note ID as "
+                "'since_id' to resume an interrupted export.</h1>"
+)
+async def export_notes(
+        tenant_id: TenantDepends,
+        format: ExportFormat = ExportFormat.NDJSON,
+        include_versions: bool = False,
+        since_id: int = 0,
+):
+    return await ApiHelper.export_notes(
+        tenant_id=tenant_id, format=format, include_versions=include_versions, since_id=since_id
+    )
+
+
+@crud_router.post(
+    path="/import",
+    summary="Import notes",
+    description="<h1>Imports notes from a streamed NDJSON body (plain or gzip-compressed, e.g. an export), "
+                "validated like /post and inserted in chunks. Invalid or duplicate lines are skipped "
+                "and reported.</h1>"
+)
+async def import_notes(request: Request, session: SessionDepends, tenant_id: TenantDepends):
+    return await ApiHelper.import_notes(request=request, session=session, tenant_id=tenant_id)
 
 
 @crud_router.delete(
     path="/delete/{id}",
     summary="Delete a note",
-    description="<h1>Deletes a note from the database based on the provided ID.</h1>"
+    description="<h1>Deletes a note from the database based on the provided ID. "
+                "With 'If-Match', the note is only deleted if its ETag still matches (412 otherwise).</h1>"
+)
+async def delete_note(
+        id: int,
+        session: SessionDepends,
+        tenant_id: TenantDepends,
+        if_match: Optional[str] = Header(default=None),
+):
+    return await ApiHelper.delete_note(id=id, session=session, tenant_id=tenant_id, if_match=if_match)
+
+
+@crud_router.patch(
+    path="/bulk",
+    summary="Update many notes",
+    description="<h1>Sets the content of every note matching the filter (IDs, title substring, creation or "
+                "update time range) with one statement per table, and returns their IDs. "
+                "The content is summarized once for all the notes.</h1>"
 )
-async def delete_note(id: int, session: SessionDepends):
-    return await ApiHelper.delete_note(id=id, session=session)
+async def bulk_update_notes(
+        data: NoteBulkPatchSchema,
+        session: SessionDepends,
+        tenant_id: TenantDepends,
+        engine: SummarizerEngine = SummarizerEngine.AI,
+):
+    filters = data.filter.model_dump(exclude_none=True)
+    return await ApiHelper.bulk_update_notes(
+        filters=filters, content=data.content, session=session, tenant_id=tenant_id, engine=engine
+    )
+
+
+@crud_router.delete(
+    path="/bulk",
+    summary="Delete many notes",
+    description="<h1>Deletes every note matching the filter (IDs, title substring, creation or update time range) "
+                "and their versions with one statement per table, and returns their IDs.</h1>"
+)
+async def bulk_delete_notes(data: NoteFilterSchema, session: SessionDepends, tenant_id: TenantDepends):
+    return await ApiHelper.bulk_delete_notes(
+        filters=data.model_dump(exclude_none=True), session=session, tenant_id=tenant_id
+    )
 
 
 analytics_router = APIRouter(
@@ -71,28 +247,114 @@ analytics_router = APIRouter(
 @analytics_router.get(
     path="/total_words",
     summary="Get total words",
-    description="<h1>Get total words from all notes in database</h1>"
+    description="<h1>Get total words from all notes in database. With 'from' and/or 'to', get the words "
+                "written in notes created (or updated, see 'field') within that range of days instead.</h1>"
 )
-async def total_words(session: SessionDepends):
-    return await ApiHelper.get_total_word_count(session=session)
+async def total_words(
+        request: Request,
+        session: SessionDepends,
+        tenant_id: TenantDepends,
+        date_from: Optional[date] = Query(default=None, alias="from"),
+        date_to: Optional[date] = Query(default=None, alias="to"),
+        field: TimeField = TimeField.CREATED_AT,
+):
+    return await ApiHelper.get_total_word_count(
+        session=session, tenant_id=tenant_id, request=request, date_from=date_from, date_to=date_to, field=field
+    )
 
 
 @analytics_router.get(
     path="/length",
     summary="Get average length",
-    description="<h1>Get average note length from all notes in database</h1>"
+    description="<h1>Get average note length from all notes in database. With 'from' and/or 'to', get the "
+                "average length of notes created (or updated, see 'field') within that range of days instead.</h1>"
 )
-async def length(session: SessionDepends):
-    return await ApiHelper.get_average_note_length(session=session)
+async def length(
+        request: Request,
+        session: SessionDepends,
+        tenant_id: TenantDepends,
+        date_from: Optional[date] = Query(default=None, alias="from"),
+        date_to: Optional[date] = Query(default=None, alias="to"),
+        field: TimeField = TimeField.CREATED_AT,
+):
+    return await ApiHelper.get_average_note_length(
+        session=session, tenant_id=tenant_id, request=request, date_from=date_from, date_to=date_to, field=field
+    )
+
+
+@analytics_router.get(
+    path="/timeline",
+    summary="Get note activity over time",
+    description="<h1>Get notes created, updated and deleted and words written per day, week or month</h1>"
+)
+async def timeline(
+        session: SessionDepends,
+        tenant_id: TenantDepends,
+        date_from: Optional[date] = Query(default=None, alias="from"),
+        date_to: Optional[date] = Query(default=None, alias="to"),
+        granularity: Granularity = Granularity.DAY,
+):
+    return await ApiHelper.get_timeline(
+        session=session, tenant_id=tenant_id, date_from=date_from, date_to=date_to, granularity=granularity
+    )
+
+
+@analytics_router.get(
+    path="/keywords/{id}",
+    summary="Get note keywords",
+    description="<h1>Get the top TF-IDF keywords of a note, computed when the note was written</h1>"
+)
+async def keywords(id: int, session: SessionDepends, tenant_id: TenantDepends):
+    return await ApiHelper.get_note_keywords(id=id, session=session, tenant_id=tenant_id)
 
 
 @analytics_router.get(
     path="/common_words",
     summary="Get most common words",
-    description="<h1>Get most common words from all notes in database</h1>"
+    description="<h1>Get most common words from all notes in database. With 'approx', estimated counts are read "
+                "from sketches maintained on write, in constant time and memory whatever the number of notes "
+                "(counts may be overestimated by 0.13% of all words written, see the README).</h1>"
+)
+async def common_words(
+        request: Request,
+        session: SessionDepends,
+        tenant_id: TenantDepends,
+        min_count: int = 3,
+        approx: bool = False,
+):
+    return await ApiHelper.get_most_common_words(
+        session=session, tenant_id=tenant_id, min_count=min_count, request=request, approx=approx
+    )
+
+
+@analytics_router.get(
+    path="/common_phrases",
+    summary="Get most common phrases",
+    description="<h1>Get the most common phrases of 'n' words (bigrams or trigrams) from all notes in database. "
+                "Phrases never span a stopword, a punctuation mark ending a sentence or clause, "
+                "or two notes.</h1>"
+)
+async def common_phrases(
+        request: Request,
+        session: SessionDepends,
+        tenant_id: TenantDepends,
+        n: int = Query(default=2, ge=2, le=3),
+        min_count: int = 3,
+):
+    return await ApiHelper.get_most_common_phrases(
+        session=session, tenant_id=tenant_id, n=n, min_count=min_count, request=request
+    )
+
+
+@analytics_router.get(
+    path="/vocabulary_size",
+    summary="Get the vocabulary size",
+    description="<h1>Get the number of distinct words of all notes in database. With 'approx', it is estimated "
+                "from a HyperLogLog sketch maintained on write (1.6% standard error), in constant time "
+                "and memory.</h1>"
 )
-async def common_words(session: SessionDepends, min_count: int = 3):
-    return await ApiHelper.get_most_common_words(session=session, min_count=min_count)
+async def vocabulary_size(request: Request, session: SessionDepends, tenant_id: TenantDepends, approx: bool = False):
+    return await ApiHelper.get_vocabulary_size(session=session, tenant_id=tenant_id, request=request, approx=approx)
 
 
 @analytics_router.get(
@@ -100,8 +362,8 @@ async def common_words(session: SessionDepends, min_count: int = 3):
     summary="Get the longest notes",
     description="<h1>Get the longest notes from all notes in database</h1>"
 )
-async def longest(session: SessionDepends, top_n: int = 3):
-    return await ApiHelper.get_longest_notes(session=session, top_n=top_n)
+async def longest(request: Request, session: SessionDepends, tenant_id: TenantDepends, top_n: int = 3):
+    return await ApiHelper.get_longest_notes(session=session, tenant_id=tenant_id, top_n=top_n, request=request)
 
 
 @analytics_router.get(
@@ -109,11 +371,42 @@ async def longest(session: SessionDepends, top_n: int = 3):
     summary="Get the shortest notes",
     description="<h1>Get the shortest notes from all notes in database</h1>"
 )
-async def shortest(session: SessionDepends, top_n: int = 3):
-    return await ApiHelper.get_shortest_notes(session=session, top_n=top_n)
+async def shortest(request: Request, session: SessionDepends, tenant_id: TenantDepends, top_n: int = 3):
+    return await ApiHelper.get_shortest_notes(session=session, tenant_id=tenant_id, top_n=top_n, request=request)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # the server accepts connections right away, /ready answers 503 until the warm-up is done
+    tasks = [asyncio.create_task(ApiHelper.warm_up(
+        engine=engine,
+        connections=env_config.WARM_UP_DB_CONNECTIONS,
+        retry_interval=env_config.WARM_UP_RETRY_INTERVAL,
+    ))]
+    if env_config.KEYWORDS_REFRESH_INTERVAL > 0:
+        tasks.append(asyncio.create_task(
+            ApiHelper.refresh_keywords_periodically(interval=env_config.KEYWORDS_REFRESH_INTERVAL)
+        ))
+    if env_config.WORD_SKETCH_REFRESH_INTERVAL > 0:
+        tasks.append(asyncio.create_task(
+            ApiHelper.refresh_word_sketches_periodically(interval=env_config.WORD_SKETCH_REFRESH_INTERVAL)
+        ))
+    if env_config.DERIVED_STATS_COMPACT_INTERVAL > 0:
+        tasks.append(asyncio.create_task(
+            ApiHelper.compact_derived_stats_periodically(interval=env_config.DERIVED_STATS_COMPACT_INTERVAL)
+        ))
+    if env_config.VERSION_PARTITIONS_CHECK_INTERVAL > 0:
+        tasks.append(asyncio.create_task(
+            ApiHelper.create_version_partitions_periodically(interval=env_config.VERSION_PARTITIONS_CHECK_INTERVAL)
+        ))
+    yield
+    for task in tasks:
+        task.cancel()
+    await ApiHelper.shutdown()
 
 
 app = FastAPI(
+    lifespan=lifespan,
     title="AI-powered Notes Management",
     description="Welcome to NoteGenius's API documentation! "
                 "Here you will able to discover all of the ways you can interact with the NoteGenius API.",
@@ -125,6 +418,27 @@ app.include_router(crud_router)
 app.include_router(analytics_router)
 
 
+@app.get(
+    path="/metrics",
+    tags=["metrics"],
+    summary="Get application metrics",
+    description="<h1>Get in-process counters, gauges and observations of this worker</h1>"
+)
+async def metrics():
+    return Metrics.snapshot()
+
+
+@app.get(
+    path="/ready",
+    tags=["metrics"],
+    summary="Readiness probe",
+    description="<h1>Answers 200 once the worker has warmed up (database connections, HTTP client, "
+                "lazily imported modules) and 503 before, with the seconds every lazy import took</h1>"
+)
+async def ready():
+    return ApiHelper.get_readiness()
+
+
 @app.exception_handler(InputEmptyFieldError)
 async def validation_exception_handler(request: Request, exc: InputEmptyFieldError):
     raise HTTPException(status_code=400, detail=str(exc))
@@ -138,7 +452,3 @@ async def input_data_length_exception_handler(request: Request, exc: InputLength
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     raise HTTPException(status_code=400, detail=ErrorMessages.NOT_CONFORM_SCHEMA.value)
-
-
-
-
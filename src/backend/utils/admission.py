@@ -0,0 +1,97 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from src.backend.utils.exceptions import OverloadedError
+from src.backend.utils.metrics import Metrics
+
+
+class AdmissionController:
+    """
+    Admission control of the requests bound to the summarization model: at most `max_concurrent` of them
+    are served at once, at most `max_queue` more wait for a slot, in arrival order, for at most `queue_timeout`
+    seconds. A request finding the queue full is shed right away, one waiting too long is shed as well;
+    both raise OverloadedError with the delay after which the client should retry. A spike then costs
+    the excess requests a fast 503 instead of costing everyone unbounded latency and memory.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            max_concurrent: int = 16,
+            max_queue: int = 64,
+            queue_timeout: float = 10.0,
+            retry_after: float = 5.0,
+    ):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.waiting = 0
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """Holds a slot for the body of the `async with`, raises OverloadedError when the request is shed."""
+        await self._acquire()
+        try:
+            yield
+        finally:
+            await self._release()
+
+    def check(self) -> None:
+        """Sheds a request right away if the queue is full, before a response starts streaming."""
+        if self.in_flight >= self.max_concurrent and self.waiting >= self.max_queue:
+            self._shed(reason="queue_full")
+
+    async def _acquire(self) -> None:
+        async with self._condition:
+            # newcomers only take a free slot directly when nobody is waiting for one
+            if self.in_flight < self.max_concurrent and not self.waiting:
+                self._admit()
+                return
+            if self.waiting >= self.max_queue:
+                self._shed(reason="queue_full")
+
+            self.waiting += 1
+            self._record()
+            start = time.monotonic()
+            try:
+                await asyncio.wait_for(
+                    self._condition.wait_for(lambda: self.in_flight < self.max_concurrent),
+                    timeout=self.queue_timeout,
+                )
+            except asyncio.TimeoutError:
+                # a slot freed as the timeout hit was notified to this waiter, it takes the slot instead
+                if self.in_flight >= self.max_concurrent:
+                    self._shed(reason="timeout")
+            finally:
+                self.waiting -= 1
+                self._record()
+            Metrics.observe(f"{self.name}_admission_wait_seconds", time.monotonic() - start)
+            self._admit()
+
+    async def _release(self) -> None:
+        async with self._condition:
+            self.in_flight -= 1
+            self._record()
+            # every waiter checks for the slot: a single notified waiter could be cancelled before taking it,
+            # and the slot would stay free while the others wait until their timeout
+            self._condition.notify_all()
+
+    def _admit(self) -> None:
+        self.in_flight += 1
+        Metrics.increment(f"{self.name}_admission", label="admitted")
+        self._record()
+
+    def _shed(self, reason: str) -> None:
+        Metrics.increment(f"{self.name}_admission", label=f"shed_{reason}")
+        raise OverloadedError(f"Too many {self.name} requests ({reason}).", retry_after=self.retry_after)
+
+    def _record(self) -> None:
+        """Helper method to export the queue depth and the requests in flight."""
+        Metrics.set_gauge(f"{self.name}_admission_queue_depth", self.waiting)
+        Metrics.set_gauge(f"{self.name}_admission_in_flight", self.in_flight)
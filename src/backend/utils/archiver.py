@@ -0,0 +1,45 @@
+"""
+Moves the old note versions out of the database into compressed files, see NoteVersionArchiveQuery.archive.
+Archived versions stay readable through the version lookups as long as the files do.
+
+Usage (admin CLI, e.g. monthly from cron):
+    python -m src.backend.utils.archiver
+    python -m src.backend.utils.archiver --months 6 --directory /mnt/cold/note_versions
+    python -m src.backend.utils.archiver --before 2025-01-01
+"""
+import argparse
+import asyncio
+import json
+from datetime import datetime
+from pathlib import Path
+
+from src.config import env_config
+from src.database.database.partitions import NoteVersionPartitions
+from src.database.database.queries import NoteVersionArchiveQuery
+from src.database.session import async_session
+
+
+async def _main(before: datetime, directory: Path) -> list[dict]:
+    async with async_session() as session:
+        return await NoteVersionArchiveQuery(session).archive(before=before, directory=directory)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive the old note versions to gzip-compressed NDJSON files.")
+    parser.add_argument(
+        "--months",
+        type=int,
+        default=env_config.VERSION_ARCHIVE_AFTER_MONTHS,
+        help="Archive the versions created this many months before the current one.",
+    )
+    parser.add_argument(
+        "--before",
+        type=datetime.fromisoformat,
+        help="Archive the versions created before the month of this date instead.",
+    )
+    parser.add_argument("--directory", type=Path, default=env_config.VERSION_ARCHIVE_DIR)
+    args = parser.parse_args()
+
+    current = NoteVersionPartitions.month_start(datetime.now())
+    before = args.before or NoteVersionPartitions.add_months(current, -args.months)
+    print(json.dumps(asyncio.run(_main(before, directory=args.directory)), default=str))
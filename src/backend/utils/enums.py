@@ -1,12 +1,44 @@
 from enum import StrEnum
 
+from src.config import env_config
+
+
+class SummarizerEngine(StrEnum):
+    AI = "ai"
+    EXTRACTIVE = "extractive"
+
+
+class Granularity(StrEnum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+class TimeField(StrEnum):
+    CREATED_AT = "created_at"
+    UPDATED_AT = "updated_at"
+
+
+class NoteSortKey(StrEnum):
+    ID = "id"
+    TITLE = "title"
+    CREATED_AT = "created_at"
+    UPDATED_AT = "updated_at"
+    WORD_COUNT = "word_count"
+
+
+class ExportFormat(StrEnum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
 
 class ErrorMessages(StrEnum):
     TITLE_EMPTY = "Field 'title' cannot be empty. Please provide a valid value for this field."
     CONTENT_EMPTY = "Field 'content' cannot be empty. Please provide a valid value for this field."
     TITLE_TOO_LONG = "Field 'title' exceeds the allowed word limit (100)."
-    CONTENT_TOO_LONG = "Field 'content' exceeds the allowed word limit (500)."
+    CONTENT_TOO_LONG = f"Field 'content' exceeds the allowed word limit ({env_config.NOTE_CONTENT_MAX_WORDS})."
     FIELDS_BOTH_EMPTY = "Fields 'title' & 'content' cannot be empty."
+    FILTER_EMPTY = "The filter must select notes by at least one criterion."
     NOT_CONFORM_SCHEMA = ("Invalid data format. The provided input does not conform to the expected schema."
                           " Please ensure all fields are correctly structured and follow the specified format."),
 
@@ -14,4 +46,12 @@ class ErrorMessages(StrEnum):
     DATABASE_CRASHED = "Oops... We ran into an unexpected problem. Please try again later."
     NOT_FOUND_SINGLE = "Note not found. The provided ID may be incorrect, or no data is available."
     NOT_FOUND_MULTI = ("Notes not found. There may be no data available. "
-                       "Please try adding some notes first before interacting.")
\ No newline at end of file
+                       "Please try adding some notes first before interacting.")
+    PRECONDITION_FAILED = "The note was modified since the version you have. Please fetch it again and retry."
+    CONFLICT = "The note kept being modified by other requests while it was updated. Please try again."
+    SUMMARIZATION_CONFLICT = "The note was modified while it was summarized, the summarization was not stored."
+    SUMMARIZATION_FAILED = "The summarization could not be generated. Please try again later."
+    OVERLOADED = "Too many notes are being summarized right now. Please retry after the 'Retry-After' delay."
+    TENANT_UNTRUSTED = "The tenant header was not set by a trusted gateway."
+    IMPORT_INVALID_JSON = "The line is not valid JSON."
+    IMPORT_LINE_TOO_LONG = "The line exceeds the allowed size."
\ No newline at end of file
@@ -1,3 +1,4 @@
+import math
 from functools import wraps
 
 from fastapi import HTTPException
@@ -44,6 +45,22 @@ class DuplicateDataError(DatabaseError):
     pass
 
 
+class PreconditionFailedError(DatabaseError):
+    """
+    Exception raised when a note changed since the version the client based its request on,
+    either an If-Match header that no longer matches or a concurrent write, typically used for 412 errors.
+    """
+    pass
+
+
+class ConflictError(DatabaseError):
+    """
+    Exception raised when a write kept losing to concurrent writes of the same note, although the client
+    did not ask for a specific version, typically used for 409 errors.
+    """
+    pass
+
+
 class InputFieldError(NoteGeniusError):
     """
     Base class for exceptions related to invalid input fields.
@@ -68,6 +85,24 @@ class InputEmptyFieldError(InputFieldError):
     pass
 
 
+class AnalyticsCancelledError(NoteGeniusError):
+    """
+    Exception raised when an analytics computation is abandoned before it finished,
+    typically because the client disconnected while waiting for it.
+    """
+    pass
+
+
+class OverloadedError(NoteGeniusError):
+    """
+    Exception raised when a request is shed by admission control, typically used for 503 errors.
+    `retry_after` is the delay in seconds after which the client should try again.
+    """
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
 def handle_exceptions(func):
     @wraps(func)
     async def wrapper(*args, **kwargs):
@@ -83,6 +118,27 @@ def handle_exceptions(func):
                 status_code=400,
                 detail=ErrorMessages.DUPLICATE_DATA.value,
             )
+        except PreconditionFailedError:
+            raise HTTPException(
+                status_code=412,
+                detail=ErrorMessages.PRECONDITION_FAILED.value,
+            )
+        except ConflictError:
+            raise HTTPException(
+                status_code=409,
+                detail=ErrorMessages.CONFLICT.value,
+            )
+        except OverloadedError as e:
+            raise HTTPException(
+                status_code=503,
+                detail=ErrorMessages.OVERLOADED.value,
+                headers={"Retry-After": str(math.ceil(e.retry_after))},
+            )
+        except AnalyticsCancelledError as e:
+            raise HTTPException(
+                status_code=499,
+                detail=str(e),
+            )
         except DatabaseError:
             raise HTTPException(
                 status_code=500,
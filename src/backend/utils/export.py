@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Optional
+
+from src.backend.utils.enums import ExportFormat
+
+
+class ExportEncoder:
+    """
+    Turns exported rows into gzip-compressed NDJSON or CSV, one chunk at a time.
+    Only the compressor state is kept between chunks, so memory does not grow with the number of rows.
+    """
+
+    COLUMNS = (
+        "type", "id", "note_id", "title", "content", "summarization", "version_number", "created_at", "updated_at",
+        "word_count", "tenant_id",
+    )
+
+    def __init__(self, format: ExportFormat = ExportFormat.NDJSON):
+        self.format = format
+        self._compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)  # gzip container
+        self._header_written = False
+
+    def encode(self, rows: list[dict]) -> bytes:
+        """
+        Serialize and compress a chunk of rows.
+
+        :param rows: Rows holding some of the `COLUMNS`, datetimes are written in ISO 8601.
+        :type rows: list[dict]
+        :returns: The compressed bytes ready so far, possibly empty.
+        :rtype: bytes
+        """
+        if self.format == ExportFormat.CSV:
+            text = self._to_csv(rows)
+        else:
+            text = "".join(json.dumps(row, default=self._default) + "\n" for row in rows)
+        return self._compressor.compress(text.encode())
+
+    def finish(self) -> bytes:
+        """Returns the remaining compressed bytes and the gzip trailer."""
+        if self.format == ExportFormat.CSV and not self._header_written:
+            return self._compressor.compress(self._to_csv([]).encode()) + self._compressor.flush()
+        return self._compressor.flush()
+
+    def _to_csv(self, rows: list[dict]) -> str:
+        """Helper method to write rows as CSV, with the header before the first chunk."""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.COLUMNS)
+        if not self._header_written:
+            writer.writeheader()
+            self._header_written = True
+        writer.writerows({key: self._default(value) for key, value in row.items()} for row in rows)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _default(value: Optional[object]) -> Optional[object]:
+        """Helper method to serialize values JSON and CSV do not handle natively."""
+        return value.isoformat() if isinstance(value, datetime) else value
@@ -1,39 +1,112 @@
 import asyncio
-from typing import Optional, Any, Type
+import hashlib
+import json
+import time
+from collections import defaultdict
+from datetime import date
+from typing import Optional, Any, Type, AsyncIterator, Awaitable, Callable
 
+from fastapi import Request
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy.ext.asyncio import AsyncSession
-from starlette.responses import JSONResponse, Response
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from starlette.responses import JSONResponse, Response, StreamingResponse
 
 from src.config import env_config
-from src.backend.utils.enums import ErrorMessages
-from src.backend.utils.exceptions import NotFoundError, handle_exceptions
+from src.backend.utils.admission import AdmissionController
+from src.backend.utils.enums import (
+    ErrorMessages,
+    SummarizerEngine,
+    Granularity,
+    TimeField,
+    ExportFormat,
+    NoteSortKey,
+)
+from src.backend.utils.exceptions import (
+    ConflictError,
+    DatabaseError,
+    NotFoundError,
+    OverloadedError,
+    PreconditionFailedError,
+    handle_exceptions,
+)
+from src.backend.utils.export import ExportEncoder
+from src.backend.utils.importer import NoteImporter
+from src.backend.utils.lazy import LazyModule
+from src.backend.utils.metrics import Metrics
+from src.backend.utils.singleflight import SingleFlight
 from src.backend.utils.schemas import (
     NoteGetSchemaResponse,
     NotePostSchemaResponse,
     AVGNoteLengthSchemaResponse,
-    WordCountSchemaResponse
+    WordCountSchemaResponse,
+    VocabularySizeSchemaResponse,
+    TimelineBucketSchemaResponse,
+    NoteKeywordsSchemaResponse,
+    ImportReportSchemaResponse,
+    NoteBulkSchemaResponse,
+    ReadinessSchemaResponse,
 )
 from src.database.database.models import Base
-from src.database.database.queries import NoteQuery
-from src.thirdweb.analytic.service import NoteAnalyticsService
+from src.database.database.queries import (
+    NoteChangeQuery,
+    NoteQuery,
+    NoteStatsQuery,
+    NoteKeywordQuery,
+    NoteVersionArchiveQuery,
+    WordSketchQuery,
+)
+from src.database.cache import corpus_generations, note_cache
+from src.database.feed import ChangeSubscription, change_feed
+from src.database.session import async_session
+from src.thirdweb.analytic.executor import AnalyticsExecutor
+from src.thirdweb.analytic.service import NoteTimelineService
+from src.thirdweb.openai.scheduler import Priority, SummarizationScheduler
 from src.thirdweb.openai.service import OpenAIService
-from src.thirdweb.openai.utils import PromptUtils
+from src.thirdweb.openai.summarizer import OpenAISummarizer
+from src.thirdweb.openai.utils import PromptUtils, ContentUtils
+from src.thirdweb.summarizer.service import BaseSummarizer, ExtractiveSummarizer, FallbackSummarizer
 
 
 class ApiHelper:
+    # shared by every request, the quotas belong to the API key
+    _scheduler = SummarizationScheduler(
+        requests_per_minute=env_config.OPENAI_REQUESTS_PER_MINUTE,
+        tokens_per_minute=env_config.OPENAI_TOKENS_PER_MINUTE,
+    )
+    _analytics_executor = AnalyticsExecutor(
+        max_workers=env_config.ANALYTICS_PROCESS_WORKERS,
+        max_concurrent_jobs=env_config.ANALYTICS_MAX_CONCURRENT_JOBS,
+        min_notes=env_config.ANALYTICS_OFFLOAD_MIN_NOTES,
+    )
+    # bounds the requests waiting on the model, the excess is shed with 503 instead of queueing without limit
+    _admission = AdmissionController(
+        name="summarization",
+        max_concurrent=env_config.SUMMARY_ADMISSION_MAX_CONCURRENT,
+        max_queue=env_config.SUMMARY_ADMISSION_MAX_QUEUE,
+        queue_timeout=env_config.SUMMARY_ADMISSION_QUEUE_TIMEOUT,
+        retry_after=env_config.SUMMARY_ADMISSION_RETRY_AFTER,
+    )
+    # concurrent identical analytics requests and summarizations share one computation, one model call
+    _analytics_flights = SingleFlight(name="analytics")
+    _summarization_flights = SingleFlight(name="summarization")
+    # flipped by `warm_up`, the readiness probe keeps the worker out of rotation until then
+    _ready = False
+    _warm_up_seconds: Optional[float] = None
+
     @staticmethod
     @handle_exceptions
-    async def create_note(data: dict, session: AsyncSession) -> JSONResponse:
-        """Creates a new note with AI-generated summarization."""
-        ai_service = OpenAIService(
-            model=env_config.OPENAI_MODEL,
-            api_key=env_config.OPENAI_API_KEY,
-        )
-        prompt = PromptUtils.create_prompt_for_summarization(text=data.get("content"))
-        data["summarization"] = await asyncio.create_task(ai_service.fetch_data(prompt))
+    async def create_note(
+            data: dict,
+            session: AsyncSession,
+            tenant_id: str,
+            engine: SummarizerEngine = SummarizerEngine.AI,
+    ) -> JSONResponse:
+        """Creates a new note of the tenant with AI-generated summarization."""
+        data["summarization"] = await ApiHelper._summarize(content=data.get("content"), engine=engine)
 
-        repo = NoteQuery(session=session)
+        repo = NoteQuery(session=session, tenant_id=tenant_id)
         id = await repo.create(data=data)
         validated_data = NotePostSchemaResponse.model_validate(
             {"note_id": id}
@@ -41,59 +114,228 @@ class ApiHelper:
         return ApiHelper._success_response(status_code=201, content=validated_data)
 
     @staticmethod
-    async def get_note_by_id(id: int, session: AsyncSession) -> JSONResponse:
-        """Retrieves a note by its ID."""
-        note = await ApiHelper._fetch_note_by_id(id, session)
-        validated_note = NoteGetSchemaResponse.model_validate(
-            jsonable_encoder(note)
-        ).model_dump()
-        return ApiHelper._success_response(status_code=200, content=validated_note)
+    @handle_exceptions
+    async def get_note_by_id(
+            id: int,
+            session: AsyncSession,
+            tenant_id: str,
+            if_none_match: Optional[str] = None,
+    ) -> JSONResponse:
+        """
+        Retrieves a note of the tenant by its ID, or answers 304 if the client already has its current version.
+        Serialized notes are cached; a cached note is only served once its version number was checked
+        against the database, unless that check is disabled for single-worker deployments.
+        """
+        cached = note_cache.get(id, tenant_id=tenant_id)
+        version_number = None
+        if if_none_match or (cached is not None and env_config.NOTE_CACHE_VERIFY_VERSION):
+            version_number = await NoteQuery(session, tenant_id=tenant_id).get_version_number(id)
+            if version_number is None:
+                note_cache.invalidate(id)
+                raise NotFoundError(ErrorMessages.NOT_FOUND_SINGLE.value)
+
+            etag = ApiHelper._etag(id=id, version_number=version_number)
+            if if_none_match and ApiHelper._etag_matches(if_none_match, etag, weak=True):
+                return Response(status_code=304, headers={"ETag": etag})
+
+        if cached is not None and version_number in (None, cached[0]):
+            version_number, validated_note = cached
+        else:
+            if cached is not None:
+                # written by another worker, this one never saw the write
+                note_cache.invalidate(id)
+            note = await ApiHelper._fetch_note_by_id(id, session, tenant_id=tenant_id)
+            validated_note = NoteGetSchemaResponse.model_validate(
+                jsonable_encoder(note)
+            ).model_dump()
+            version_number = note.version_number
+            note_cache.put(id=id, version_number=version_number, payload=validated_note, tenant_id=tenant_id)
+
+        return ApiHelper._success_response(
+            status_code=200,
+            content=validated_note,
+            headers={"ETag": ApiHelper._etag(id=id, version_number=version_number)},
+        )
 
     @staticmethod
     @handle_exceptions
-    async def get_all_notes(session: AsyncSession) -> JSONResponse:
-        """Retrieves all notes."""
-        validated_notes = await ApiHelper._fetch_all_notes(session=session)
+    async def get_all_notes(
+            session: AsyncSession,
+            tenant_id: str,
+            filters: Optional[dict] = None,
+            sort: NoteSortKey = NoteSortKey.ID,
+            descending: bool = False,
+    ) -> JSONResponse:
+        """Retrieves all notes of the tenant, or the notes matching the filters, in the requested order."""
+        if not filters and sort == NoteSortKey.ID and not descending:
+            validated_notes = await ApiHelper._fetch_all_notes(session=session, tenant_id=tenant_id)
+        else:
+            repo = NoteQuery(session, tenant_id=tenant_id)
+            notes = await repo.get_filtered(filters=filters or {}, sort=sort, descending=descending)
+            validated_notes = ApiHelper._validate_notes(notes)
         return ApiHelper._success_response(status_code=200, content=validated_notes)
 
     @staticmethod
     @handle_exceptions
-    async def update_note(id: int, session: AsyncSession, data: dict) -> JSONResponse:
-        """Updates a note."""
+    async def update_note(
+            id: int,
+            session: AsyncSession,
+            tenant_id: str,
+            data: dict,
+            engine: SummarizerEngine = SummarizerEngine.AI,
+            if_match: Optional[str] = None,
+    ) -> JSONResponse:
+        """
+        Updates a note, only if it still is at the version given in `if_match`, without reading it first
+        when its content is not set or the note is cached (see `_update_content`).
+        The updated note is cached, a following edit of the same client does not read it either.
+        """
+        repo = NoteQuery(session, tenant_id=tenant_id)
         if data.get("content"):
-            ai_service = OpenAIService(
-                model=env_config.OPENAI_MODEL,
-                api_key=env_config.OPENAI_API_KEY,
-            )
-            prompt = PromptUtils.create_prompt_for_summarization(text=data.get("content"))
-            summarization = await asyncio.create_task(ai_service.fetch_data(prompt))
-
-            updated_data = {**data, "summarization": summarization}
+            updated = await ApiHelper._update_content(id=id, repo=repo, data=data, engine=engine, if_match=if_match)
         else:
-            updated_data = data
+            expected_versions = ApiHelper._expected_versions(id=id, if_match=if_match)
+            updated = await repo.update_returning(id=id, data=data, expected_versions=expected_versions)
+            if updated is None:
+                await ApiHelper._raise_missing_or_changed(id=id, repo=repo, expected_versions=expected_versions)
 
-        repo = NoteQuery(session)
-        note = await ApiHelper._fetch_note_by_id(id=id, session=session)
-        await repo.put(obj=note, data=updated_data)
-        return ApiHelper._success_response(status_code=204)
+        validated_note = NoteGetSchemaResponse.model_validate(jsonable_encoder(updated)).model_dump()
+        note_cache.put(id=id, version_number=updated["version_number"], payload=validated_note, tenant_id=tenant_id)
+        return ApiHelper._success_response(
+            status_code=204,
+            headers={"ETag": ApiHelper._etag(id=id, version_number=updated["version_number"])},
+        )
 
     @staticmethod
     @handle_exceptions
-    async def delete_note(id: int, session: AsyncSession) -> JSONResponse:
-        """Deletes a note."""
-        repo = NoteQuery(session)
-        note = await ApiHelper._fetch_note_by_id(id=id, session=session)
-        await repo.delete(note)
+    async def stream_summarization(id: int, session: AsyncSession, tenant_id: str) -> StreamingResponse:
+        """Streams a fresh summarization of a note as server-sent events and stores it once complete."""
+        note = await ApiHelper._fetch_note_by_id(id=id, session=session, tenant_id=tenant_id)
+        # shed before the stream starts, the slot itself is taken by the events once the response is streaming
+        ApiHelper._admission.check()
+        prompt = PromptUtils.create_prompt_for_summarization(text=note.content)
+        return StreamingResponse(
+            content=ApiHelper._summarization_events(
+                id=id, prompt=prompt, version_number=note.version_number, tenant_id=tenant_id
+            ),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @staticmethod
+    @handle_exceptions
+    async def stream_changes(tenant_id: str, since: Optional[int] = None) -> StreamingResponse:
+        """
+        Streams the changes of the notes of the tenant as server-sent events, first the ones after the sequence
+        `since` (a reconnecting client's last event ID), then the new ones as they are committed.
+        """
+        # subscribed before the response starts, so the changes made while the missed ones are read are queued
+        subscription = await change_feed.subscribe(tenant_id)
+        return StreamingResponse(
+            content=ApiHelper._change_events(subscription=subscription, since=since),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @staticmethod
+    async def export_notes(
+            tenant_id: str,
+            format: ExportFormat = ExportFormat.NDJSON,
+            include_versions: bool = False,
+            since_id: int = 0,
+    ) -> StreamingResponse:
+        """
+        Streams every note of the tenant with an ID greater than `since_id`, and optionally its versions,
+        as a gzip file.
+        """
+        return StreamingResponse(
+            content=ApiHelper._export_chunks(
+                format=format, include_versions=include_versions, since_id=since_id, tenant_id=tenant_id
+            ),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="notes.{format}.gz"'},
+        )
+
+    @staticmethod
+    @handle_exceptions
+    async def import_notes(request: Request, session: AsyncSession, tenant_id: str) -> JSONResponse:
+        """Imports the notes of a streamed NDJSON upload into the tenant, chunk by chunk."""
+        importer = NoteImporter(session=session, tenant_id=tenant_id, chunk_size=env_config.IMPORT_CHUNK_ROWS)
+        report = await importer.run(request.stream())
+        validated_data = ImportReportSchemaResponse.model_validate(report).model_dump()
+        return ApiHelper._success_response(status_code=200, content=validated_data)
+
+    @staticmethod
+    @handle_exceptions
+    async def delete_note(
+            id: int,
+            session: AsyncSession,
+            tenant_id: str,
+            if_match: Optional[str] = None,
+    ) -> JSONResponse:
+        """Deletes a note, only if it still is at the version given in `if_match`, in a single statement."""
+        repo = NoteQuery(session, tenant_id=tenant_id)
+        expected_versions = ApiHelper._expected_versions(id=id, if_match=if_match)
+        deleted = await repo.delete_returning(id=id, expected_versions=expected_versions)
+        if deleted is None:
+            await ApiHelper._raise_missing_or_changed(id=id, repo=repo, expected_versions=expected_versions)
+
         return ApiHelper._success_response(status_code=204)
 
     @staticmethod
     @handle_exceptions
-    async def get_total_word_count(session: AsyncSession) -> JSONResponse:
-        """Returns the total word count across all notes."""
-        notes = await ApiHelper._fetch_all_notes(session=session)
+    async def bulk_update_notes(
+            filters: dict,
+            content: str,
+            session: AsyncSession,
+            tenant_id: str,
+            engine: SummarizerEngine = SummarizerEngine.AI,
+    ) -> JSONResponse:
+        """
+        Sets the content of every note of the tenant matching the filters;
+        the content is summarized once for all of them, behind the interactive edits.
+        """
+        summarization = await ApiHelper._summarize(content=content, engine=engine, priority=Priority.BACKGROUND)
+
+        ids = await NoteQuery(session, tenant_id=tenant_id).bulk_update(
+            filters=filters, data={"content": content, "summarization": summarization}
+        )
+        if not ids:
+            raise NotFoundError(ErrorMessages.NOT_FOUND_MULTI.value)
+
+        validated_data = NoteBulkSchemaResponse.model_validate({"note_ids": ids}).model_dump()
+        return ApiHelper._success_response(status_code=200, content=validated_data)
+
+    @staticmethod
+    @handle_exceptions
+    async def bulk_delete_notes(filters: dict, session: AsyncSession, tenant_id: str) -> JSONResponse:
+        """Deletes every note of the tenant matching the filters, with their versions, in one statement per table."""
+        ids = await NoteQuery(session, tenant_id=tenant_id).bulk_delete(filters=filters)
+        if not ids:
+            raise NotFoundError(ErrorMessages.NOT_FOUND_MULTI.value)
+
+        validated_data = NoteBulkSchemaResponse.model_validate({"note_ids": ids}).model_dump()
+        return ApiHelper._success_response(status_code=200, content=validated_data)
+
+    @staticmethod
+    @handle_exceptions
+    async def get_total_word_count(
+            session: AsyncSession,
+            tenant_id: str,
+            request: Optional[Request] = None,
+            date_from: Optional[date] = None,
+            date_to: Optional[date] = None,
+            field: TimeField = TimeField.CREATED_AT,
+    ) -> JSONResponse:
+        """Returns the total word count across the notes of the tenant, or of those written within a time range."""
+        if date_from or date_to:
+            timeline = await ApiHelper._fetch_timeline(session, tenant_id, date_from=date_from, date_to=date_to)
+            word_count = timeline.get_total(f"words_{field.removesuffix('_at')}")
+        else:
+            _, word_count = await ApiHelper._coalesced_analytics(
+                "get_total_word_count", tenant_id=tenant_id, request=request
+            )
 
-        analytics = NoteAnalyticsService(notes=notes)
-        word_count = analytics.get_total_word_count()
         validated_data = WordCountSchemaResponse.model_validate(
             {"word_count": word_count}
         ).model_dump()
@@ -101,12 +343,25 @@ class ApiHelper:
 
     @staticmethod
     @handle_exceptions
-    async def get_average_note_length(session: AsyncSession) -> JSONResponse:
-        """Returns the average note length."""
-        notes = await ApiHelper._fetch_all_notes(session)
+    async def get_average_note_length(
+            session: AsyncSession,
+            tenant_id: str,
+            request: Optional[Request] = None,
+            date_from: Optional[date] = None,
+            date_to: Optional[date] = None,
+            field: TimeField = TimeField.CREATED_AT,
+    ) -> JSONResponse:
+        """Returns the average length of the notes of the tenant, or of those written within a time range."""
+        if date_from or date_to:
+            timeline = await ApiHelper._fetch_timeline(session, tenant_id, date_from=date_from, date_to=date_to)
+            action = field.removesuffix("_at")
+            notes_count = timeline.get_total(f"notes_{action}")
+            avg_length = timeline.get_total(f"words_{action}") / notes_count if notes_count else 0.0
+        else:
+            _, avg_length = await ApiHelper._coalesced_analytics(
+                "get_average_note_length", tenant_id=tenant_id, request=request
+            )
 
-        analytics = NoteAnalyticsService(notes=notes)
-        avg_length = analytics.get_average_note_length()
         validated_data = AVGNoteLengthSchemaResponse.model_validate(
             {"average_note_length": avg_length}
         ).model_dump()
@@ -114,40 +369,274 @@ class ApiHelper:
 
     @staticmethod
     @handle_exceptions
-    async def get_most_common_words(min_count: int, session: AsyncSession) -> JSONResponse:
-        """Returns the most common words across all notes."""
-        notes = await ApiHelper._fetch_all_notes(session)
+    async def get_most_common_words(
+            min_count: int,
+            session: AsyncSession,
+            tenant_id: str,
+            request: Optional[Request] = None,
+            approx: bool = False,
+    ) -> JSONResponse:
+        """
+        Returns the most common words across the notes of the tenant. With `approx`, the estimated counts
+        of the words kept by the word sketches of the tenant are returned instead, without reading a single note.
+        """
+        if approx:
+            common_words = await WordSketchQuery(session, tenant_id=tenant_id).get_heavy_hitters(min_count=min_count)
+            return ApiHelper._success_response(status_code=200, content=common_words)
 
-        analytics = NoteAnalyticsService(notes=notes)
-        common_words = analytics.get_most_common_words(min_count=min_count)
+        _, common_words = await ApiHelper._coalesced_analytics(
+            "get_most_common_words", tenant_id=tenant_id, request=request, min_count=min_count
+        )
         return ApiHelper._success_response(status_code=200, content=common_words)
 
     @staticmethod
     @handle_exceptions
-    async def get_longest_notes(top_n: int, session: AsyncSession) -> JSONResponse:
-        """Returns the longest notes."""
-        notes = await ApiHelper._fetch_all_notes(session)
+    async def get_most_common_phrases(
+            n: int,
+            min_count: int,
+            session: AsyncSession,
+            tenant_id: str,
+            request: Optional[Request] = None,
+    ) -> JSONResponse:
+        """Returns the most common phrases of `n` words across the notes of the tenant."""
+        _, common_phrases = await ApiHelper._coalesced_analytics(
+            "get_most_common_phrases", tenant_id=tenant_id, request=request, n=n, min_count=min_count
+        )
+        return ApiHelper._success_response(status_code=200, content=common_phrases)
 
-        analytics = NoteAnalyticsService(notes=notes)
-        longest_notes = analytics.get_longest_notes(top_n=top_n)
-        return ApiHelper._success_response(status_code=200, content=longest_notes)
+    @staticmethod
+    @handle_exceptions
+    async def get_vocabulary_size(
+            session: AsyncSession,
+            tenant_id: str,
+            request: Optional[Request] = None,
+            approx: bool = False,
+    ) -> JSONResponse:
+        """
+        Returns the number of distinct words across the notes of the tenant,
+        estimated by the word sketches with `approx`.
+        """
+        if approx:
+            vocabulary_size = await WordSketchQuery(session, tenant_id=tenant_id).get_vocabulary_size()
+        else:
+            _, vocabulary_size = await ApiHelper._coalesced_analytics(
+                "get_vocabulary_size", tenant_id=tenant_id, request=request
+            )
+
+        validated_data = VocabularySizeSchemaResponse.model_validate(
+            {"vocabulary_size": vocabulary_size}
+        ).model_dump()
+        return ApiHelper._success_response(status_code=200, content=validated_data)
 
     @staticmethod
     @handle_exceptions
-    async def get_shortest_notes(top_n: int, session: AsyncSession) -> JSONResponse:
-        """Returns the shortest notes."""
-        notes = await ApiHelper._fetch_all_notes(session)
+    async def get_longest_notes(
+            top_n: int,
+            session: AsyncSession,
+            tenant_id: str,
+            request: Optional[Request] = None,
+    ) -> JSONResponse:
+        """Returns the longest notes of the tenant."""
+        ids, indices = await ApiHelper._coalesced_analytics(
+            "get_longest_note_indices", tenant_id=tenant_id, request=request, top_n=top_n
+        )
+        notes = await ApiHelper._fetch_notes_by_ids(session, tenant_id, [ids[i] for i in indices])
+        return ApiHelper._success_response(status_code=200, content=notes)
 
-        analytics = NoteAnalyticsService(notes=notes)
-        shortest_notes = analytics.get_shortest_notes(top_n=top_n)
-        return ApiHelper._success_response(status_code=200, content=shortest_notes)
+    @staticmethod
+    @handle_exceptions
+    async def get_shortest_notes(
+            top_n: int,
+            session: AsyncSession,
+            tenant_id: str,
+            request: Optional[Request] = None,
+    ) -> JSONResponse:
+        """Returns the shortest notes of the tenant."""
+        ids, indices = await ApiHelper._coalesced_analytics(
+            "get_shortest_note_indices", tenant_id=tenant_id, request=request, top_n=top_n
+        )
+        notes = await ApiHelper._fetch_notes_by_ids(session, tenant_id, [ids[i] for i in indices])
+        return ApiHelper._success_response(status_code=200, content=notes)
+
+    @staticmethod
+    @handle_exceptions
+    async def get_timeline(
+            session: AsyncSession,
+            tenant_id: str,
+            date_from: Optional[date] = None,
+            date_to: Optional[date] = None,
+            granularity: Granularity = Granularity.DAY,
+    ) -> JSONResponse:
+        """Returns the note activity of the tenant per day, week or month, served from the daily rollups."""
+        timeline = await ApiHelper._fetch_timeline(session, tenant_id, date_from=date_from, date_to=date_to)
+        buckets = [
+            TimelineBucketSchemaResponse.model_validate(bucket).model_dump()
+            for bucket in timeline.get_buckets(granularity=granularity)
+        ]
+        return ApiHelper._success_response(status_code=200, content=buckets)
+
+    @staticmethod
+    @handle_exceptions
+    async def get_note_keywords(id: int, session: AsyncSession, tenant_id: str) -> JSONResponse:
+        """Returns the stored TF-IDF keywords of a note of the tenant."""
+        repo = NoteKeywordQuery(session, tenant_id=tenant_id)
+        keywords = await repo.get_by_note_id(id)
+
+        if not keywords:
+            raise NotFoundError(ErrorMessages.NOT_FOUND_SINGLE.value)
+
+        validated_data = NoteKeywordsSchemaResponse.model_validate(jsonable_encoder(keywords)).model_dump()
+        return ApiHelper._success_response(status_code=200, content=validated_data)
+
+    @staticmethod
+    async def refresh_keywords_periodically(interval: float) -> None:
+        """
+        Re-ranks the keywords of every note against fresh document frequencies every `interval` seconds,
+        one tenant after the other.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            async with async_session() as session:
+                try:
+                    for tenant_id in await NoteKeywordQuery(session).get_tenant_ids():
+                        repo = NoteKeywordQuery(session, tenant_id=tenant_id)
+                        await repo.rebuild(top_n=env_config.KEYWORDS_PER_NOTE)
+                except DatabaseError:
+                    Metrics.increment("keywords_refresh", label="failed")
+                else:
+                    Metrics.increment("keywords_refresh", label="succeeded")
+
+    @staticmethod
+    async def refresh_word_sketches_periodically(interval: float) -> None:
+        """Recounts the word sketches of every tenant over its notes every `interval` seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            async with async_session() as session:
+                try:
+                    for tenant_id in await WordSketchQuery(session).get_tenant_ids():
+                        await WordSketchQuery(session, tenant_id=tenant_id).rebuild()
+                except DatabaseError:
+                    Metrics.increment("word_sketches_refresh", label="failed")
+                else:
+                    Metrics.increment("word_sketches_refresh", label="succeeded")
+
+    @staticmethod
+    async def compact_derived_stats_periodically(interval: float) -> None:
+        """
+        Applies the maintenance the write path defers every `interval` seconds: folds the documents count shards
+        of every tenant and trims its heavy hitter candidates.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            async with async_session() as session:
+                try:
+                    for tenant_id in await NoteKeywordQuery(session).get_tenant_ids():
+                        await NoteKeywordQuery(session, tenant_id=tenant_id).compact()
+                    for tenant_id in await WordSketchQuery(session).get_tenant_ids():
+                        await WordSketchQuery(session, tenant_id=tenant_id).trim_heavy_hitters()
+                except DatabaseError:
+                    Metrics.increment("derived_stats_compaction", label="failed")
+                else:
+                    Metrics.increment("derived_stats_compaction", label="succeeded")
+
+    @staticmethod
+    async def create_version_partitions_periodically(interval: float) -> None:
+        """
+        Creates the missing partitions of note_version for the current and coming months at startup,
+        then every `interval` seconds, so versions keep landing in monthly partitions between archive runs.
+        """
+        while True:
+            async with async_session() as session:
+                try:
+                    created = await NoteVersionArchiveQuery(session).create_upcoming_partitions()
+                except DatabaseError:
+                    Metrics.increment("version_partitions", label="failed")
+                else:
+                    Metrics.increment("version_partitions", label="created", value=len(created))
+            await asyncio.sleep(interval)
 
     @staticmethod
-    async def _fetch_all_notes(session: AsyncSession) -> list[dict]:
-        """Helper method to retrieve all notes and validate them."""
-        repo = NoteQuery(session)
+    async def _fetch_timeline(
+            session: AsyncSession,
+            tenant_id: str,
+            date_from: Optional[date] = None,
+            date_to: Optional[date] = None,
+    ) -> NoteTimelineService:
+        """Helper method to load the daily rollups of a tenant over a time range."""
+        repo = NoteStatsQuery(session, tenant_id=tenant_id)
+        rows = await repo.get_range(date_from=date_from, date_to=date_to)
+        return NoteTimelineService(
+            daily_stats=[
+                {"day": row.day, **{counter: getattr(row, counter) for counter in NoteTimelineService.COUNTERS}}
+                for row in rows
+            ]
+        )
+
+    @staticmethod
+    async def _coalesced_analytics(
+            method: str,
+            tenant_id: str,
+            request: Optional[Request] = None,
+            **kwargs,
+    ) -> tuple[list[int], Any]:
+        """
+        Helper method to read every note of a tenant and compute analytics over them, once for all the concurrent
+        identical requests seeing the same generation of the notes. The work runs in a session of its own,
+        as it outlives the request which started it when that one goes away before the others.
+
+        Only the IDs and contents are read, as raw rows fetched in chunks, the loop is free between two chunks.
+
+        :returns: The IDs of the notes, in the order the analytics saw them, and the result of the analytics method.
+        """
+        key = (method, tenant_id, corpus_generations.get(tenant_id), tuple(sorted(kwargs.items())))
+
+        async def work(is_abandoned) -> tuple[list[int], Any]:
+            ids, contents = [], []
+            async with async_session() as session:
+                async for batch in NoteQuery(session, tenant_id=tenant_id).iterate_contents(
+                        batch_size=env_config.ANALYTICS_READ_CHUNK_ROWS
+                ):
+                    ids.extend(row.id for row in batch)
+                    contents.extend(row.content for row in batch)
+            if not ids:
+                raise NotFoundError(ErrorMessages.NOT_FOUND_MULTI.value)
+            return ids, await ApiHelper._run_analytics(
+                method, contents=contents, is_disconnected=is_abandoned, **kwargs
+            )
+
+        return await ApiHelper._analytics_flights.run(
+            key, work, is_disconnected=request.is_disconnected if request is not None else None
+        )
+
+    @staticmethod
+    async def _run_analytics(
+            method: str,
+            contents: list[str],
+            is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+            **kwargs,
+    ) -> Any:
+        """Helper method to compute analytics off the event loop, abandoning them once `is_disconnected` is True."""
+        return await ApiHelper._analytics_executor.run(
+            method, contents=contents, is_disconnected=is_disconnected, **kwargs
+        )
+
+    @staticmethod
+    async def _fetch_all_notes(session: AsyncSession, tenant_id: str) -> list[dict]:
+        """Helper method to retrieve all notes of a tenant and validate them."""
+        repo = NoteQuery(session, tenant_id=tenant_id)
         notes = await repo.get_all()
+        return ApiHelper._validate_notes(notes)
 
+    @staticmethod
+    async def _fetch_notes_by_ids(session: AsyncSession, tenant_id: str, ids: list[int]) -> list[dict]:
+        """Helper method to retrieve the notes of a tenant with the given IDs, in that order, and validate them."""
+        repo = NoteQuery(session, tenant_id=tenant_id)
+        notes = await repo.get_many(ids)
+        return ApiHelper._validate_notes(notes)
+
+    @staticmethod
+    def _validate_notes(notes: list) -> list[dict]:
+        """Helper method to validate listed notes, an empty listing is a 404."""
         if not notes:
             raise NotFoundError(ErrorMessages.NOT_FOUND_MULTI.value)
 
@@ -159,9 +648,9 @@ class ApiHelper:
 
     @staticmethod
     @handle_exceptions
-    async def _fetch_note_by_id(id: int, session: AsyncSession) -> Optional[Type[Base]]:
-        """Helper method to get a note by ID or raise a 404 response."""
-        repo = NoteQuery(session)
+    async def _fetch_note_by_id(id: int, session: AsyncSession, tenant_id: str) -> Optional[Type[Base]]:
+        """Helper method to get a note of a tenant by ID or raise a 404 response."""
+        repo = NoteQuery(session, tenant_id=tenant_id)
         note = await repo.get_by_id(id)
 
         if not note:
@@ -170,8 +659,376 @@ class ApiHelper:
         return note
 
     @staticmethod
-    def _success_response(status_code: int, content: Optional[Any] = None) -> JSONResponse:
+    async def _update_content(
+            id: int,
+            repo: NoteQuery,
+            data: dict,
+            engine: SummarizerEngine,
+            if_match: Optional[str],
+    ) -> dict:
+        """
+        Helper method to update the content of a note against the content it replaces, which decides whether
+        the note is summarized again: the cached note if there is one, else the stored one.
+        The update only applies to that version, the summary must not land on a concurrent write. A note that moved
+        on meanwhile is read again and the update retried, up to `NOTE_UPDATE_ATTEMPTS` times before a 409
+        (a 412 right away if the client expected a version).
+        """
+        cached = note_cache.get(id, tenant_id=repo.tenant_id)
+        attempts = 0
+        while True:
+            if cached is not None:
+                version_number, old_content = cached[0], cached[1]["content"]
+            else:
+                note = await ApiHelper._fetch_note_by_id(id=id, session=repo.session, tenant_id=repo.tenant_id)
+                version_number, old_content = note.version_number, note.content
+
+            etag = ApiHelper._etag(id=id, version_number=version_number)
+            if if_match and not ApiHelper._etag_matches(if_match, etag):
+                if cached is None:
+                    raise PreconditionFailedError(ErrorMessages.PRECONDITION_FAILED.value)
+                # written by another worker, the client may have a newer version than the cached one
+                cached = None
+                continue
+
+            updated_data = data
+            if ApiHelper._needs_resummarization(old=old_content, new=data["content"]):
+                summarization = await ApiHelper._summarize(content=data["content"], engine=engine)
+                updated_data = {**data, "summarization": summarization}
+
+            updated = await repo.update_returning(id=id, data=updated_data, expected_versions=[version_number])
+            if updated is not None:
+                return updated
+
+            attempts += 1
+            if attempts >= env_config.NOTE_UPDATE_ATTEMPTS:
+                Metrics.increment("note_update_conflict", label="failed")
+                raise ConflictError(ErrorMessages.CONFLICT.value)
+            Metrics.increment("note_update_conflict", label="retried")
+            cached = None
+
+    @staticmethod
+    def _needs_resummarization(old: str, new: str) -> bool:
+        """Helper method to decide whether edited content deserves a new summarization."""
+        old_words, new_words = ContentUtils.normalize(old), ContentUtils.normalize(new)
+        if old_words == new_words:
+            Metrics.increment("summarization_reuse", label="unchanged")
+            return False
+
+        max_distance = int(env_config.SUMMARY_REUSE_MAX_EDIT_RATIO * max(len(old_words), len(new_words)))
+        if ContentUtils.edit_distance(old_words, new_words, max_distance=max_distance) <= max_distance:
+            Metrics.increment("summarization_reuse", label="trivial_edit")
+            return False
+
+        Metrics.increment("summarization_reuse", label="resummarized")
+        return True
+
+    @staticmethod
+    async def _summarization_events(id: int, prompt: str, version_number: int, tenant_id: str) -> AsyncIterator[str]:
+        """
+        Helper method to relay model tokens as SSE events and persist the final text. The summarization is only
+        stored on the version it was generated from, a note edited meanwhile ends the stream with a `conflict` event.
+        """
+        ai_service = ApiHelper._get_ai_service()
+        chunks = []
+        try:
+            async with ApiHelper._admission.admit():
+                async for delta in ai_service.stream_data(prompt):
+                    chunks.append(delta)
+                    yield ApiHelper._sse_event(event="token", data={"delta": delta})
+        except OverloadedError:
+            yield ApiHelper._sse_event(event="error", data={"detail": ErrorMessages.OVERLOADED.value})
+            return
+
+        summarization = "".join(chunks)
+        if not summarization:
+            yield ApiHelper._sse_event(event="error", data={"detail": ErrorMessages.SUMMARIZATION_FAILED.value})
+            return
+
+        # the request session is already closed once the response is streaming
+        async with async_session() as session:
+            repo = NoteQuery(session, tenant_id=tenant_id)
+            try:
+                updated = await repo.update_returning(
+                    id=id, data={"summarization": summarization}, expected_versions=[version_number]
+                )
+                missing = updated is None and await repo.get_version_number(id) is None
+            except DatabaseError:
+                yield ApiHelper._sse_event(event="error", data={"detail": ErrorMessages.DATABASE_CRASHED.value})
+                return
+
+        if missing:
+            yield ApiHelper._sse_event(event="error", data={"detail": ErrorMessages.NOT_FOUND_SINGLE.value})
+            return
+        if updated is None:
+            Metrics.increment("note_update_conflict", label="summarization")
+            yield ApiHelper._sse_event(event="conflict", data={"detail": ErrorMessages.SUMMARIZATION_CONFLICT.value})
+            return
+
+        yield ApiHelper._sse_event(event="done", data={"note_id": id, "summarization": summarization})
+
+    @staticmethod
+    async def _change_events(subscription: ChangeSubscription, since: Optional[int] = None) -> AsyncIterator[str]:
+        """
+        Helper method to relay the changes of a subscription as SSE events, the event ID being the sequence.
+        A `reset` event tells a client resuming from a pruned sequence to reload the notes; the stream ends
+        when the client falls too far behind, it then resumes from its last event ID.
+        """
+        try:
+            if since is not None and since < subscription.since:
+                try:
+                    async for event in ApiHelper._missed_change_events(subscription, since=since):
+                        yield event
+                except DatabaseError:
+                    yield ApiHelper._sse_event(event="error", data={"detail": ErrorMessages.DATABASE_CRASHED.value})
+                    return
+
+            while True:
+                try:
+                    change = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=env_config.CHANGE_FEED_HEARTBEAT
+                    )
+                except asyncio.TimeoutError:
+                    # a comment line, keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                if change is None:
+                    return
+                yield ApiHelper._change_event(change)
+        finally:
+            change_feed.unsubscribe(subscription)
+
+    @staticmethod
+    async def _missed_change_events(subscription: ChangeSubscription, since: int) -> AsyncIterator[str]:
+        """Helper method to read the changes between a resumed sequence and the subscription from the log."""
+        async with async_session() as session:
+            first, _ = await NoteChangeQuery(session, tenant_id=None).get_sequence_range()
+        if first is not None and since < first - 1:
+            Metrics.increment("change_feed", label="reset")
+            yield ApiHelper._sse_event(event="reset", data={"sequence": subscription.since}, id=subscription.since)
+            return
+
+        page_rows = env_config.CHANGE_FEED_PAGE_ROWS
+        while True:
+            # the session is not held while the client reads a page
+            async with async_session() as session:
+                changes = await NoteChangeQuery(session, tenant_id=subscription.tenant_id).get_changes(
+                    after=since, until=subscription.since, limit=page_rows
+                )
+            for change in changes:
+                resume_sequence = change_feed.resume_point(change["sequence"])
+                yield ApiHelper._change_event({**change, "resume_sequence": resume_sequence})
+            if len(changes) < page_rows:
+                return
+            since = changes[-1]["sequence"]
+
+    @staticmethod
+    def _change_event(change: dict) -> str:
+        """
+        Helper method to format a change of a note as an SSE event named by its action. The event ID is where
+        the client resumes from, the sequence of the change unless the feed still waits for an earlier one.
+        """
+        return ApiHelper._sse_event(
+            event=change["action"],
+            data={
+                "sequence": change["sequence"],
+                "note_id": change["note_id"],
+                "version_number": change["version_number"],
+                "changed_at": change["changed_at"].isoformat(),
+            },
+            id=change.get("resume_sequence", change["sequence"]),
+        )
+
+    @staticmethod
+    async def _export_chunks(
+            format: ExportFormat,
+            include_versions: bool,
+            since_id: int,
+            tenant_id: str,
+    ) -> AsyncIterator[bytes]:
+        """Helper method to read the notes chunk by chunk and yield them compressed, recording the throughput."""
+        encoder = ExportEncoder(format=format)
+        rows_count = 0
+        started = time.perf_counter()
+
+        # the request session is already closed once the response is streaming
+        async with async_session() as session:
+            repo = NoteQuery(session, tenant_id=tenant_id)
+            async for notes in repo.stream_all(since_id=since_id, chunk_size=env_config.EXPORT_CHUNK_ROWS):
+                versions = defaultdict(list)
+                if include_versions:
+                    for version in await repo.get_versions(note_ids=[note["id"] for note in notes]):
+                        versions[version["note_id"]].append({"type": "version", **version})
+
+                # every note is followed by its versions, a note ID is therefore a safe point to resume from
+                rows = []
+                for note in notes:
+                    rows.append({"type": "note", **note})
+                    rows.extend(versions[note["id"]])
+
+                rows_count += len(rows)
+                chunk = encoder.encode(rows)
+                if chunk:
+                    yield chunk
+
+        yield encoder.finish()
+
+        elapsed = time.perf_counter() - started
+        Metrics.increment("export_rows", label=format, value=rows_count)
+        Metrics.observe("export_rows_per_second", rows_count / elapsed if elapsed > 0 else 0.0)
+
+    @staticmethod
+    def _etag(id: int, version_number: int) -> str:
+        """Builds the strong entity tag of a note version, every write bumps the version and thus changes it."""
+        return f'"{id}-{version_number}"'
+
+    @staticmethod
+    def _etag_matches(header: str, etag: str, weak: bool = False) -> bool:
+        """Helper method to check an If-Match or If-None-Match header (a list of tags, or '*') against a tag."""
+        tags = [tag.strip() for tag in header.split(",")]
+        if weak:
+            tags = [tag.removeprefix("W/") for tag in tags]
+        return "*" in tags or etag in tags
+
+    @staticmethod
+    def _expected_versions(id: int, if_match: Optional[str]) -> Optional[list[int]]:
+        """Helper method to turn an If-Match header into the versions a write may apply to, None meaning any."""
+        if not if_match:
+            return None
+
+        versions = []
+        for tag in (tag.strip() for tag in if_match.split(",")):
+            if tag == "*":
+                return None
+            # weak tags never match, If-Match uses the strong comparison
+            note_id, _, version_number = tag.strip('"').partition("-")
+            if note_id == str(id) and version_number.isdigit():
+                versions.append(int(version_number))
+        return versions
+
+    @staticmethod
+    async def _raise_missing_or_changed(id: int, repo: NoteQuery, expected_versions: Optional[list[int]]) -> None:
+        """Helper method to tell why a conditional write matched no row, only run when it failed."""
+        if expected_versions is not None and await repo.get_version_number(id) is not None:
+            raise PreconditionFailedError(ErrorMessages.PRECONDITION_FAILED.value)
+        raise NotFoundError(ErrorMessages.NOT_FOUND_SINGLE.value)
+
+    @staticmethod
+    def _sse_event(event: str, data: dict, id: Optional[int] = None) -> str:
+        """Formats a single server-sent event, with an ID if given (sent back by clients in 'Last-Event-ID')."""
+        prefix = f"id: {id}\n" if id is not None else ""
+        return f"{prefix}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    @staticmethod
+    def _get_ai_service(priority: Priority = Priority.INTERACTIVE) -> OpenAIService:
+        """Creates the AI service configured for the application, its calls wait in the lane of `priority`."""
+        return OpenAIService(
+            model=env_config.OPENAI_MODEL,
+            api_key=env_config.OPENAI_API_KEY,
+            scheduler=ApiHelper._scheduler,
+            priority=priority,
+        )
+
+    @staticmethod
+    async def _summarize(
+            content: str,
+            engine: SummarizerEngine,
+            priority: Priority = Priority.INTERACTIVE,
+    ) -> str:
+        """
+        Helper method to summarize a content. When the model is involved, the concurrent requests with the same
+        content (and priority) share one summarization, which goes through admission control once.
+        """
+        summarizer = ApiHelper._get_summarizer(engine=engine, priority=priority)
+        if engine == SummarizerEngine.EXTRACTIVE:
+            return await asyncio.create_task(summarizer.summarize(content))
+
+        async def work(is_abandoned) -> str:
+            async with ApiHelper._admission.admit():
+                return await summarizer.summarize(content)
+
+        key = (engine, priority, hashlib.sha256(content.encode()).hexdigest())
+        return await ApiHelper._summarization_flights.run(key, work)
+
+    @staticmethod
+    def _get_summarizer(
+            engine: SummarizerEngine = SummarizerEngine.AI,
+            priority: Priority = Priority.INTERACTIVE,
+    ) -> BaseSummarizer:
+        """Creates the summarizer configured for the application."""
+        extractive = ExtractiveSummarizer(ratio=env_config.SUMMARY_EXTRACTIVE_RATIO)
+        if engine == SummarizerEngine.EXTRACTIVE:
+            return extractive
+
+        summarizer = OpenAISummarizer(
+            service=ApiHelper._get_ai_service(priority=priority),
+            chunk_words=env_config.SUMMARY_CHUNK_WORDS,
+            max_parallel=env_config.SUMMARY_MAX_PARALLEL_CHUNKS,
+            merge_with_model=env_config.SUMMARY_MERGE_WITH_MODEL,
+        )
+        if not env_config.SUMMARY_FALLBACK_TO_EXTRACTIVE:
+            return summarizer
+
+        return FallbackSummarizer(primary=summarizer, fallback=extractive, timeout=env_config.SUMMARY_AI_TIMEOUT)
+
+    @staticmethod
+    async def warm_up(engine: AsyncEngine, connections: int, retry_interval: float) -> None:
+        """
+        Prepares the worker for its first requests, then marks it ready: opens `connections` database connections
+        while the lazily imported modules (numpy, httpx) are imported in a thread, then creates the shared
+        HTTP client. A failed warm-up is retried every `retry_interval` seconds, the worker stays unready meanwhile.
+        """
+        start = time.perf_counter()
+        while True:
+            try:
+                await asyncio.gather(
+                    ApiHelper._open_connections(engine, connections),
+                    asyncio.to_thread(LazyModule.load_all),
+                )
+                break
+            except (SQLAlchemyError, OSError):
+                Metrics.increment("warm_up", label="failed")
+                await asyncio.sleep(retry_interval)
+
+        OpenAIService.get_client()
+        ApiHelper._warm_up_seconds = time.perf_counter() - start
+        Metrics.set_gauge("warm_up_seconds", ApiHelper._warm_up_seconds)
+        ApiHelper._ready = True
+
+    @staticmethod
+    def get_readiness() -> JSONResponse:
+        """Answers the readiness probe: 200 once the worker has warmed up, 503 before."""
+        validated_data = ReadinessSchemaResponse.model_validate({
+            "ready": ApiHelper._ready,
+            "warm_up_seconds": ApiHelper._warm_up_seconds,
+            "lazy_imports": LazyModule.report(),
+        }).model_dump()
+        return ApiHelper._success_response(status_code=200 if ApiHelper._ready else 503, content=validated_data)
+
+    @staticmethod
+    async def _open_connections(engine: AsyncEngine, count: int) -> None:
+        """Helper method to fill the connection pool, every connection runs a trivial query before going back."""
+        async def open_connection() -> None:
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+
+        # opened concurrently, so none of them is handed out twice
+        await asyncio.gather(*(open_connection() for _ in range(count)))
+
+    @staticmethod
+    async def shutdown() -> None:
+        """Releases resources held by the helper, called when the application stops."""
+        ApiHelper._ready = False
+        ApiHelper._analytics_executor.shutdown()
+        await OpenAIService.close_client()
+        await change_feed.close()
+
+    @staticmethod
+    def _success_response(
+            status_code: int,
+            content: Optional[Any] = None,
+            headers: Optional[dict] = None,
+    ) -> JSONResponse:
         """Creates a standardized response."""
         if status_code == 204:
-            return Response(status_code=status_code)
-        return JSONResponse(status_code=status_code, content=content)
+            return Response(status_code=status_code, headers=headers)
+        return JSONResponse(status_code=status_code, content=content, headers=headers)
@@ -0,0 +1,204 @@
+"""
+Bulk import of notes from an NDJSON dump, such as the one written by /crud/export.
+
+Usage (admin CLI):
+    python -m src.backend.utils.importer notes.ndjson.gz
+    python -m src.backend.utils.importer notes.ndjson.gz --tenant acme
+"""
+import argparse
+import asyncio
+import json
+import zlib
+from typing import AsyncIterator, Optional
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import env_config
+from src.backend.utils.enums import ErrorMessages
+from src.backend.utils.exceptions import DatabaseError, DuplicateDataError, InputFieldError
+from src.backend.utils.metrics import Metrics
+from src.backend.utils.schemas import NotePostSchema
+from src.database.database.models import NoteModel
+from src.database.database.queries import NoteQuery
+from src.database.session import async_session
+from src.thirdweb.summarizer.service import ExtractiveSummarizer
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+class NoteImporter:
+    """
+    Imports notes from a stream of NDJSON bytes, optionally gzip-compressed, into the notes of one tenant.
+    The body is parsed line by line as it arrives and inserted in transactions of `chunk_size` notes;
+    the next bytes are only pulled once a chunk is committed, so a slow database slows the upload down
+    (the server stops reading the socket) instead of buffering the dump in memory.
+    Lines of other record types (e.g. exported versions) are ignored, invalid lines are skipped and reported.
+    """
+
+    MAX_REPORTED_ERRORS = 100
+
+    def __init__(
+            self,
+            session: AsyncSession,
+            tenant_id: str = NoteModel.DEFAULT_TENANT,
+            chunk_size: int = 500,
+            max_line_bytes: int = 1 << 20,
+    ):
+        self.session = session
+        self.tenant_id = tenant_id
+        self.chunk_size = chunk_size
+        self.max_line_bytes = max_line_bytes
+        self.imported = 0
+        self.skipped = 0
+        self.errors: list[dict] = []
+        # imported notes without a summarization get a local one, a dump must not burn the AI quota
+        self._summarizer = ExtractiveSummarizer(ratio=env_config.SUMMARY_EXTRACTIVE_RATIO)
+
+    async def run(self, body: AsyncIterator[bytes]) -> dict:
+        """
+        Import every note of the stream.
+
+        :param body: The raw dump, in chunks of any size.
+        :type body: AsyncIterator[bytes]
+        :returns: A report with the number of imported and skipped notes and the first errors.
+        :rtype: dict
+        """
+        chunk = []
+        async for line_number, line in self._iterate_lines(body):
+            note = self._parse(line_number, line)
+            if note is not None:
+                chunk.append((line_number, note))
+            if len(chunk) >= self.chunk_size:
+                await self._insert(chunk)
+                chunk = []
+
+        if chunk:
+            await self._insert(chunk)
+        return {"imported": self.imported, "skipped": self.skipped, "errors": self.errors}
+
+    async def _iterate_lines(self, body: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, bytes]]:
+        """Helper method to split the (decompressed) stream into numbered lines, holding one partial line at most."""
+        decompressor = None
+        buffer, line_number, first, oversized = b"", 0, True, False
+
+        async for data in body:
+            if first and data:
+                first = False
+                if data.startswith(_GZIP_MAGIC):
+                    decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+            if decompressor is not None:
+                data = decompressor.decompress(data)
+
+            lines = (buffer + data).split(b"\n")
+            buffer = lines.pop()
+            for line in lines:
+                line_number += 1
+                if oversized:
+                    oversized = False
+                    self._reject(line_number, ErrorMessages.IMPORT_LINE_TOO_LONG.value)
+                elif line.strip():
+                    yield line_number, line
+
+            if len(buffer) > self.max_line_bytes:
+                # the rest of this line is dropped as it arrives
+                buffer, oversized = b"", True
+
+        if decompressor is not None:
+            buffer += decompressor.flush()
+        if oversized:
+            self._reject(line_number + 1, ErrorMessages.IMPORT_LINE_TOO_LONG.value)
+        elif buffer.strip():
+            yield line_number + 1, buffer
+
+    def _parse(self, line_number: int, line: bytes) -> Optional[dict]:
+        """Helper method to decode and validate one line, returns None for skipped lines."""
+        try:
+            record = json.loads(line)
+        except ValueError:
+            self._reject(line_number, ErrorMessages.IMPORT_INVALID_JSON.value)
+            return None
+
+        if not isinstance(record, dict):
+            self._reject(line_number, ErrorMessages.NOT_CONFORM_SCHEMA.value)
+            return None
+        if record.get("type", "note") != "note":
+            return None
+
+        try:
+            validated = NotePostSchema.model_validate(
+                {"title": record.get("title"), "content": record.get("content")}
+            )
+        except InputFieldError as e:
+            self._reject(line_number, str(e))
+            return None
+        except ValidationError:
+            self._reject(line_number, ErrorMessages.NOT_CONFORM_SCHEMA.value)
+            return None
+
+        summarization = record.get("summarization")
+        if not isinstance(summarization, str) or not summarization.strip():
+            summarization = None  # extracted with the rest of its chunk, see `_summarize_missing`
+        return {**validated.model_dump(), "summarization": summarization, "version_number": 1}
+
+    async def _insert(self, chunk: list[tuple[int, dict]]) -> None:
+        """Helper method to insert a chunk in one transaction, or note by note to isolate the failing ones."""
+        await asyncio.to_thread(self._summarize_missing, [note for _, note in chunk])
+        repo = NoteQuery(self.session, tenant_id=self.tenant_id)
+        try:
+            await repo.create_many([note for _, note in chunk])
+            self._accept(len(chunk))
+            return
+        except DatabaseError:
+            await self.session.rollback()
+
+        for line_number, note in chunk:
+            try:
+                await repo.create(data=note)
+                self._accept(1)
+            except DuplicateDataError:
+                await self.session.rollback()
+                self._reject(line_number, ErrorMessages.DUPLICATE_DATA.value)
+            except DatabaseError:
+                await self.session.rollback()
+                self._reject(line_number, ErrorMessages.DATABASE_CRASHED.value)
+
+    def _summarize_missing(self, notes: list[dict]) -> None:
+        """
+        Helper method to extract the summarizations the dump lacks, run in a thread once per chunk
+        so the other requests of the worker are served meanwhile.
+        """
+        for note in notes:
+            if note["summarization"] is None:
+                note["summarization"] = self._summarizer.summarize_text(note["content"])
+
+    def _accept(self, count: int) -> None:
+        self.imported += count
+        Metrics.increment("import_rows", label="imported", value=count)
+
+    def _reject(self, line_number: int, detail: str) -> None:
+        self.skipped += 1
+        Metrics.increment("import_rows", label="skipped")
+        if len(self.errors) < self.MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_number, "detail": detail})
+
+
+async def _read_file(path: str, block_size: int = 1 << 16) -> AsyncIterator[bytes]:
+    """Reads a local file block by block without blocking the event loop."""
+    with open(path, "rb") as file:
+        while data := await asyncio.to_thread(file.read, block_size):
+            yield data
+
+
+async def _main(path: str, tenant_id: str) -> dict:
+    async with async_session() as session:
+        importer = NoteImporter(session=session, tenant_id=tenant_id, chunk_size=env_config.IMPORT_CHUNK_ROWS)
+        return await importer.run(_read_file(path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import notes from an NDJSON dump (plain or gzip-compressed).")
+    parser.add_argument("path", help="Path of the dump, e.g. written by /crud/export.")
+    parser.add_argument("--tenant", default=NoteModel.DEFAULT_TENANT, help="Tenant receiving the notes.")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(_main(args.path, tenant_id=args.tenant))))
@@ -0,0 +1,55 @@
+import importlib
+import time
+from types import ModuleType
+from typing import Optional
+
+from src.backend.utils.metrics import Metrics
+
+
+class LazyModule:
+    """
+    Stand-in for a heavy module (numpy, httpx) that imports it on the first attribute access, so importing
+    the application does not pay for modules a worker may not need before its first analytics or AI request.
+    The attributes of the module are then copied onto the stand-in, later accesses are plain lookups.
+    """
+
+    # every stand-in, by module name
+    _imported: dict[str, "LazyModule"] = {}
+
+    def __init__(self, name: str):
+        # private names only, the public attributes of the module are copied here
+        self._lazy_name = name
+        self._lazy_module = None
+        self._lazy_seconds = None
+        LazyModule._imported.setdefault(name, self)
+
+    def __getattr__(self, attribute: str):
+        # only reached for attributes missing from the stand-in: before the import, or private ones
+        return getattr(self._lazy_load(), attribute)
+
+    def _lazy_load(self) -> ModuleType:
+        """Imports the module if not done yet and returns it."""
+        if self._lazy_module is None:
+            start = time.perf_counter()
+            module = importlib.import_module(self._lazy_name)
+            self._lazy_seconds = time.perf_counter() - start
+            Metrics.set_gauge(f"lazy_import_seconds_{self._lazy_name}", self._lazy_seconds)
+            self.__dict__.update({key: value for key, value in vars(module).items() if not key.startswith("_")})
+            self._lazy_module = module
+        return self._lazy_module
+
+    @classmethod
+    def load_all(cls) -> None:
+        """Imports every module with a stand-in, e.g. from a thread while the worker warms up."""
+        for module in list(cls._imported.values()):
+            module._lazy_load()
+
+    @classmethod
+    def report(cls) -> dict[str, Optional[float]]:
+        """Returns the seconds the import of every module with a stand-in took, None for the ones not imported."""
+        return {name: module._lazy_seconds for name, module in cls._imported.items()}
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Returns the stand-in of a module, shared by every importer of the same name."""
+    return LazyModule._imported.get(name) or LazyModule(name)
@@ -0,0 +1,47 @@
+from collections import defaultdict
+from typing import Optional
+
+
+class Metrics:
+    """
+    In-process registry of application metrics, exported by the /metrics endpoint.
+    Counters only grow, gauges hold the last value set, observations keep count, sum and max.
+    """
+
+    _counters: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    _gauges: dict[str, float] = {}
+    _observations: dict[str, dict[str, float]] = {}
+
+    @classmethod
+    def increment(cls, name: str, label: Optional[str] = None, value: int = 1) -> None:
+        """Increases the counter `name`, optionally split by `label`."""
+        cls._counters[name][label or "total"] += value
+
+    @classmethod
+    def set_gauge(cls, name: str, value: float) -> None:
+        """Sets the current value of the gauge `name`."""
+        cls._gauges[name] = value
+
+    @classmethod
+    def observe(cls, name: str, value: float) -> None:
+        """Records one observation (e.g. a wait time in seconds) of `name`."""
+        observation = cls._observations.setdefault(name, {"count": 0, "sum": 0.0, "max": 0.0})
+        observation["count"] += 1
+        observation["sum"] += value
+        observation["max"] = max(observation["max"], value)
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        """Returns every metric in a JSON serializable form."""
+        return {
+            "counters": {name: dict(labels) for name, labels in cls._counters.items()},
+            "gauges": dict(cls._gauges),
+            "observations": {name: dict(values) for name, values in cls._observations.items()},
+        }
+
+    @classmethod
+    def reset(cls) -> None:
+        """Forgets every recorded metric."""
+        cls._counters.clear()
+        cls._gauges.clear()
+        cls._observations.clear()
@@ -1,7 +1,9 @@
+from datetime import datetime
 from typing import Optional
 
 from pydantic import BaseModel, model_validator, field_validator
 
+from src.config import env_config
 from src.backend.utils.enums import ErrorMessages
 from src.backend.utils.exceptions import InputLengthFieldError, InputEmptyFieldError
 
@@ -27,7 +29,7 @@ class NotePostSchema(BaseModel):
         if not value or value.strip() == "":
             raise InputEmptyFieldError(ErrorMessages.CONTENT_EMPTY.value)
         word_count = len(value.split())
-        if word_count > 500:
+        if word_count > env_config.NOTE_CONTENT_MAX_WORDS:
             raise InputLengthFieldError(ErrorMessages.CONTENT_TOO_LONG.value)
         return value
 
@@ -67,7 +69,7 @@ class NotePutSchema(BaseModel):
 
     @field_validator("content")
     def check_content_not_empty(cls, value):
-        if value and len(value.split()) > 500:
+        if value and len(value.split()) > env_config.NOTE_CONTENT_MAX_WORDS:
             raise InputLengthFieldError(ErrorMessages.CONTENT_TOO_LONG.value)
 
         if value is not None and value.strip() == "":
@@ -84,9 +86,92 @@ class NotePutSchema(BaseModel):
         return values
 
 
+class NoteFilterSchema(BaseModel):
+    ids: Optional[list[int]] = None
+    title_contains: Optional[str] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    updated_from: Optional[datetime] = None
+    updated_to: Optional[datetime] = None
+
+    class Config:
+        extra = "forbid"
+
+    @model_validator(mode="after")
+    def check_not_empty(self):
+        # an empty filter would select every note
+        if not self.ids and not self.title_contains and all(
+            value is None for value in (self.created_from, self.created_to, self.updated_from, self.updated_to)
+        ):
+            raise InputEmptyFieldError(ErrorMessages.FILTER_EMPTY.value)
+        return self
+
+
+class NoteBulkPatchSchema(BaseModel):
+    filter: NoteFilterSchema
+    content: str
+
+    class Config:
+        extra = "forbid"
+
+    @field_validator("content")
+    def check_content_word_count(cls, value):
+        if not value or value.strip() == "":
+            raise InputEmptyFieldError(ErrorMessages.CONTENT_EMPTY.value)
+        if len(value.split()) > env_config.NOTE_CONTENT_MAX_WORDS:
+            raise InputLengthFieldError(ErrorMessages.CONTENT_TOO_LONG.value)
+        return value
+
+
+class NoteBulkSchemaResponse(BaseModel):
+    note_ids: list[int]
+
+
 class WordCountSchemaResponse(BaseModel):
     word_count: int
 
 
+class VocabularySizeSchemaResponse(BaseModel):
+    vocabulary_size: int
+
+
 class AVGNoteLengthSchemaResponse(BaseModel):
-    average_note_length: float
\ No newline at end of file
+    average_note_length: float
+
+
+class TimelineBucketSchemaResponse(BaseModel):
+    period: str
+    notes_created: int
+    words_created: int
+    notes_updated: int
+    words_updated: int
+    notes_deleted: int
+
+
+class KeywordSchemaResponse(BaseModel):
+    term: str
+    score: float
+
+
+class NoteKeywordsSchemaResponse(BaseModel):
+    note_id: int
+    keywords: list[KeywordSchemaResponse]
+    documents_count: int
+    computed_at: str
+
+
+class ImportErrorSchemaResponse(BaseModel):
+    line: int
+    detail: str
+
+
+class ImportReportSchemaResponse(BaseModel):
+    imported: int
+    skipped: int
+    errors: list[ImportErrorSchemaResponse]
+
+
+class ReadinessSchemaResponse(BaseModel):
+    ready: bool
+    warm_up_seconds: Optional[float]
+    lazy_imports: dict[str, Optional[float]]
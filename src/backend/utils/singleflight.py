@@ -0,0 +1,94 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, Optional, TypeVar
+
+from src.backend.utils.metrics import Metrics
+
+T = TypeVar("T")
+
+
+class _Flight:
+    """The work in flight for a key and the callers waiting for it."""
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+        self.disconnect_checks: list[Callable[[], Awaitable[bool]]] = []
+
+    async def is_abandoned(self) -> bool:
+        """True once every waiting caller disconnected; a caller that cannot tell never does."""
+        checks = list(self.disconnect_checks)
+        if self.waiters > len(checks):
+            return False
+        return all([await check() for check in checks])
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: the first call of a key starts the work in a task of its own,
+    the calls of the same key arriving while it runs await that task and get its result, or its exception.
+    Nothing is kept once the work is done, a later call starts it again: keys must tell apart the inputs
+    the result depends on (e.g. the generation of the corpus it is computed over).
+    A cancelled caller only stops waiting, the work is cancelled once no caller waits for it anymore.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: dict[Hashable, _Flight] = {}
+
+    async def run(
+            self,
+            key: Hashable,
+            work: Callable[[Callable[[], Awaitable[bool]]], Awaitable[T]],
+            is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    ) -> T:
+        """
+        Run the work of a key, or join the run in flight.
+
+        :param key: Identifies the work, equal keys must give equal results.
+        :type key: Hashable
+        :param work: Called with a check telling whether every caller has disconnected, to give up early.
+        :type work: Callable[[Callable[[], Awaitable[bool]]], Awaitable[T]]
+        :param is_disconnected: Tells whether this caller has disconnected.
+        :type is_disconnected: Optional[Callable[[], Awaitable[bool]]]
+        :returns: The result of the work.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._start(key, work)
+            Metrics.increment(f"{self.name}_single_flight", label="leader")
+        else:
+            Metrics.increment(f"{self.name}_single_flight", label="coalesced")
+
+        flight.waiters += 1
+        if is_disconnected is not None:
+            flight.disconnect_checks.append(is_disconnected)
+        try:
+            # the shield keeps the cancellation of one caller from reaching the work shared with the others
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+                Metrics.increment(f"{self.name}_single_flight", label="cancelled")
+            raise
+        finally:
+            flight.waiters -= 1
+            if is_disconnected is not None:
+                flight.disconnect_checks.remove(is_disconnected)
+
+    def in_flight(self) -> int:
+        """Returns the number of keys whose work is running."""
+        return len(self._flights)
+
+    def _start(self, key: Hashable, work: Callable[[Callable[[], Awaitable[bool]]], Awaitable[T]]) -> _Flight:
+        flight = _Flight()
+        flight.task = asyncio.create_task(work(flight.is_abandoned))
+        self._flights[key] = flight
+
+        def forget(task: asyncio.Task) -> None:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            if not task.cancelled():
+                task.exception()  # retrieved here as well, in case every caller is gone
+
+        flight.task.add_done_callback(forget)
+        return flight
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Optional
 
 from pydantic_settings import BaseSettings
 
@@ -17,6 +18,64 @@ class EnvConfig(BaseSettings):
     OPENAI_API_KEY: str
     OPENAI_MODEL: str
 
+    OPENAI_REQUESTS_PER_MINUTE: int = 500
+    OPENAI_TOKENS_PER_MINUTE: int = 200_000
+
+    NOTE_CONTENT_MAX_WORDS: int = 500
+    SUMMARY_CHUNK_WORDS: int = 500
+    SUMMARY_MAX_PARALLEL_CHUNKS: int = 4
+    SUMMARY_MERGE_WITH_MODEL: bool = False
+    SUMMARY_REUSE_MAX_EDIT_RATIO: float = 0.02
+    SUMMARY_FALLBACK_TO_EXTRACTIVE: bool = True
+    SUMMARY_AI_TIMEOUT: float = 30.0
+    SUMMARY_EXTRACTIVE_RATIO: float = 0.3
+    SUMMARY_ADMISSION_MAX_CONCURRENT: int = 16
+    SUMMARY_ADMISSION_MAX_QUEUE: int = 64
+    SUMMARY_ADMISSION_QUEUE_TIMEOUT: float = 10.0
+    SUMMARY_ADMISSION_RETRY_AFTER: float = 5.0
+
+    ANALYTICS_PROCESS_WORKERS: int = 2
+    ANALYTICS_MAX_CONCURRENT_JOBS: int = 2
+    ANALYTICS_OFFLOAD_MIN_NOTES: int = 1000
+    ANALYTICS_READ_CHUNK_ROWS: int = 1000
+
+    KEYWORDS_PER_NOTE: int = 10
+    KEYWORDS_REFRESH_INTERVAL: float = 3600.0
+
+    WORD_SKETCH_WIDTH: int = 2048
+    WORD_SKETCH_DEPTH: int = 4
+    WORD_SKETCH_PRECISION: int = 12
+    WORD_SKETCH_TOP_WORDS: int = 1000
+    WORD_SKETCH_REFRESH_INTERVAL: float = 86400.0
+    DERIVED_STATS_COMPACT_INTERVAL: float = 60.0
+
+    NOTE_CACHE_MAX_ENTRIES: int = 1024
+    NOTE_CACHE_TTL: float = 60.0
+    NOTE_CACHE_VERIFY_VERSION: bool = True
+    NOTE_UPDATE_ATTEMPTS: int = 3
+
+    EXPORT_CHUNK_ROWS: int = 1000
+    IMPORT_CHUNK_ROWS: int = 500
+
+    VERSION_ARCHIVE_DIR: Path = BASE_DIR / "archive"
+    VERSION_ARCHIVE_AFTER_MONTHS: int = 12
+    VERSION_PARTITIONS_AHEAD: int = 3
+    VERSION_PARTITIONS_CHECK_INTERVAL: float = 3600.0
+
+    WARM_UP_DB_CONNECTIONS: int = 2
+    WARM_UP_RETRY_INTERVAL: float = 5.0
+
+    CHANGE_FEED_POLL_INTERVAL: float = 5.0
+    CHANGE_FEED_GAP_TIMEOUT: float = 2.0
+    CHANGE_FEED_GAP_HORIZON: float = 300.0
+    CHANGE_FEED_QUEUE_SIZE: int = 1000
+    CHANGE_FEED_PAGE_ROWS: int = 500
+    CHANGE_FEED_HEARTBEAT: float = 15.0
+    CHANGE_FEED_RETENTION_HOURS: int = 24
+
+    # X-Tenant-ID is trusted as is unless this is set; then requests must carry it in X-Gateway-Secret
+    TENANT_HEADER_SECRET: Optional[str] = None
+
     @property
     def get_db_url(self):
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
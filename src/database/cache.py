@@ -0,0 +1,112 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from src.backend.utils.metrics import Metrics
+from src.config import env_config
+from src.database.database.models import NoteModel
+
+
+class NoteCache:
+    """
+    In-process read-through cache of serialized notes, bounded in size (least recently used entries are evicted
+    first) and in age (entries expire `ttl` seconds after they were stored).
+    Every entry remembers the version number of the note it was built from, so a reader can validate it
+    against the database cheaply when other workers may have written the note, and the tenant owning the note,
+    which is the only one it is served to.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[int, tuple[int, dict, float, str]] = OrderedDict()
+        self._hits = 0
+        self._lookups = 0
+
+    def get(self, id: int, tenant_id: str = NoteModel.DEFAULT_TENANT) -> Optional[tuple[int, dict]]:
+        """
+        Look a note up.
+
+        :param id: The note ID.
+        :type id: int
+        :param tenant_id: The tenant reading the note, the notes of other tenants are misses.
+        :type tenant_id: str
+        :returns: The version number and the payload of the cached note, or None on a miss.
+        :rtype: Optional[tuple[int, dict]]
+        """
+        entry = self._entries.get(id)
+        if entry is not None and entry[2] <= time.monotonic():
+            del self._entries[id]
+            entry = None
+
+        if entry is None or entry[3] != tenant_id:
+            self._record(hit=False)
+            return None
+
+        self._entries.move_to_end(id)
+        self._record(hit=True)
+        return entry[0], entry[1]
+
+    def put(self, id: int, version_number: int, payload: dict, tenant_id: str = NoteModel.DEFAULT_TENANT) -> None:
+        """Stores the payload of a note version, evicting the least recently used notes beyond `max_entries`."""
+        if self.max_entries <= 0:
+            return
+
+        self._entries[id] = (version_number, payload, time.monotonic() + self.ttl, tenant_id)
+        self._entries.move_to_end(id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            Metrics.increment("note_cache", label="evicted")
+
+    def invalidate(self, id: int) -> None:
+        """Forgets a note, called whenever it is written."""
+        if self._entries.pop(id, None) is not None:
+            Metrics.increment("note_cache", label="invalidated")
+
+    def clear(self) -> None:
+        """Forgets every note."""
+        self._entries.clear()
+
+    def _record(self, hit: bool) -> None:
+        """Helper method to update the hit and miss counters and the hit ratio gauge."""
+        self._lookups += 1
+        self._hits += hit
+        Metrics.increment("note_cache", label="hit" if hit else "miss")
+        Metrics.set_gauge("note_cache_hit_ratio", self._hits / self._lookups)
+
+
+# shared by every session of the worker, NoteQuery invalidates it on writes
+note_cache = NoteCache(max_entries=env_config.NOTE_CACHE_MAX_ENTRIES, ttl=env_config.NOTE_CACHE_TTL)
+
+
+class CorpusGenerations:
+    """
+    In-process generation number of the notes of every tenant, bumped whenever this worker writes them.
+    Work over a whole corpus is only shared between the requests that saw the same generation,
+    so a request arriving after a write never gets a result computed before it.
+    Listeners are told of every bump, once the write is committed.
+    """
+
+    def __init__(self):
+        self._generations: dict[str, int] = {}
+        self._listeners: list[Callable[[str], None]] = []
+
+    def get(self, tenant_id: str = NoteModel.DEFAULT_TENANT) -> int:
+        return self._generations.get(tenant_id, 0)
+
+    def bump(self, tenant_id: str = NoteModel.DEFAULT_TENANT) -> None:
+        self._generations[tenant_id] = self.get(tenant_id) + 1
+        for listener in self._listeners:
+            listener(tenant_id)
+
+    def add_listener(self, listener: Callable[[str], None]) -> None:
+        """Calls `listener` with the tenant of every later bump."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+
+# shared by every session of the worker, NoteQuery bumps it on writes
+corpus_generations = CorpusGenerations()
@@ -1,6 +1,6 @@
-from datetime import datetime
+from datetime import date, datetime
 
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import DDL, JSON, ForeignKey, Index, PrimaryKeyConstraint, UniqueConstraint, event, func
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -12,30 +12,197 @@ class Base(DeclarativeBase):
     version_number: Mapped[int]
 
 
+def _count_words(context) -> int:
+    """Default of NoteModel.word_count, computed from the inserted content."""
+    return len(context.get_current_parameters()["content"].split())
+
+
+def _not_postgresql(ddl, target, bind, dialect, **kwargs) -> bool:
+    """DDL condition of the schema items replaced on PostgreSQL."""
+    return dialect.name != "postgresql"
+
+
 class NoteModel(Base):
     __tablename__ = "note"
+    __table_args__ = (
+        # titles are only unique within a tenant
+        UniqueConstraint("tenant_id", "title", name="uq_note_tenant_title"),
+        # every query is scoped to one tenant, so every index leads with it: the listing filters and sorts on
+        # these columns, the ID keeps the order stable between equal values
+        Index("ix_note_tenant_id", "tenant_id", "id"),
+        Index("ix_note_created_at", "tenant_id", "created_at", "id"),
+        Index("ix_note_updated_at", "tenant_id", "updated_at", "id"),
+        Index("ix_note_word_count", "tenant_id", "word_count", "id"),
+        # byte-wise ordering of the titles, for title prefix searches whatever the database collation
+        Index("ix_note_title_pattern", "tenant_id", "title", postgresql_ops={"title": "text_pattern_ops"}).ddl_if(
+            dialect="postgresql"
+        ),
+    )
+
+    # the tenant of the requests not naming one, and of the notes written before tenants existed
+    DEFAULT_TENANT = "default"
 
-    title: Mapped[str] = mapped_column(unique=True, nullable=False)
+    tenant_id: Mapped[str] = mapped_column(default=DEFAULT_TENANT, server_default=DEFAULT_TENANT)
+    title: Mapped[str] = mapped_column(nullable=False)
     updated_at: Mapped[datetime] = mapped_column(
         default=func.now(), onupdate=func.now()
     )
+    # kept in sync with the content on insert and by the updates of NoteQuery, so word count ranges hit an index
+    word_count: Mapped[int] = mapped_column(default=_count_words)
 
     # one Note can have many NoteVersions
     versions: Mapped[list["NoteVersionModel"]] = relationship(
         argument="NoteVersionModel",
         back_populates="note",
         cascade="all, delete",
+        # the database deletes the versions (ON DELETE CASCADE), they are never loaded just to be deleted
+        passive_deletes=True,
     )
 
 
 class NoteVersionModel(Base):
     __tablename__ = "note_version"
+    __table_args__ = (
+        # range-partitioned by created_at on PostgreSQL (see partitions.py), where a primary key has to include
+        # the partition key: it becomes (id, created_at) there (see below), SQLite keeps a single table
+        PrimaryKeyConstraint("id").ddl_if(callable_=_not_postgresql),
+        Index("ix_note_version_note_id", "note_id", "version_number"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     title: Mapped[str]
-    note_id: Mapped[int] = mapped_column(ForeignKey("note.id"))
+    note_id: Mapped[int] = mapped_column(ForeignKey("note.id", ondelete="CASCADE"))
 
     # many NoteVersions belong to one Note
     note: Mapped["NoteModel"] = relationship(
         argument="NoteModel",
         back_populates="versions",
     )
+
+
+# a table holds a single primary key and SQLite only autoincrements one of a single column, so the key of the
+# partitioned table is added by DDL; the mapper keeps identifying versions by ID, which the sequence keeps unique
+event.listen(
+    NoteVersionModel.__table__,
+    "after_create",
+    DDL("ALTER TABLE %(table)s ADD CONSTRAINT pk_note_version PRIMARY KEY (id, created_at)").execute_if(
+        dialect="postgresql"
+    ),
+)
+
+
+# mapped through the registry instead of subclassing Base, the note columns declared there do not belong here
+@Base.registry.mapped
+class NoteVersionArchiveModel:
+    """Catalog of the note versions moved to compressed files, read back when a version lookup reaches their range."""
+
+    __tablename__ = "note_version_archive"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    # the versions created within [range_start, range_end), like the monthly partition they come from
+    range_start: Mapped[datetime]
+    range_end: Mapped[datetime]
+    path: Mapped[str] = mapped_column(unique=True)
+    rows_count: Mapped[int]
+    archived_at: Mapped[datetime] = mapped_column(default=func.now())
+
+
+@Base.registry.mapped
+class NoteDailyStatsModel:
+    """Daily rollup of note activity per tenant, maintained by the write path so time ranges never scan the notes."""
+
+    __tablename__ = "note_daily_stats"
+
+    tenant_id: Mapped[str] = mapped_column(primary_key=True)
+    day: Mapped[date] = mapped_column(primary_key=True)
+    notes_created: Mapped[int] = mapped_column(default=0)
+    words_created: Mapped[int] = mapped_column(default=0)
+    notes_updated: Mapped[int] = mapped_column(default=0)
+    words_updated: Mapped[int] = mapped_column(default=0)
+    notes_deleted: Mapped[int] = mapped_column(default=0)
+
+
+@Base.registry.mapped
+class TermStatsModel:
+    """Number of notes of a tenant containing each term, maintained by the write path for the keyword IDF."""
+
+    __tablename__ = "term_stats"
+
+    # the empty term never comes out of tokenization, its row holds the number of notes of the tenant instead
+    DOCUMENTS_COUNT_TERM = ""
+    # writes add to one of these rows (picked by note ID) instead, so they do not all queue on the same row;
+    # the periodic compaction folds them into the row above. Terms never contain whitespace
+    DOCUMENTS_COUNT_SHARDS = tuple(f" {shard}" for shard in range(16))
+
+    tenant_id: Mapped[str] = mapped_column(primary_key=True)
+    term: Mapped[str] = mapped_column(primary_key=True)
+    document_frequency: Mapped[int] = mapped_column(default=0)
+
+
+@Base.registry.mapped
+class NoteKeywordsModel:
+    """Top TF-IDF keywords of a note, computed when the note is written and refreshed periodically."""
+
+    __tablename__ = "note_keywords"
+
+    note_id: Mapped[int] = mapped_column(ForeignKey("note.id", ondelete="CASCADE"), primary_key=True)
+    keywords: Mapped[list] = mapped_column(JSON)
+    documents_count: Mapped[int]
+    computed_at: Mapped[datetime] = mapped_column(default=func.now(), onupdate=func.now())
+
+
+@Base.registry.mapped
+class WordCountSketchModel:
+    """Counters of the Count-Min sketch of the words of the notes of a tenant, maintained by the write path."""
+
+    __tablename__ = "word_count_sketch"
+
+    tenant_id: Mapped[str] = mapped_column(primary_key=True)
+    row_index: Mapped[int] = mapped_column(primary_key=True)
+    column_index: Mapped[int] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(default=0)
+
+
+@Base.registry.mapped
+class WordHeavyHitterModel:
+    """Words of a tenant with the highest Count-Min estimates, the candidates of the approximate most common words."""
+
+    __tablename__ = "word_heavy_hitter"
+    __table_args__ = (Index("ix_word_heavy_hitter_count", "tenant_id", "count"),)
+
+    tenant_id: Mapped[str] = mapped_column(primary_key=True)
+    term: Mapped[str] = mapped_column(primary_key=True)
+    count: Mapped[int]
+
+
+@Base.registry.mapped
+class WordVocabularySketchModel:
+    """Registers of the HyperLogLog sketch of the distinct words of a tenant, maintained by the write path."""
+
+    __tablename__ = "word_vocabulary_sketch"
+
+    tenant_id: Mapped[str] = mapped_column(primary_key=True)
+    register: Mapped[int] = mapped_column(primary_key=True)
+    rank: Mapped[int]
+
+
+@Base.registry.mapped
+class NoteChangeModel:
+    """
+    Log of the writes of notes, one row per created, updated or deleted note, written by the transaction of the write;
+    the change feed streams it in sequence order and resumes from a sequence.
+    """
+
+    __tablename__ = "note_change"
+    __table_args__ = (Index("ix_note_change_tenant_sequence", "tenant_id", "sequence"),)
+
+    # channel of the NOTIFY sent on PostgreSQL with every write, the payload is the tenant
+    NOTIFY_CHANNEL = "note_change"
+
+    sequence: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    tenant_id: Mapped[str]
+    # no foreign key, the changes of a note outlive it
+    note_id: Mapped[int]
+    action: Mapped[str]
+    version_number: Mapped[int]
+    changed_at: Mapped[datetime] = mapped_column(default=func.now(), index=True)
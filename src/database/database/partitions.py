@@ -0,0 +1,114 @@
+import re
+from datetime import datetime
+
+from sqlalchemy import event, text
+from sqlalchemy.engine.base import Connection
+from sqlalchemy.schema import Table
+
+from src.config import env_config
+from src.database.database.models import NoteVersionModel
+
+
+class NoteVersionPartitions:
+    """
+    Monthly range partitions of note_version on PostgreSQL (`note_version_pYYYYMM`), next to a DEFAULT partition
+    catching the months without one. A version is stamped with its own creation time, so new versions always go to
+    the partition of the current month, and an archived month never receives versions again.
+    Partition bounds are inlined as literals, DDL statements take no bind parameters.
+    """
+
+    TABLE = NoteVersionModel.__tablename__
+    DEFAULT_PARTITION = f"{TABLE}_default"
+    PREFIX = f"{TABLE}_p"
+    _NAME = re.compile(rf"^{PREFIX}\d{{6}}$")
+
+    @staticmethod
+    @event.listens_for(NoteVersionModel.__table__, "after_create")
+    def create_partitions_after_create(target: Table, connection: Connection, **kwargs) -> None:
+        if connection.dialect.name != "postgresql":
+            return
+        table, default = NoteVersionPartitions.TABLE, NoteVersionPartitions.DEFAULT_PARTITION
+        connection.exec_driver_sql(f"CREATE TABLE {default} PARTITION OF {table} DEFAULT")
+        NoteVersionPartitions.create_upcoming(connection)
+
+    @staticmethod
+    def create_upcoming(connection: Connection) -> list[str]:
+        """
+        Creates the partitions of the current month and of the next `VERSION_PARTITIONS_AHEAD` months if missing,
+        moving their rows out of the DEFAULT partition. The current month is the one of the database clock,
+        which stamps the versions, whatever the time zone of the application.
+
+        :returns: The names of the created partitions.
+        """
+        existing = NoteVersionPartitions.list_partitions(connection)
+        current = NoteVersionPartitions.month_start(
+            connection.execute(text("SELECT date_trunc('month', now())")).scalar_one()
+        )
+        created = []
+        for offset in range(env_config.VERSION_PARTITIONS_AHEAD + 1):
+            month = NoteVersionPartitions.add_months(current, offset)
+            name = NoteVersionPartitions.partition_name(month)
+            if name not in existing:
+                NoteVersionPartitions.create_partition(connection, month)
+                created.append(name)
+        return created
+
+    @staticmethod
+    def create_partition(connection: Connection, month: datetime) -> None:
+        """
+        Creates the partition of a month. It is filled and attached as a plain table, a partition created
+        directly would fail while the DEFAULT partition holds rows of its range.
+        """
+        table, default = NoteVersionPartitions.TABLE, NoteVersionPartitions.DEFAULT_PARTITION
+        name = NoteVersionPartitions.partition_name(month)
+        start = f"{month:%Y-%m-%d %H:%M:%S}"
+        end = f"{NoteVersionPartitions.add_months(month, 1):%Y-%m-%d %H:%M:%S}"
+        connection.exec_driver_sql(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        connection.exec_driver_sql(
+            f"WITH moved AS (DELETE FROM {default} WHERE created_at >= '{start}' AND created_at < '{end}' RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        )
+        connection.exec_driver_sql(
+            f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+
+    @staticmethod
+    def list_partitions(connection: Connection) -> dict[str, bool]:
+        """
+        Lists the monthly partitions, attached or not: a detached partition is one an interrupted archive run
+        has not dropped yet.
+
+        :returns: Whether every partition is attached, by name.
+        """
+        rows = connection.execute(
+            text("SELECT relname, relispartition FROM pg_class WHERE relkind = 'r' AND relname LIKE :pattern"),
+            {"pattern": f"{NoteVersionPartitions.PREFIX}%"},
+        )
+        return {name: attached for name, attached in rows if NoteVersionPartitions._NAME.match(name)}
+
+    @staticmethod
+    def detach(connection: Connection, name: str) -> None:
+        """Detaches a partition, its rows stay in a plain table of the same name."""
+        connection.exec_driver_sql(f"ALTER TABLE {NoteVersionPartitions.TABLE} DETACH PARTITION {name}")
+
+    @staticmethod
+    def drop(connection: Connection, name: str) -> None:
+        """Drops a detached partition."""
+        connection.exec_driver_sql(f"DROP TABLE {name}")
+
+    @staticmethod
+    def partition_name(month: datetime) -> str:
+        return f"{NoteVersionPartitions.PREFIX}{month:%Y%m}"
+
+    @staticmethod
+    def partition_month(name: str) -> datetime:
+        return datetime.strptime(name.removeprefix(NoteVersionPartitions.PREFIX), "%Y%m")
+
+    @staticmethod
+    def month_start(value: datetime) -> datetime:
+        return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+
+    @staticmethod
+    def add_months(month: datetime, count: int) -> datetime:
+        year, index = divmod(month.year * 12 + month.month - 1 + count, 12)
+        return month.replace(year=year, month=index + 1)
@@ -1,57 +1,1061 @@
-from typing import Optional
+import asyncio
+import gzip
+import json
+import os
+from collections import Counter
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Optional
 
-from sqlalchemy import select
+from sqlalchemy import (
+    CTE,
+    ColumnClause,
+    Integer,
+    Select,
+    String,
+    TableClause,
+    case,
+    cast,
+    delete,
+    false,
+    func,
+    insert,
+    null,
+    select,
+    union_all,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.config import env_config
+from src.database.cache import corpus_generations, note_cache
 from src.database.database.decorator import handle_sqlalchemy_error
-from src.database.database.models import NoteModel
+from src.database.database.models import (
+    NoteModel,
+    NoteChangeModel,
+    NoteVersionModel,
+    NoteVersionArchiveModel,
+    NoteDailyStatsModel,
+    NoteKeywordsModel,
+    TermStatsModel,
+    WordCountSketchModel,
+    WordHeavyHitterModel,
+    WordVocabularySketchModel,
+)
+from src.database.database.partitions import NoteVersionPartitions
+from src.database.database.triggers import (
+    NoteChangeTriggerQuery,
+    NoteKeywordTriggerQuery,
+    NoteStatsTriggerQuery,
+    WordSketchTriggerQuery,
+)
+from src.thirdweb.analytic.service import NoteKeywordService
+from src.thirdweb.analytic.sketch import CountMinSketch, HyperLogLog
 
 
 class NoteQuery:
-    """Database operations for NoteModel."""
+    """Database operations for NoteModel, scoped to the notes of one tenant."""
 
     __MODEL = NoteModel
 
-    def __init__(self, session: AsyncSession):
-        """Initialize NoteQuery with an async database session."""
+    def __init__(self, session: AsyncSession, tenant_id: str = NoteModel.DEFAULT_TENANT):
+        """Initialize NoteQuery with an async database session and the tenant whose notes it reads and writes."""
         self.session = session
+        self.tenant_id = tenant_id
 
     @handle_sqlalchemy_error
     async def create(self, data: dict) -> NoteModel:
         """Create a new note and return its ID."""
-        obj = self.__MODEL(**data)
+        obj = self.__MODEL(**{**data, "tenant_id": self.tenant_id})
         self.session.add(obj)
         await self.session.commit()
+        corpus_generations.bump(self.tenant_id)
         return obj.id
 
+    @handle_sqlalchemy_error
+    async def create_many(self, data: list[dict]) -> None:
+        """Create several notes in one transaction."""
+        self.session.add_all([self.__MODEL(**{**item, "tenant_id": self.tenant_id}) for item in data])
+        await self.session.commit()
+        corpus_generations.bump(self.tenant_id)
+        # committed objects are not needed anymore, keep the identity map from growing during bulk loads
+        self.session.expunge_all()
+
     @handle_sqlalchemy_error
     async def get_by_id(self, id: int) -> Optional[NoteModel]:
         """Retrieve a note by its ID."""
-        stmt = select(self.__MODEL).where(self.__MODEL.id == id)
+        stmt = select(self.__MODEL).where(self.__MODEL.tenant_id == self.tenant_id, self.__MODEL.id == id)
         res = await self.session.execute(stmt)
         obj = res.scalar_one_or_none()
         return obj
 
+    @handle_sqlalchemy_error
+    async def get_version_number(self, id: int) -> Optional[int]:
+        """Retrieve only the current version number of a note."""
+        stmt = select(self.__MODEL.version_number).where(
+            self.__MODEL.tenant_id == self.tenant_id, self.__MODEL.id == id
+        )
+        res = await self.session.execute(stmt)
+        return res.scalar_one_or_none()
+
     @handle_sqlalchemy_error
     async def get_all(self) -> Optional[list[NoteModel]]:
-        """Retrieve all notes."""
-        stmt = select(self.__MODEL)
+        """Retrieve all notes of the tenant."""
+        stmt = select(self.__MODEL).where(self.__MODEL.tenant_id == self.tenant_id).order_by(self.__MODEL.id)
         res = await self.session.execute(stmt)
         objs = res.scalars().all()
         return objs
 
     @handle_sqlalchemy_error
-    async def put(self, obj: NoteModel, data: dict) -> None:
-        """Update a note with new data."""
-        for key, value in data.items():
-            if hasattr(obj, key):
-                setattr(obj, key, value)
+    async def get_many(self, ids: list[int]) -> list[NoteModel]:
+        """Retrieve the notes of the tenant with the given IDs, in the order of `ids`, leaving out the missing ones."""
+        stmt = select(self.__MODEL).where(self.__MODEL.tenant_id == self.tenant_id, self.__MODEL.id.in_(ids))
+        res = await self.session.execute(stmt)
+        objs = {obj.id: obj for obj in res.scalars().all()}
+        return [objs[id] for id in ids if id in objs]
+
+    async def iterate_contents(self, batch_size: int = 1000) -> AsyncIterator[list]:
+        """
+        Read the ID and content of every note of the tenant as raw rows, one batch at a time, in ID order,
+        without loading a single ORM object.
+        """
+        async for batch in _iterate_note_contents(self.session, self.tenant_id, batch_size):
+            yield batch
+
+    @handle_sqlalchemy_error
+    async def get_filtered(
+            self,
+            filters: dict,
+            sort: str = "id",
+            descending: bool = False,
+    ) -> list[NoteModel]:
+        """
+        Retrieve the notes matching the filters (see `_filter_conditions`), ordered by `sort` and then by ID.
+        Every filter and sort key is backed by an index of NoteModel led by the tenant.
+        """
+        connection = await self.session.connection()
+        stmt = self.listing_statement(
+            filters, sort=sort, descending=descending, dialect=connection.dialect.name, tenant_id=self.tenant_id
+        )
+        res = await self.session.execute(stmt)
+        return res.scalars().all()
+
+    @classmethod
+    def listing_statement(
+            cls,
+            filters: dict,
+            sort: str,
+            descending: bool,
+            dialect: str,
+            tenant_id: str = NoteModel.DEFAULT_TENANT,
+    ):
+        """Build the SELECT of `get_filtered`, exposed so its plan can be inspected."""
+        columns = [getattr(cls.__MODEL, sort)] + ([cls.__MODEL.id] if sort != "id" else [])
+        return (
+            select(cls.__MODEL)
+            .where(cls.__MODEL.tenant_id == tenant_id, *cls._filter_conditions(filters, dialect=dialect))
+            .order_by(*(column.desc() if descending else column.asc() for column in columns))
+        )
+
+    async def stream_all(self, since_id: int = 0, chunk_size: int = 1000) -> AsyncIterator[list[dict]]:
+        """
+        Stream the notes of the tenant with an ID greater than `since_id`, in ID order, through a server-side cursor.
+        Rows are fetched `chunk_size` at a time as plain mappings, so they never pile up in the identity map.
+        """
+        table = self.__MODEL.__table__
+        stmt = (
+            select(table)
+            .where(table.c.tenant_id == self.tenant_id, table.c.id > since_id)
+            .order_by(table.c.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        res = await self.session.stream(stmt)
+        async for partition in res.mappings().partitions():
+            yield [dict(row) for row in partition]
+
+    @handle_sqlalchemy_error
+    async def get_versions(self, note_ids: list[int]) -> list[dict]:
+        """
+        Retrieve the versions of the given notes as plain mappings, ordered by note and version,
+        including the versions moved to archive files (see NoteVersionArchiveQuery).
+        """
+        versions = NoteVersionModel.__table__
+        stmt = (
+            select(versions)
+            .where(versions.c.note_id.in_(note_ids))
+            .order_by(versions.c.note_id, versions.c.version_number, versions.c.id)
+        )
+        res = await self.session.execute(stmt)
+        rows = [dict(row) for row in res.mappings()]
+
+        archived = await NoteVersionArchiveQuery(self.session).get_versions(note_ids)
+        if archived:
+            rows = sorted(rows + archived, key=lambda row: (row["note_id"], row["version_number"], row["id"]))
+        return rows
+
+    @handle_sqlalchemy_error
+    async def update_returning(
+            self,
+            id: int,
+            data: dict,
+            expected_versions: Optional[list[int]] = None,
+    ) -> Optional[dict]:
+        """
+        Update a note, bump its version and record the new version without loading the note first.
+        On PostgreSQL the update, the version insert, the daily stats and the change log are a single statement
+        (data-modifying CTEs), on SQLite they are statements of the same transaction (see `_update_where`).
+
+        :param expected_versions: Only update the note if it is at one of these versions.
+        :returns: The updated note, with its content before the update as `old_content` if the content was set,
+            or None if no note with this ID (and expected version) exists.
+        """
+        conditions = [self.__MODEL.tenant_id == self.tenant_id, self.__MODEL.id == id]
+        if expected_versions is not None:
+            conditions.append(self.__MODEL.version_number.in_(expected_versions))
+
+        rows = await self._update_where(conditions, data)
+        return rows[0] if rows else None
+
+    @handle_sqlalchemy_error
+    async def bulk_update(self, filters: dict, data: dict) -> list[int]:
+        """
+        Apply the same changes to every note matching the filters, with one statement per table.
+        The replaced contents are read by the update itself, so the derived tables follow the change.
+
+        :returns: The IDs of the updated notes.
+        """
+        connection = await self.session.connection()
+        conditions = self._filter_conditions(filters, dialect=connection.dialect.name)
+        rows = await self._update_where([self.__MODEL.tenant_id == self.tenant_id, *conditions], data)
+        return [row["id"] for row in rows]
+
+    @handle_sqlalchemy_error
+    async def delete_returning(self, id: int, expected_versions: Optional[list[int]] = None) -> Optional[dict]:
+        """
+        Delete a note and, through the ON DELETE CASCADE foreign keys, its versions and keywords
+        without loading them first; on PostgreSQL the daily stats and the change log follow in the same statement.
+
+        :param expected_versions: Only delete the note if it is at one of these versions.
+        :returns: The ID, content and version number of the deleted note, or None if no note with this ID
+            (and expected version) exists.
+        """
+        conditions = [self.__MODEL.tenant_id == self.tenant_id, self.__MODEL.id == id]
+        if expected_versions is not None:
+            conditions.append(self.__MODEL.version_number.in_(expected_versions))
+
+        rows = await self._delete_where(conditions)
+        return rows[0] if rows else None
+
+    @handle_sqlalchemy_error
+    async def bulk_delete(self, filters: dict) -> list[int]:
+        """
+        Delete every note matching the filters, with their versions and keywords, in one statement per table.
+
+        :returns: The IDs of the deleted notes.
+        """
+        connection = await self.session.connection()
+        conditions = self._filter_conditions(filters, dialect=connection.dialect.name)
+        rows = await self._delete_where([self.__MODEL.tenant_id == self.tenant_id, *conditions])
+        return [row["id"] for row in rows]
+
+    async def _update_where(self, conditions: list, data: dict) -> list[dict]:
+        """
+        Helper method to update the matching notes, insert their new versions and maintain the derived tables.
+        When the content is set, the replaced contents are captured as `old_content` in the returned rows.
+        """
+        table, versions = self.__MODEL.__table__, NoteVersionModel.__table__
+        values = dict(data)
+        if "content" in data:
+            # the statement bypasses the ORM listener maintaining the word count
+            values["word_count"] = len(data["content"].split())
+        stmt = update(table).values(**values, version_number=table.c.version_number + 1)
+
+        connection = await self.session.connection()
+        postgresql = connection.dialect.name == "postgresql"
+        if postgresql:
+            words_updated = 0
+            if "content" in data:
+                # the locked rows are read at their latest committed version, which is the one the update replaces
+                old = select(table.c.id, table.c.content).where(*conditions).with_for_update().subquery("old")
+                stmt = stmt.where(table.c.id == old.c.id).returning(*table.c, old.c.content.label("old_content"))
+                updated = stmt.cte("updated")
+                words_updated = select(
+                    func.coalesce(
+                        func.sum(case((updated.c.old_content != updated.c.content, updated.c.word_count), else_=0)), 0
+                    )
+                ).scalar_subquery()
+            else:
+                updated = stmt.where(*conditions).returning(*table.c).cte("updated")
+            values = self._version_values(updated.c)
+            versioned = insert(versions).from_select(list(values), select(*values.values())).cte("versioned")
+            stmt = self._logged_statement(
+                updated,
+                "updated",
+                notes_updated=select(func.count()).select_from(updated).scalar_subquery(),
+                words_updated=words_updated,
+            )
+            rows = [dict(row) for row in (await self.session.execute(stmt.add_cte(versioned))).mappings()]
+        else:
+            old_contents = {}
+            if "content" in data:
+                # RETURNING cannot read the previous values on SQLite, they are selected first
+                selected = await self.session.execute(select(table.c.id, table.c.content).where(*conditions))
+                old_contents = dict(selected.all())
+                conditions = [*conditions, table.c.id.in_(old_contents)]
+            # SQLite has no data-modifying CTEs, the versions are inserted by a second statement
+            stmt = stmt.where(*conditions).returning(*table.c)
+            rows = [dict(row) for row in (await self.session.execute(stmt)).mappings()]
+            if rows:
+                await self.session.execute(insert(versions), [self._version_values(row) for row in rows])
+            if "content" in data:
+                for row in rows:
+                    row["old_content"] = old_contents[row["id"]]
+
+        if not rows:
+            await self.session.rollback()
+            return rows
+
+        ids = [row["id"] for row in rows]
+        old_contents = [row["old_content"] for row in rows] if "content" in data else None
+        content_changed = "content" in data and any(content != data["content"] for content in old_contents)
+
+        if postgresql:
+            if content_changed:
+                await self._maintain_derived(
+                    NoteKeywordTriggerQuery.reindex_increments(data["content"], old_contents),
+                    WordSketchTriggerQuery.count_changes([data["content"]] * len(ids), old_contents),
+                    keyword_note_ids=ids,
+                    words=NoteKeywordService.tokenize(data["content"]),
+                )
+        else:
+            def maintain(sync_session) -> None:
+                # the statements above bypass the ORM, so its write listeners are run by hand
+                connection = sync_session.connection()
+                NoteStatsTriggerQuery.increment_daily_stats(
+                    connection,
+                    self.tenant_id,
+                    notes_updated=len(rows),
+                    # the words of the notes whose content changed
+                    words_updated=sum(
+                        row["word_count"] for row in rows if "content" in data and row["old_content"] != row["content"]
+                    ),
+                )
+                NoteChangeTriggerQuery.log_changes(connection, self.tenant_id, "updated", rows)
+                if content_changed:
+                    NoteKeywordTriggerQuery.reindex_notes(
+                        connection, self.tenant_id, note_ids=ids, content=data["content"], old_contents=old_contents
+                    )
+                    WordSketchTriggerQuery.count_words(
+                        connection,
+                        self.tenant_id,
+                        WordSketchTriggerQuery.count_changes([data["content"]] * len(ids), old_contents),
+                    )
+
+            await self.session.run_sync(maintain)
+
+        await self.session.commit()
+        corpus_generations.bump(self.tenant_id)
+        for id in ids:
+            note_cache.invalidate(id)
+        return rows
+
+    async def _delete_where(self, conditions: list) -> list[dict]:
+        """Helper method to delete the matching notes and maintain the derived tables."""
+        table, versions = self.__MODEL.__table__, NoteVersionModel.__table__
+        returned = (table.c.id, table.c.content, table.c.version_number)
+        connection = await self.session.connection()
+        postgresql = connection.dialect.name == "postgresql"
+        if postgresql:
+            deleted = delete(table).where(*conditions).returning(*returned).cte("deleted")
+            stmt = self._logged_statement(
+                deleted, "deleted", notes_deleted=select(func.count()).select_from(deleted).scalar_subquery()
+            )
+        else:
+            # SQLite only enforces foreign keys when asked to, the versions are deleted by hand
+            await self.session.execute(
+                delete(versions).where(versions.c.note_id.in_(select(table.c.id).where(*conditions)))
+            )
+            stmt = delete(table).where(*conditions).returning(*returned)
+
+        rows = [dict(row) for row in (await self.session.execute(stmt)).mappings()]
+        if not rows:
+            await self.session.rollback()
+            return rows
+
+        ids = [row["id"] for row in rows]
+        contents = [row["content"] for row in rows]
+
+        if postgresql:
+            await self._maintain_derived(
+                NoteKeywordTriggerQuery.unindex_increments(ids, contents),
+                WordSketchTriggerQuery.count_changes([], contents),
+            )
+        else:
+            def maintain(sync_session) -> None:
+                # the statement above bypasses the ORM, so its write listeners are run by hand
+                connection = sync_session.connection()
+                NoteStatsTriggerQuery.increment_daily_stats(connection, self.tenant_id, notes_deleted=len(rows))
+                NoteChangeTriggerQuery.log_changes(connection, self.tenant_id, "deleted", rows)
+                NoteKeywordTriggerQuery.unindex_notes(connection, self.tenant_id, note_ids=ids, contents=contents)
+                WordSketchTriggerQuery.count_words(
+                    connection, self.tenant_id, WordSketchTriggerQuery.count_changes([], contents)
+                )
+
+            await self.session.run_sync(maintain)
+
+        await self.session.commit()
+        corpus_generations.bump(self.tenant_id)
+        for id in ids:
+            note_cache.invalidate(id)
+        return rows
+
+    def _logged_statement(self, written: CTE, action: str, **increments) -> Select:
+        """
+        Helper method to select the rows of a data-modifying CTE on PostgreSQL along with what every write logs:
+        the daily stats (`increments` are expressions over the CTE), the change log and the NOTIFY of the feeds.
+        """
+        counted = NoteStatsTriggerQuery.daily_stats_statement("postgresql", self.tenant_id, **increments).cte("counted")
+        logged = NoteChangeTriggerQuery.log_changes_statement(self.tenant_id, action, written).cte("logged")
+        # unlike the data-modifying ones, a CTE only runs when the statement reads it
+        notified = NoteChangeTriggerQuery.notify_statement(self.tenant_id).cte("notified")
+        return select(written).add_cte(counted, logged).where(select(notified).exists())
+
+    async def _maintain_derived(
+            self,
+            frequency_increments: dict[str, int],
+            word_increments: dict[str, int],
+            keyword_note_ids: Optional[list[int]] = None,
+            words: Optional[list[str]] = None,
+    ) -> None:
+        """
+        Helper method to apply the changes of written notes to the keywords and the word sketches on PostgreSQL,
+        in two statements. The first one upserts the document frequencies, the counters and the registers
+        (data-modifying CTEs) and returns what the keywords and the estimates are computed from: the upserted rows,
+        completed with the untouched ones. The second one upserts the keywords of the notes sharing `words`
+        (if given) and the heavy hitters. Both depend on the replaced contents, so they cannot join the write itself.
+        """
+        terms, cells = TermStatsModel.__table__, WordCountSketchModel.__table__
+        word_increments = {term: count for term, count in word_increments.items() if count}
+        ranked = NoteKeywordTriggerQuery.ranking_terms(words) if words is not None else set()
+        sketch = CountMinSketch(width=env_config.WORD_SKETCH_WIDTH, depth=env_config.WORD_SKETCH_DEPTH)
+
+        # every read is a (term, row_index, column_index, value) row: a document frequency or a counter
+        no_term, no_cell = cast(null(), String), cast(null(), Integer)
+        upserts, reads = [], []
+        if frequency_increments:
+            stmt = NoteKeywordTriggerQuery.document_frequencies_statement(
+                "postgresql", self.tenant_id, frequency_increments
+            )
+            frequencies = stmt.returning(terms.c.term, terms.c.document_frequency).cte("frequencies")
+            upserts.append(frequencies)
+            reads.append(select(frequencies.c.term, no_cell, no_cell, frequencies.c.document_frequency))
+        untouched_terms = ranked - set(frequency_increments)
+        if untouched_terms:
+            reads.append(
+                select(terms.c.term, no_cell, no_cell, terms.c.document_frequency).where(
+                    terms.c.tenant_id == self.tenant_id, terms.c.term.in_(untouched_terms)
+                )
+            )
+
+        if word_increments:
+            untouched_cells = WordSketchTriggerQuery.cells_of(sketch, list(word_increments))
+            stmt = WordSketchTriggerQuery.counters_statement("postgresql", self.tenant_id, sketch, word_increments)
+            if stmt is not None:
+                counters = stmt.returning(cells.c.row_index, cells.c.column_index, cells.c.count).cte("counters")
+                upserts.append(counters)
+                reads.append(select(no_term, counters.c.row_index, counters.c.column_index, counters.c.count))
+                rows, columns, _ = sketch.increments(word_increments)
+                untouched_cells -= set(zip(rows.tolist(), columns.tolist()))
+            if untouched_cells:
+                reads.append(
+                    select(no_term, cells.c.row_index, cells.c.column_index, cells.c.count).where(
+                        WordSketchTriggerQuery.cells_condition(self.tenant_id, untouched_cells)
+                    )
+                )
+            stmt = WordSketchTriggerQuery.registers_statement("postgresql", self.tenant_id, word_increments)
+            if stmt is not None:
+                upserts.append(stmt.cte("registers"))
+
+        if not upserts and not reads:
+            return
+        # the upserts run even if nothing is read
+        stmt = union_all(*reads) if len(reads) > 1 else reads[0] if reads else select(no_term).where(false())
+        document_frequencies = {}
+        for term, row, column, value in (await self.session.execute(stmt.add_cte(*upserts))).all():
+            if term is not None:
+                document_frequencies[term] = value
+            else:
+                sketch.table[row, column] = value
+
+        keywords = heavy_hitters = None
+        if words is not None:
+            keywords = NoteKeywordTriggerQuery.keywords_statement(
+                "postgresql", NoteKeywordTriggerQuery.rank_keywords(keyword_note_ids, words, document_frequencies)
+            )
+        if word_increments:
+            estimated = list(word_increments)
+            heavy_hitters = WordSketchTriggerQuery.heavy_hitters_statement(
+                "postgresql", self.tenant_id, dict(zip(estimated, sketch.estimate(estimated).tolist()))
+            )
+        if keywords is not None and heavy_hitters is not None:
+            await self.session.execute(heavy_hitters.add_cte(keywords.cte("keywords")))
+        elif keywords is not None or heavy_hitters is not None:
+            await self.session.execute(keywords if keywords is not None else heavy_hitters)
+
+    @staticmethod
+    def _filter_conditions(filters: dict, dialect: str) -> list:
+        """Helper method to translate note filters (see NoteFilterSchema and the listing) into WHERE conditions."""
+        model = NoteModel
+        conditions = []
+        if filters.get("ids") is not None:
+            conditions.append(model.id.in_(filters["ids"]))
+        if filters.get("title_contains"):
+            conditions.append(model.title.contains(filters["title_contains"], autoescape=True))
+        if filters.get("title_prefix"):
+            conditions.extend(NoteQuery._prefix_conditions(model.title, filters["title_prefix"], dialect))
+        for field in ("created_at", "updated_at"):
+            prefix = field.removesuffix("_at")
+            if filters.get(f"{prefix}_from") is not None:
+                conditions.append(getattr(model, field) >= filters[f"{prefix}_from"])
+            if filters.get(f"{prefix}_to") is not None:
+                conditions.append(getattr(model, field) <= filters[f"{prefix}_to"])
+        if filters.get("min_words") is not None:
+            conditions.append(model.word_count >= filters["min_words"])
+        if filters.get("max_words") is not None:
+            conditions.append(model.word_count <= filters["max_words"])
+        return conditions
+
+    @staticmethod
+    def _prefix_conditions(column, prefix: str, dialect: str) -> list:
+        """
+        Helper method to match a string prefix with a byte-wise range, which any B-tree index on the column serves,
+        unlike a LIKE pattern (case-insensitive on SQLite, collation-dependent on PostgreSQL).
+        """
+        # UTF-8 byte order is code point order: the matching strings sort between the prefix and its successor
+        successor = ord(prefix[-1]) + 1
+        if 0xD800 <= successor <= 0xDFFF:
+            successor = 0xE000  # surrogates are not characters
+        upper = prefix[:-1] + chr(successor) if successor <= 0x10FFFF else None
+        if dialect == "postgresql":
+            # the byte-wise operators of text_pattern_ops (ix_note_title_pattern)
+            greater_equal, less = column.op("~>=~", is_comparison=True), column.op("~<~", is_comparison=True)
+        else:
+            greater_equal, less = column.__ge__, column.__lt__
+        return [greater_equal(prefix)] + ([less(upper)] if upper is not None else [])
+
+    @staticmethod
+    def _version_values(note) -> dict:
+        """
+        Helper method to map the columns of an updated note (a row or a CTE) to the columns of its version.
+        The version gets its own creation time from the column default.
+        """
+        return {
+            "note_id": note["id"],
+            "title": note["title"],
+            "content": note["content"],
+            "summarization": note["summarization"],
+            "version_number": note["version_number"],
+        }
+
+
+class NoteStatsQuery:
+    """Database operations for NoteDailyStatsModel, scoped to the rollups of one tenant."""
+
+    __MODEL = NoteDailyStatsModel
+
+    def __init__(self, session: AsyncSession, tenant_id: str = NoteModel.DEFAULT_TENANT):
+        """Initialize NoteStatsQuery with an async database session and a tenant."""
+        self.session = session
+        self.tenant_id = tenant_id
+
+    @handle_sqlalchemy_error
+    async def get_range(
+            self,
+            date_from: Optional[date] = None,
+            date_to: Optional[date] = None,
+    ) -> list[NoteDailyStatsModel]:
+        """Retrieve the daily rollups between two days (both included), ordered by day."""
+        stmt = select(self.__MODEL).where(self.__MODEL.tenant_id == self.tenant_id).order_by(self.__MODEL.day)
+        if date_from is not None:
+            stmt = stmt.where(self.__MODEL.day >= date_from)
+        if date_to is not None:
+            stmt = stmt.where(self.__MODEL.day <= date_to)
+        res = await self.session.execute(stmt)
+        return list(res.scalars().all())
+
+
+class NoteKeywordQuery:
+    """Database operations for NoteKeywordsModel and TermStatsModel, scoped to one tenant."""
+
+    __MODEL = NoteKeywordsModel
+
+    def __init__(self, session: AsyncSession, tenant_id: str = NoteModel.DEFAULT_TENANT):
+        """Initialize NoteKeywordQuery with an async database session and a tenant."""
+        self.session = session
+        self.tenant_id = tenant_id
+
+    @handle_sqlalchemy_error
+    async def get_by_note_id(self, note_id: int) -> Optional[NoteKeywordsModel]:
+        """Retrieve the stored keywords of a note of the tenant by the note ID."""
+        stmt = (
+            select(self.__MODEL)
+            .join(NoteModel, NoteModel.id == self.__MODEL.note_id)
+            .where(NoteModel.tenant_id == self.tenant_id, self.__MODEL.note_id == note_id)
+        )
+        return (await self.session.execute(stmt)).scalar_one_or_none()
+
+    @handle_sqlalchemy_error
+    async def get_tenant_ids(self) -> list[str]:
+        """Retrieve every tenant with notes or document frequencies, the ones a refresh has to rebuild."""
+        return await _get_tenant_ids(self.session, TermStatsModel)
+
+    @handle_sqlalchemy_error
+    async def rebuild(self, top_n: int = 10, batch_size: int = 1000) -> int:
+        """
+        Recount the document frequencies over the notes of the tenant, then rank the keywords of every note
+        against them again.
+        Corrects the IDF drift of keywords computed while the corpus was smaller, and any frequency
+        the write path could not maintain. Notes are read in keyset-paginated batches, each batch of keywords
+        is committed separately so writers are never blocked for the whole run.
+
+        :returns: The number of notes indexed.
+        """
+        document_frequencies = Counter()
+        documents_count = 0
+        async for batch in self._iterate_notes(batch_size):
+            for _, content in batch:
+                document_frequencies.update(set(NoteKeywordService.tokenize(content)))
+            documents_count += len(batch)
+        document_frequencies[TermStatsModel.DOCUMENTS_COUNT_TERM] = documents_count
+
+        await self.session.execute(delete(TermStatsModel).where(TermStatsModel.tenant_id == self.tenant_id))
+        terms = list(document_frequencies.items())
+        for start in range(0, len(terms), batch_size):
+            increments = dict(terms[start:start + batch_size])
+            await self.session.run_sync(
+                lambda sync_session: NoteKeywordTriggerQuery.adjust_document_frequencies(
+                    sync_session.connection(), self.tenant_id, increments, replace=True
+                )
+            )
+        await self.session.commit()
+
+        service = NoteKeywordService(top_n=top_n)
+        async for batch in self._iterate_notes(batch_size):
+            rows = [
+                {
+                    "note_id": note_id,
+                    "keywords": service.get_keywords(
+                        words=NoteKeywordService.tokenize(content),
+                        document_frequencies=document_frequencies,
+                        documents_count=documents_count,
+                    ),
+                    "documents_count": documents_count,
+                }
+                for note_id, content in batch
+            ]
+            await self.session.run_sync(
+                lambda sync_session: NoteKeywordTriggerQuery.upsert_keywords(sync_session.connection(), rows)
+            )
+            await self.session.commit()
+
+        return documents_count
+
+    @handle_sqlalchemy_error
+    async def compact(self) -> int:
+        """
+        Fold the documents count increments the writes left in the shard rows into the documents count of the tenant.
+
+        :returns: The folded increment.
+        """
+        table = TermStatsModel.__table__
+        stmt = (
+            delete(table)
+            .where(table.c.tenant_id == self.tenant_id, table.c.term.in_(TermStatsModel.DOCUMENTS_COUNT_SHARDS))
+            .returning(table.c.document_frequency)
+        )
+        increment = sum((await self.session.execute(stmt)).scalars())
+        if increment:
+            await self.session.run_sync(
+                lambda sync_session: NoteKeywordTriggerQuery.adjust_document_frequencies(
+                    sync_session.connection(), self.tenant_id, {TermStatsModel.DOCUMENTS_COUNT_TERM: increment}
+                )
+            )
+        await self.session.commit()
+        return increment
+
+    async def _iterate_notes(self, batch_size: int):
+        """Helper method to read the ID and content of every note of the tenant, one batch at a time, in ID order."""
+        async for batch in _iterate_note_contents(self.session, self.tenant_id, batch_size):
+            yield batch
+
+
+class WordSketchQuery:
+    """
+    Database operations for WordCountSketchModel, WordHeavyHitterModel and WordVocabularySketchModel,
+    scoped to the sketches of one tenant.
+    """
+
+    def __init__(self, session: AsyncSession, tenant_id: str = NoteModel.DEFAULT_TENANT):
+        """Initialize WordSketchQuery with an async database session and a tenant."""
+        self.session = session
+        self.tenant_id = tenant_id
+
+    @handle_sqlalchemy_error
+    async def get_heavy_hitters(self, min_count: int) -> dict[str, int]:
+        """
+        Retrieve the estimated counts of the most common words above `min_count`, the most common first.
+        Returns at most `WORD_SKETCH_TOP_WORDS` rows, whatever the number of notes.
+        """
+        table = WordHeavyHitterModel.__table__
+        stmt = (
+            select(table.c.term, table.c.count)
+            .where(table.c.tenant_id == self.tenant_id, table.c.count > min_count)
+            .order_by(table.c.count.desc(), table.c.term)
+            .limit(env_config.WORD_SKETCH_TOP_WORDS)
+        )
+        return dict((await self.session.execute(stmt)).all())
+
+    @handle_sqlalchemy_error
+    async def get_vocabulary_size(self) -> int:
+        """Retrieve the estimated number of distinct words, from the `2 ** WORD_SKETCH_PRECISION` registers."""
+        table = WordVocabularySketchModel.__table__
+        sketch = HyperLogLog(precision=env_config.WORD_SKETCH_PRECISION)
+        stmt = select(table.c.register, table.c.rank).where(table.c.tenant_id == self.tenant_id)
+        for register, rank in await self.session.execute(stmt):
+            sketch.registers[register] = rank
+        return sketch.count()
+
+    @handle_sqlalchemy_error
+    async def get_tenant_ids(self) -> list[str]:
+        """Retrieve every tenant with notes or word counters, the ones a refresh has to rebuild."""
+        return await _get_tenant_ids(self.session, WordCountSketchModel)
+
+    @handle_sqlalchemy_error
+    async def trim_heavy_hitters(self) -> int:
+        """
+        Trim the heavy hitter candidates of the tenant to the best `WORD_SKETCH_TOP_WORDS`; the write path
+        only adds candidates, so the table grows between two trims.
+
+        :returns: The number of candidates dropped.
+        """
+        trimmed = await self.session.run_sync(
+            lambda sync_session: WordSketchTriggerQuery.trim_heavy_hitters(sync_session.connection(), self.tenant_id)
+        )
+        await self.session.commit()
+        return trimmed
+
+    @handle_sqlalchemy_error
+    async def rebuild(self, batch_size: int = 1000) -> int:
+        """
+        Count the words of the notes of the tenant into fresh sketches and replace the stored ones.
+        Corrects what the write path cannot maintain: the words of contents replaced by bulk updates,
+        the words of deleted notes in the HyperLogLog, and a change of the sketch dimensions.
+        Memory is bounded by the sketch dimensions and `batch_size`, not by the vocabulary.
+
+        :returns: The number of notes counted.
+        """
+        counts = CountMinSketch(width=env_config.WORD_SKETCH_WIDTH, depth=env_config.WORD_SKETCH_DEPTH)
+        vocabulary = HyperLogLog(precision=env_config.WORD_SKETCH_PRECISION)
+        candidates: dict[str, int] = {}
+        top_words, notes_count = env_config.WORD_SKETCH_TOP_WORDS, 0
+
+        async for batch in _iterate_note_contents(self.session, self.tenant_id, batch_size):
+            increments = WordSketchTriggerQuery.count_changes([content for _, content in batch])
+            counts.add(increments)
+            vocabulary.add(list(increments))
+            terms = list(increments)
+            candidates.update(zip(terms, counts.estimate(terms).tolist()))
+            if len(candidates) > 2 * top_words:
+                candidates = dict(sorted(candidates.items(), key=lambda item: (-item[1], item[0]))[:top_words])
+            notes_count += len(batch)
+
+        candidates = sorted(candidates.items(), key=lambda item: (-item[1], item[0]))[:top_words]
+        rows, columns = counts.table.nonzero()
+        replacements = [
+            (WordCountSketchModel, [
+                {"row_index": row, "column_index": column, "count": int(counts.table[row, column])}
+                for row, column in zip(rows.tolist(), columns.tolist())
+            ]),
+            (WordHeavyHitterModel, [{"term": term, "count": count} for term, count in candidates]),
+            (WordVocabularySketchModel, [
+                {"register": register, "rank": int(vocabulary.registers[register])}
+                for register in vocabulary.registers.nonzero()[0].tolist()
+            ]),
+        ]
+        for model, values in replacements:
+            values = [{**value, "tenant_id": self.tenant_id} for value in values]
+            await self.session.execute(delete(model).where(model.tenant_id == self.tenant_id))
+            for start in range(0, len(values), batch_size):
+                await self.session.execute(insert(model), values[start:start + batch_size])
+        await self.session.commit()
+        return notes_count
+
+
+class NoteChangeQuery:
+    """Database operations for NoteChangeModel, scoped to the changes of one tenant, or of every tenant with None."""
+
+    __MODEL = NoteChangeModel
+
+    def __init__(self, session: AsyncSession, tenant_id: Optional[str] = NoteModel.DEFAULT_TENANT):
+        """Initialize NoteChangeQuery with an async database session and a tenant (None for every tenant)."""
+        self.session = session
+        self.tenant_id = tenant_id
+
+    @handle_sqlalchemy_error
+    async def get_changes(self, after: int, until: Optional[int] = None, limit: int = 500) -> list[dict]:
+        """Retrieve at most `limit` changes with a sequence in (after, until], in sequence order."""
+        table = self.__MODEL.__table__
+        stmt = select(table).where(*self._conditions(), table.c.sequence > after)
+        if until is not None:
+            stmt = stmt.where(table.c.sequence <= until)
+        stmt = stmt.order_by(table.c.sequence).limit(limit)
+        return [dict(row) for row in (await self.session.execute(stmt)).mappings()]
+
+    @handle_sqlalchemy_error
+    async def get_sequence_range(self) -> tuple[Optional[int], Optional[int]]:
+        """Retrieve the first and the last sequence kept, None for both if no change is."""
+        sequence = self.__MODEL.sequence
+        stmt = select(func.min(sequence), func.max(sequence)).where(*self._conditions())
+        first, last = (await self.session.execute(stmt)).one()
+        return first, last
+
+    @handle_sqlalchemy_error
+    async def prune(self, older_than: timedelta) -> int:
+        """
+        Delete the changes older than a duration, keeping the last one: the sequence reached stays known,
+        so a client resuming from a pruned sequence can be told it is too old. The cutoff is computed on the
+        database clock, the one that stamped changed_at.
+
+        :returns: The number of deleted changes.
+        """
+        table = self.__MODEL.__table__
+        connection = await self.session.connection()
+        if connection.dialect.name == "postgresql":
+            cutoff = func.now() - older_than
+        else:
+            # SQLite has no interval arithmetic, its clock is shifted by a modifier instead
+            cutoff = func.datetime("now", f"{-older_than.total_seconds()} seconds")
+        last = select(func.max(table.c.sequence)).where(*self._conditions()).scalar_subquery()
+        stmt = delete(table).where(*self._conditions(), table.c.changed_at < cutoff, table.c.sequence < last)
+        result = await self.session.execute(stmt)
+        await self.session.commit()
+        return result.rowcount
+
+    def _conditions(self) -> list:
+        """Helper method to scope the statements to the tenant, if any."""
+        return [self.__MODEL.tenant_id == self.tenant_id] if self.tenant_id is not None else []
+
+
+class NoteVersionArchiveQuery:
+    """
+    Database operations for NoteVersionArchiveModel: moves the versions of old notes out of note_version
+    into gzip-compressed NDJSON files, and reads them back on demand.
+    """
+
+    __MODEL = NoteVersionArchiveModel
+
+    def __init__(self, session: AsyncSession):
+        """Initialize NoteVersionArchiveQuery with an async database session."""
+        self.session = session
+
+    @handle_sqlalchemy_error
+    async def archive(self, before: datetime, directory: Path, chunk_size: int = 1000) -> list[dict]:
+        """
+        Archive the versions created before the month of `before`.
+        On PostgreSQL every monthly partition of these months is detached, written to its own file and dropped,
+        then the partitions of the coming months are created; the old rows of the DEFAULT partition,
+        or of the whole table on SQLite, are moved to more files, `chunk_size` rows per file and transaction.
+        A file is only listed in the catalog once it is complete, in the transaction removing its rows,
+        so an interrupted run leaves the versions in the database (a detached partition is archived by the next run).
 
-        obj.version_number += 1
+        :param before: The versions created from the start of this month on stay in the database.
+        :param directory: The directory receiving the files, created if needed.
+        :returns: The catalog entries of the written files.
+        """
+        cutoff = NoteVersionPartitions.month_start(before)
+        directory.mkdir(parents=True, exist_ok=True)
+        connection = await self.session.connection()
+        entries = []
+
+        if connection.dialect.name == "postgresql":
+            partitions = await self.session.run_sync(
+                lambda sync_session: NoteVersionPartitions.list_partitions(sync_session.connection())
+            )
+            for name, attached in sorted(partitions.items()):
+                month = NoteVersionPartitions.partition_month(name)
+                if month >= cutoff:
+                    continue
+                if attached:
+                    # committed before the rows are read, the lock on note_version is held for the DETACH only
+                    await self.session.run_sync(
+                        lambda sync_session: NoteVersionPartitions.detach(sync_session.connection(), name)
+                    )
+                    await self.session.commit()
+                entries.append(await self._archive_partition(name, month, directory, chunk_size))
+            source = _version_table(NoteVersionPartitions.DEFAULT_PARTITION)
+        else:
+            source = NoteVersionModel.__table__
+
+        while (entry := await self._archive_rows(source, cutoff, directory, chunk_size)) is not None:
+            entries.append(entry)
+
+        await self.create_upcoming_partitions()
+        return entries
+
+    @handle_sqlalchemy_error
+    async def create_upcoming_partitions(self) -> list[str]:
+        """
+        Create the missing partitions of the current month and of the coming ones (see NoteVersionPartitions),
+        so the new versions never pile up in the DEFAULT partition. Nothing to do on SQLite.
+
+        :returns: The names of the created partitions.
+        """
+        connection = await self.session.connection()
+        if connection.dialect.name != "postgresql":
+            return []
+        created = await self.session.run_sync(
+            lambda sync_session: NoteVersionPartitions.create_upcoming(sync_session.connection())
+        )
         await self.session.commit()
+        return created
 
     @handle_sqlalchemy_error
-    async def delete(self, obj: NoteModel) -> None:
-        """Delete a note from the database."""
-        await self.session.delete(obj)
-        await self.session.commit()
\ No newline at end of file
+    async def get_versions(self, note_ids: list[int]) -> list[dict]:
+        """
+        Retrieve the archived versions of the given notes. A version is never older than its note, so only the files
+        covering versions created after one of the notes are read, none at all while nothing is archived.
+        """
+        archives = self.__MODEL.__table__
+        created_before = (
+            select(NoteModel.id)
+            .where(NoteModel.id.in_(note_ids), NoteModel.created_at < archives.c.range_end)
+            .exists()
+        )
+        stmt = select(archives.c.path).where(created_before).order_by(archives.c.id)
+        paths = (await self.session.execute(stmt)).scalars().all()
+
+        rows = []
+        for path in paths:
+            rows.extend(await asyncio.to_thread(_read_archive, Path(path), set(note_ids)))
+        return rows
+
+    async def _archive_partition(self, name: str, month: datetime, directory: Path, chunk_size: int) -> dict:
+        """Helper method to write a detached partition to a file, register the file and drop the partition."""
+        source = _version_table(name)
+        path = directory / f"{name}.ndjson.gz"
+        rows_count = 0
+        last_id = None
+        with _ArchiveWriter(path) as writer:
+            # read by pages of IDs rather than through a cursor, an open cursor keeps the partition from being dropped
+            while True:
+                stmt = select(source).order_by(source.c.id).limit(chunk_size)
+                if last_id is not None:
+                    stmt = stmt.where(source.c.id > last_id)
+                rows = (await self.session.execute(stmt)).mappings().all()
+                if not rows:
+                    break
+                writer.write(rows)
+                rows_count += len(rows)
+                last_id = rows[-1]["id"]
+
+        entry = await self._register(path, month, NoteVersionPartitions.add_months(month, 1), rows_count)
+        await self.session.run_sync(lambda sync_session: NoteVersionPartitions.drop(sync_session.connection(), name))
+        await self.session.commit()
+        return entry
+
+    async def _archive_rows(self, source, cutoff: datetime, directory: Path, chunk_size: int) -> Optional[dict]:
+        """
+        Helper method to move the first `chunk_size` versions created before the cutoff from a table to a file.
+        Returns None once there is none left.
+        """
+        chunk = select(source.c.id).where(source.c.created_at < cutoff).order_by(source.c.id).limit(chunk_size)
+        stmt = delete(source).where(source.c.id.in_(chunk)).returning(*source.c)
+        rows = [dict(row) for row in (await self.session.execute(stmt)).mappings()]
+        if not rows:
+            await self.session.rollback()
+            return None
+
+        start = NoteVersionPartitions.month_start(min(row["created_at"] for row in rows))
+        # a later run or chunk can archive more rows of the same months, every chunk gets its own file
+        first_id = min(row["id"] for row in rows)
+        name = f"{NoteVersionPartitions.TABLE}_{start:%Y%m}_{cutoff:%Y%m}_{datetime.now():%Y%m%d%H%M%S}_{first_id}"
+        path = directory / f"{name}.ndjson.gz"
+        with _ArchiveWriter(path) as writer:
+            writer.write(rows)
+
+        entry = await self._register(path, start, cutoff, len(rows))
+        await self.session.commit()
+        return entry
+
+    async def _register(self, path: Path, range_start: datetime, range_end: datetime, rows_count: int) -> dict:
+        """Helper method to list a complete file in the catalog, replacing the entry of an earlier attempt."""
+        values = {"range_start": range_start, "range_end": range_end, "path": str(path), "rows_count": rows_count}
+        await self.session.execute(delete(self.__MODEL).where(self.__MODEL.path == values["path"]))
+        await self.session.execute(insert(self.__MODEL).values(**values))
+        return values
+
+
+class _ArchiveWriter:
+    """
+    Writes versions to a gzip-compressed NDJSON file, one object per line.
+    The file only gets its final name once every line is written, readers never see a partial archive.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._partial = path.with_name(f"{path.name}.partial")
+        self._file = None
+
+    def __enter__(self) -> "_ArchiveWriter":
+        self._file = gzip.open(self._partial, "wt", encoding="utf-8")
+        return self
+
+    def write(self, rows) -> None:
+        for row in rows:
+            self._file.write(json.dumps({**row, "created_at": row["created_at"].isoformat()}) + "\n")
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._file.close()
+        if exc_type is None:
+            os.replace(self._partial, self.path)
+        else:
+            self._partial.unlink(missing_ok=True)
+
+
+def _read_archive(path: Path, note_ids: set[int]) -> list[dict]:
+    """Reads the versions of the given notes from an archive file, line by line."""
+    rows = []
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            row = json.loads(line)
+            if row["note_id"] in note_ids:
+                rows.append({**row, "created_at": datetime.fromisoformat(row["created_at"])})
+    return rows
+
+
+def _version_table(name: str):
+    """A lightweight table with the columns of note_version, for its partitions."""
+    return TableClause(name, *(ColumnClause(item.name, item.type) for item in NoteVersionModel.__table__.columns))
+
+
+async def _iterate_note_contents(session: AsyncSession, tenant_id: str, batch_size: int):
+    """Reads the ID and content of every note of a tenant, one keyset-paginated batch at a time, in ID order."""
+    last_id = 0
+    while True:
+        stmt = (
+            select(NoteModel.id, NoteModel.content)
+            .where(NoteModel.tenant_id == tenant_id, NoteModel.id > last_id)
+            .order_by(NoteModel.id)
+            .limit(batch_size)
+        )
+        batch = (await session.execute(stmt)).all()
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1][0]
+
+
+async def _get_tenant_ids(session: AsyncSession, model) -> list[str]:
+    """Reads the tenants with notes or with rows in a table derived from them, in order."""
+    stmt = select(NoteModel.tenant_id).union(select(model.tenant_id))
+    return sorted((await session.execute(stmt)).scalars().all())
@@ -1,29 +1,491 @@
-from sqlalchemy import event
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
+from collections import Counter, defaultdict
+from typing import Iterable, Optional, Union
+
+from sqlalchemy import (
+    ColumnElement,
+    FromClause,
+    Insert,
+    Select,
+    Table,
+    and_,
+    cast,
+    delete,
+    event,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+)
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm.mapper import Mapper
 from sqlalchemy.engine.base import Connection
-from src.database.database.models import NoteModel, NoteVersionModel
+from src.config import env_config
+from src.database.database.models import (
+    NoteModel,
+    NoteVersionModel,
+    NoteChangeModel,
+    NoteDailyStatsModel,
+    TermStatsModel,
+    NoteKeywordsModel,
+    WordCountSketchModel,
+    WordHeavyHitterModel,
+    WordVocabularySketchModel,
+)
+from src.thirdweb.analytic.service import NoteKeywordService
+from src.thirdweb.analytic.sketch import CountMinSketch, HyperLogLog
+
+
+def _insert_rows(dialect_name: str, table: Table, rows: list[dict]) -> Insert:
+    """
+    Helper function to insert rows (with the same keys) in the given order: a multi-row VALUES on SQLite.
+    On PostgreSQL an INSERT ... SELECT over one array per column that varies across the rows (unnest keeps
+    their order), the values shared by every row bound once: the text of the statement does not depend
+    on the number of rows, so it is compiled once, and several inserts can share a statement as CTEs.
+    """
+    if dialect_name != "postgresql":
+        return sqlite.insert(table).values(rows)
+
+    names = list(rows[0])
+    shared = [name for name in names if all(row[name] == rows[0][name] for row in rows)]
+    varying = [name for name in names if name not in shared]
+    columns = {name: literal(rows[0][name], table.c[name].type).label(name) for name in shared}
+    stmt = select()
+    if varying:
+        arrays = []
+        for name in varying:
+            array_type = postgresql.ARRAY(table.c[name].type)
+            arrays.append(cast(literal([row[name] for row in rows], array_type), array_type))
+        listed = func.unnest(*arrays).table_valued(*varying).render_derived(name="listed")
+        columns.update({name: listed.c[name] for name in varying})
+        stmt = stmt.select_from(listed)
+    return postgresql.insert(table).from_select(names, stmt.add_columns(*(columns[name] for name in names)))
 
 
 class NoteTriggerQuery:
+    """
+    Write listeners of the ORM inserts (NoteQuery.create and create_many). Updates and deletes never go through
+    the ORM, NoteQuery issues their statements and maintains the derived tables itself.
+    """
+
+    @staticmethod
+    @event.listens_for(NoteModel, "after_insert")
+    def create_version_after_insert(mapper: Mapper, connection: Connection, target: NoteModel) -> None:
+        connection.execute(
+            insert(NoteVersionModel.__table__).values(
+                note_id=target.id,
+                title=target.title,
+                content=target.content,
+                summarization=target.summarization,
+                version_number=target.version_number,
+            )
+        )
+
+
+class NoteStatsTriggerQuery:
+    @staticmethod
+    @event.listens_for(NoteModel, "after_insert")
+    def count_created_note(mapper: Mapper, connection: Connection, target: NoteModel) -> None:
+        NoteStatsTriggerQuery.increment_daily_stats(
+            connection, target.tenant_id, notes_created=1, words_created=len(target.content.split())
+        )
+
+    @staticmethod
+    def increment_daily_stats(connection: Connection, tenant_id: str, **increments: int) -> None:
+        """Adds the increments to the tenant's row of today in the rollup table, creating it if needed."""
+        connection.execute(
+            NoteStatsTriggerQuery.daily_stats_statement(connection.dialect.name, tenant_id, **increments)
+        )
+
+    @staticmethod
+    def daily_stats_statement(dialect_name: str, tenant_id: str, **increments: Union[int, ColumnElement]) -> Insert:
+        """
+        Returns the upsert of `increment_daily_stats`, the increments can also be SQL expressions
+        (e.g. counts over the rows returned by a data-modifying CTE).
+        """
+        dialect = postgresql if dialect_name == "postgresql" else sqlite
+        table = NoteDailyStatsModel.__table__
+        values = {column.name: 0 for column in table.columns if column.name not in ("tenant_id", "day")}
+        values.update(increments)
+        stmt = dialect.insert(table).values(tenant_id=tenant_id, day=func.current_date(), **values)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.tenant_id, table.c.day],
+            set_={name: table.c[name] + stmt.excluded[name] for name in increments},
+        )
+
+
+class NoteChangeTriggerQuery:
+    @staticmethod
+    @event.listens_for(NoteModel, "after_insert")
+    def log_created_note(mapper: Mapper, connection: Connection, target: NoteModel) -> None:
+        NoteChangeTriggerQuery.log_changes(
+            connection, target.tenant_id, "created", [{"id": target.id, "version_number": target.version_number}]
+        )
+
+    @staticmethod
+    def log_changes(connection: Connection, tenant_id: str, action: str, notes: list) -> None:
+        """
+        Appends the changes of notes (mappings with their ID and version number) to the change log.
+        On PostgreSQL the change feeds of every worker are notified once the transaction commits.
+        """
+        if not notes:
+            return
+
+        connection.execute(
+            insert(NoteChangeModel.__table__),
+            [
+                {
+                    "tenant_id": tenant_id,
+                    "note_id": note["id"],
+                    "action": action,
+                    "version_number": note["version_number"],
+                }
+                # in ID order, whatever order the statement returned the notes in
+                for note in sorted(notes, key=lambda note: note["id"])
+            ],
+        )
+        if connection.dialect.name == "postgresql":
+            connection.execute(NoteChangeTriggerQuery.notify_statement(tenant_id))
+
+    @staticmethod
+    def log_changes_statement(tenant_id: str, action: str, notes: FromClause) -> Insert:
+        """Returns the insert logging the changes of the notes of a CTE (with their ID and version number)."""
+        table = NoteChangeModel.__table__
+        # in ID order, the sequence numbers are drawn as the rows are selected
+        return insert(table).from_select(
+            ["tenant_id", "note_id", "action", "version_number"],
+            select(literal(tenant_id), notes.c.id, literal(action), notes.c.version_number).order_by(notes.c.id),
+        )
+
+    @staticmethod
+    def notify_statement(tenant_id: str) -> Select:
+        """Returns the NOTIFY of the change feeds (on PostgreSQL), sent once the transaction commits."""
+        return select(func.pg_notify(NoteChangeModel.NOTIFY_CHANNEL, tenant_id))
+
+
+class NoteKeywordTriggerQuery:
     @staticmethod
     @event.listens_for(NoteModel, "after_insert")
-    @event.listens_for(NoteModel, "after_update")
-    def create_version_after_insert_or_update(mapper: Mapper, connection: Connection, target: NoteModel) -> None:
-        with Session(bind=connection) as sync_session:
-            try:
-                sync_session.add(
-                    NoteVersionModel(
-                        note_id=target.id,
-                        title=target.title,
-                        content=target.content,
-                        summarization=target.summarization,
-                        created_at=target.created_at,
-                        version_number=target.version_number,
-                    )
-                )
-                sync_session.commit()
-            except SQLAlchemyError as e:
-                sync_session.rollback()
-                raise e
+    def index_created_note(mapper: Mapper, connection: Connection, target: NoteModel) -> None:
+        words = NoteKeywordService.tokenize(target.content)
+        increments = dict.fromkeys(set(words), 1)
+        increments[NoteKeywordTriggerQuery.documents_count_shard(target.id)] = 1
+        NoteKeywordTriggerQuery.adjust_document_frequencies(connection, target.tenant_id, increments)
+        NoteKeywordTriggerQuery.store_keywords(connection, target.tenant_id, note_ids=[target.id], words=words)
+
+    @staticmethod
+    def reindex_notes(
+            connection: Connection,
+            tenant_id: str,
+            note_ids: list[int],
+            content: str,
+            old_contents: Optional[list[str]] = None,
+    ) -> None:
+        """Moves the document frequencies of notes from their old contents to the new one and ranks them again."""
+        if old_contents is not None:
+            NoteKeywordTriggerQuery.adjust_document_frequencies(
+                connection, tenant_id, NoteKeywordTriggerQuery.reindex_increments(content, old_contents)
+            )
+        # without the previous contents the frequencies are left for the periodic refresh to correct
+        words = NoteKeywordService.tokenize(content)
+        NoteKeywordTriggerQuery.store_keywords(connection, tenant_id, note_ids=note_ids, words=words)
+
+    @staticmethod
+    def reindex_increments(content: str, old_contents: list[str]) -> dict[str, int]:
+        """Returns the document frequency increments of replacing the old contents of notes by the same content."""
+        new_terms = set(NoteKeywordService.tokenize(content))
+        increments = Counter()
+        for old_content in old_contents:
+            old_terms = set(NoteKeywordService.tokenize(old_content))
+            increments.subtract(old_terms - new_terms)
+            increments.update(new_terms - old_terms)
+        return dict(increments)
+
+    @staticmethod
+    def unindex_notes(connection: Connection, tenant_id: str, note_ids: list[int], contents: list[str]) -> None:
+        """Removes deleted notes from the document frequencies and drops their keywords."""
+        NoteKeywordTriggerQuery.adjust_document_frequencies(
+            connection, tenant_id, NoteKeywordTriggerQuery.unindex_increments(note_ids, contents)
+        )
+        # the foreign key cascades on PostgreSQL, SQLite does not enforce it by default
+        table = NoteKeywordsModel.__table__
+        connection.execute(delete(table).where(table.c.note_id.in_(note_ids)))
+
+    @staticmethod
+    def unindex_increments(note_ids: list[int], contents: list[str]) -> dict[str, int]:
+        """Returns the document frequency increments of deleting notes, their documents count shards included."""
+        increments = Counter()
+        for content in contents:
+            increments.subtract(set(NoteKeywordService.tokenize(content)))
+        for note_id in note_ids:
+            increments[NoteKeywordTriggerQuery.documents_count_shard(note_id)] -= 1
+        return dict(increments)
+
+    @staticmethod
+    def documents_count_shard(note_id: int) -> str:
+        """Returns the row the writes of a note add their documents count increment to."""
+        return TermStatsModel.DOCUMENTS_COUNT_SHARDS[note_id % len(TermStatsModel.DOCUMENTS_COUNT_SHARDS)]
+
+    @staticmethod
+    def adjust_document_frequencies(
+            connection: Connection,
+            tenant_id: str,
+            increments: dict[str, int],
+            replace: bool = False,
+    ) -> None:
+        """
+        Adds the increments to the document frequency of every term of the tenant, creating missing terms,
+        in one statement.
+        With `replace`, the given values overwrite the stored frequencies instead.
+        """
+        if not increments:
+            return
+
+        connection.execute(
+            NoteKeywordTriggerQuery.document_frequencies_statement(
+                connection.dialect.name, tenant_id, increments, replace=replace
+            )
+        )
+
+    @staticmethod
+    def document_frequencies_statement(
+            dialect_name: str,
+            tenant_id: str,
+            increments: dict[str, int],
+            replace: bool = False,
+    ) -> Insert:
+        """Returns the upsert of `adjust_document_frequencies`, for non-empty increments."""
+        table = TermStatsModel.__table__
+        # rows in key order, concurrent upserts then lock the terms they share in the same order and cannot deadlock
+        stmt = _insert_rows(
+            dialect_name,
+            table,
+            [
+                {"tenant_id": tenant_id, "term": term, "document_frequency": value}
+                for term, value in sorted(increments.items())
+            ],
+        )
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.tenant_id, table.c.term],
+            set_={
+                "document_frequency": stmt.excluded.document_frequency if replace
+                else table.c.document_frequency + stmt.excluded.document_frequency
+            },
+        )
+
+    @staticmethod
+    def store_keywords(connection: Connection, tenant_id: str, note_ids: list[int], words: list[str]) -> None:
+        """
+        Ranks the words of notes (sharing this content) against the current document frequencies of their tenant,
+        stores the result.
+        """
+        terms = TermStatsModel.__table__
+        rows = connection.execute(
+            select(terms.c.term, terms.c.document_frequency).where(
+                terms.c.tenant_id == tenant_id,
+                terms.c.term.in_(NoteKeywordTriggerQuery.ranking_terms(words)),
+            )
+        )
+        NoteKeywordTriggerQuery.upsert_keywords(
+            connection, NoteKeywordTriggerQuery.rank_keywords(note_ids, words, dict(rows.all()))
+        )
+
+    @staticmethod
+    def ranking_terms(words: list[str]) -> set[str]:
+        """Returns the terms whose document frequencies rank the given words: the words and the documents count."""
+        return {*words, TermStatsModel.DOCUMENTS_COUNT_TERM, *TermStatsModel.DOCUMENTS_COUNT_SHARDS}
+
+    @staticmethod
+    def rank_keywords(note_ids: list[int], words: list[str], document_frequencies: dict[str, int]) -> list[dict]:
+        """Returns the keyword rows of notes sharing these words, given the frequencies of their `ranking_terms`."""
+        document_frequencies = dict(document_frequencies)
+        documents_count_terms = (TermStatsModel.DOCUMENTS_COUNT_TERM, *TermStatsModel.DOCUMENTS_COUNT_SHARDS)
+        documents_count = sum(document_frequencies.pop(term, 0) for term in documents_count_terms)
+
+        keywords = NoteKeywordService(top_n=env_config.KEYWORDS_PER_NOTE).get_keywords(
+            words=words, document_frequencies=document_frequencies, documents_count=documents_count
+        )
+        return [{"note_id": note_id, "keywords": keywords, "documents_count": documents_count} for note_id in note_ids]
+
+    @staticmethod
+    def upsert_keywords(connection: Connection, rows: list[dict]) -> None:
+        """Inserts or replaces the stored keywords of the given notes."""
+        connection.execute(NoteKeywordTriggerQuery.keywords_statement(connection.dialect.name, rows))
+
+    @staticmethod
+    def keywords_statement(dialect_name: str, rows: list[dict]) -> Insert:
+        """Returns the upsert of `upsert_keywords`, for at least one row."""
+        table = NoteKeywordsModel.__table__
+        # computed_at comes from the column default
+        stmt = _insert_rows(dialect_name, table, sorted(rows, key=lambda row: row["note_id"]))
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.note_id],
+            set_={
+                "keywords": stmt.excluded.keywords,
+                "documents_count": stmt.excluded.documents_count,
+                "computed_at": func.now(),
+            },
+        )
+
+
+class WordSketchTriggerQuery:
+    @staticmethod
+    @event.listens_for(NoteModel, "after_insert")
+    def count_created_words(mapper: Mapper, connection: Connection, target: NoteModel) -> None:
+        WordSketchTriggerQuery.count_words(
+            connection, target.tenant_id, Counter(NoteKeywordService.tokenize(target.content))
+        )
+
+    @staticmethod
+    def count_changes(new_contents: list[str], old_contents: Optional[list[str]] = None) -> Counter:
+        """Returns the word count increments of replacing the old contents (if known) by the new ones."""
+        increments = Counter()
+        for content in new_contents:
+            increments.update(NoteKeywordService.tokenize(content))
+        for content in old_contents or []:
+            increments.subtract(NoteKeywordService.tokenize(content))
+        return increments
+
+    @staticmethod
+    def count_words(connection: Connection, tenant_id: str, increments: dict[str, int]) -> None:
+        """
+        Applies word count increments to the sketches of the tenant: the Count-Min counters, the heavy hitter candidates
+        (the touched words are estimated again, the periodic compaction trims the table to the best
+        `WORD_SKETCH_TOP_WORDS`) and, for added words, the HyperLogLog registers. A few statements whatever
+        the corpus size. Every upsert writes its rows in key order (see `adjust_document_frequencies`).
+        """
+        increments = {term: count for term, count in increments.items() if count}
+        if not increments:
+            return
+
+        dialect_name = connection.dialect.name
+        sketch = CountMinSketch(width=env_config.WORD_SKETCH_WIDTH, depth=env_config.WORD_SKETCH_DEPTH)
+        WordSketchTriggerQuery.adjust_counters(connection, tenant_id, sketch, increments)
+
+        terms = list(increments)
+        cells = WordCountSketchModel.__table__
+        rows = connection.execute(
+            select(cells.c.row_index, cells.c.column_index, cells.c.count).where(
+                WordSketchTriggerQuery.cells_condition(tenant_id, WordSketchTriggerQuery.cells_of(sketch, terms))
+            )
+        ).all()
+        for row, column, count in rows:
+            sketch.table[row, column] = count
+        WordSketchTriggerQuery.store_heavy_hitters(
+            connection, tenant_id, dict(zip(terms, sketch.estimate(terms).tolist()))
+        )
+
+        stmt = WordSketchTriggerQuery.registers_statement(dialect_name, tenant_id, increments)
+        if stmt is not None:
+            connection.execute(stmt)
+
+    @staticmethod
+    def adjust_counters(connection: Connection, tenant_id: str, sketch: CountMinSketch, counts: dict[str, int]) -> None:
+        """Adds the word counts to the Count-Min counters of the tenant, creating missing counters, in one statement."""
+        stmt = WordSketchTriggerQuery.counters_statement(connection.dialect.name, tenant_id, sketch, counts)
+        if stmt is not None:
+            connection.execute(stmt)
+
+    @staticmethod
+    def counters_statement(
+            dialect_name: str,
+            tenant_id: str,
+            sketch: CountMinSketch,
+            counts: dict[str, int],
+    ) -> Optional[Insert]:
+        """Returns the upsert of `adjust_counters`, or None if no counter changes."""
+        # in (row, column) order
+        rows, columns, values = sketch.increments(counts)
+        if not len(values):
+            return None
+
+        cells = WordCountSketchModel.__table__
+        stmt = _insert_rows(dialect_name, cells, [
+            {"tenant_id": tenant_id, "row_index": row, "column_index": column, "count": value}
+            for row, column, value in zip(rows.tolist(), columns.tolist(), values.tolist())
+        ])
+        return stmt.on_conflict_do_update(
+            index_elements=[cells.c.tenant_id, cells.c.row_index, cells.c.column_index],
+            set_={"count": cells.c.count + stmt.excluded.count},
+        )
+
+    @staticmethod
+    def cells_of(sketch: CountMinSketch, terms: list[str]) -> set[tuple[int, int]]:
+        """Returns the (row, column) of every counter estimating the given words."""
+        positions = sketch.positions(terms)
+        return {(row, column) for row in range(sketch.depth) for column in positions[:, row].tolist()}
+
+    @staticmethod
+    def cells_condition(tenant_id: str, cells_positions: Iterable[tuple[int, int]]) -> ColumnElement:
+        """Returns the condition selecting the counters of the tenant at the given (row, column) positions."""
+        columns_by_row = defaultdict(set)
+        for row, column in cells_positions:
+            columns_by_row[row].add(column)
+        cells = WordCountSketchModel.__table__
+        return and_(
+            cells.c.tenant_id == tenant_id,
+            or_(*(
+                and_(cells.c.row_index == row, cells.c.column_index.in_(columns))
+                for row, columns in sorted(columns_by_row.items())
+            )),
+        )
+
+    @staticmethod
+    def registers_statement(dialect_name: str, tenant_id: str, increments: dict[str, int]) -> Optional[Insert]:
+        """Returns the upsert raising the HyperLogLog registers of the added words, or None if no word is added."""
+        added = [term for term, count in increments.items() if count > 0]
+        if not added:
+            return None
+
+        # in register order
+        indices, ranks = HyperLogLog(precision=env_config.WORD_SKETCH_PRECISION).ranks(added)
+        registers = WordVocabularySketchModel.__table__
+        stmt = _insert_rows(
+            dialect_name,
+            registers,
+            [
+                {"tenant_id": tenant_id, "register": index, "rank": rank}
+                for index, rank in zip(indices.tolist(), ranks.tolist())
+            ],
+        )
+        # registers only grow: GREATEST on PostgreSQL, the two-argument (scalar) MAX on SQLite
+        highest = func.greatest if dialect_name == "postgresql" else func.max
+        return stmt.on_conflict_do_update(
+            index_elements=[registers.c.tenant_id, registers.c.register],
+            set_={"rank": highest(registers.c.rank, stmt.excluded.rank)},
+        )
+
+    @staticmethod
+    def store_heavy_hitters(connection: Connection, tenant_id: str, estimates: dict[str, int]) -> None:
+        """Stores the estimates of the given words among the heavy hitter candidates of the tenant."""
+        connection.execute(
+            WordSketchTriggerQuery.heavy_hitters_statement(connection.dialect.name, tenant_id, estimates)
+        )
+
+    @staticmethod
+    def heavy_hitters_statement(dialect_name: str, tenant_id: str, estimates: dict[str, int]) -> Insert:
+        """Returns the upsert of `store_heavy_hitters`, for at least one word."""
+        table = WordHeavyHitterModel.__table__
+        stmt = _insert_rows(
+            dialect_name,
+            table,
+            [{"tenant_id": tenant_id, "term": term, "count": count} for term, count in sorted(estimates.items())],
+        )
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.tenant_id, table.c.term], set_={"count": stmt.excluded.count}
+        )
+
+    @staticmethod
+    def trim_heavy_hitters(connection: Connection, tenant_id: str) -> int:
+        """Trims the heavy hitter candidates of the tenant to the best `WORD_SKETCH_TOP_WORDS`."""
+        table = WordHeavyHitterModel.__table__
+        best = (
+            select(table.c.term)
+            .where(table.c.tenant_id == tenant_id)
+            .order_by(table.c.count.desc(), table.c.term)
+            .limit(env_config.WORD_SKETCH_TOP_WORDS)
+        )
+        result = connection.execute(
+            delete(table).where(table.c.tenant_id == tenant_id, or_(table.c.count <= 0, table.c.term.not_in(best)))
+        )
+        return result.rowcount
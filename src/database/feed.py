@@ -0,0 +1,268 @@
+import asyncio
+import time
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.backend.utils.exceptions import DatabaseError
+from src.backend.utils.metrics import Metrics
+from src.config import env_config
+from src.database.cache import corpus_generations
+from src.database.database.models import NoteChangeModel
+from src.database.database.queries import NoteChangeQuery
+from src.database.session import async_session, engine
+
+
+class ChangeSubscription:
+    """
+    The changes of the notes of one tenant, queued for one client. `since` is the sequence the feed had delivered
+    when the client subscribed: the changes up to it are read from the log, the ones after it are queued here.
+    A None in the queue ends the subscription, the client then resumes from the last change it got.
+    """
+
+    def __init__(self, tenant_id: str, since: int, queue_size: int):
+        self.tenant_id = tenant_id
+        self.since = since
+        self.queue: asyncio.Queue[Optional[dict]] = asyncio.Queue(maxsize=queue_size)
+
+    def put(self, change: dict) -> bool:
+        """Queues a change, returns False (and ends the subscription) if the client fell too far behind."""
+        try:
+            self.queue.put_nowait(change)
+            return True
+        except asyncio.QueueFull:
+            self.close()
+            return False
+
+    def close(self) -> None:
+        # the queued changes are dropped, the client reads them again from the log when it resumes
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class ChangeFeed:
+    """
+    Fans the changes of the notes (see NoteChangeModel) out to the subscribers of the worker.
+    One reader per worker fetches the changes past the last delivered one whenever it is woken up: by a NOTIFY
+    on PostgreSQL (the writes of any worker), by the writes of this worker (the only source on SQLite),
+    or every `poll_interval` seconds at worst. Changes are delivered in sequence order: a missing sequence,
+    most likely a transaction that has not committed yet, holds the next ones back for at most `gap_timeout`
+    seconds. The skipped range is then scanned again on every poll for `gap_horizon` seconds, a change committed
+    late is delivered out of order (a rolled back transaction never fills its gap).
+    While a gap is open, the event IDs stop before it (see `resume_point`), so a client reconnecting meanwhile
+    reads the late changes again rather than missing them; it may get some changes twice.
+    The reader starts with the first subscriber and only sees the changes made from then on.
+    """
+
+    def __init__(
+            self,
+            poll_interval: float = 5.0,
+            gap_timeout: float = 2.0,
+            gap_horizon: float = 300.0,
+            queue_size: int = 1000,
+            page_rows: int = 500,
+            retention: timedelta = timedelta(hours=24),
+    ):
+        self.poll_interval = poll_interval
+        self.gap_timeout = gap_timeout
+        self.gap_horizon = gap_horizon
+        self.queue_size = queue_size
+        self.page_rows = page_rows
+        self.retention = retention
+        self.last_sequence = 0
+        self._subscriptions: set[ChangeSubscription] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._started: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+        self._gap_since: Optional[float] = None
+        # the skipped ranges still scanned for late changes: first and last sequence, skip time, delivered sequences
+        self._skipped: list[tuple[int, int, float, set[int]]] = []
+        self._pruned_at: Optional[float] = None
+
+    async def subscribe(self, tenant_id: str) -> ChangeSubscription:
+        """Subscribes to the changes of a tenant made after the last delivered one, starting the reader if needed."""
+        if self._task is None or self._task.done():
+            self._start()
+        await asyncio.shield(self._started)
+
+        subscription = ChangeSubscription(tenant_id=tenant_id, since=self.last_sequence, queue_size=self.queue_size)
+        self._subscriptions.add(subscription)
+        Metrics.set_gauge("change_feed_subscribers", len(self._subscriptions))
+        return subscription
+
+    def unsubscribe(self, subscription: ChangeSubscription) -> None:
+        self._subscriptions.discard(subscription)
+        Metrics.set_gauge("change_feed_subscribers", len(self._subscriptions))
+
+    def resume_point(self, sequence: int) -> int:
+        """Returns the sequence a client having received `sequence` resumes from, before any range still open."""
+        if self._skipped:
+            return min(sequence, min(first for first, _, _, _ in self._skipped) - 1)
+        return sequence
+
+    def wake(self, *args) -> None:
+        """Makes the reader fetch the new changes, whatever the arguments (it is a listener of several sources)."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def close(self) -> None:
+        """Stops the reader, which ends every subscription."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    def _start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._started = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        listener: Optional[AsyncConnection] = None
+        corpus_generations.add_listener(self.wake)
+        try:
+            try:
+                async with async_session() as session:
+                    _, last = await NoteChangeQuery(session, tenant_id=None).get_sequence_range()
+            except Exception as e:
+                self._started.set_exception(e)
+                return
+            self.last_sequence = last or 0
+            self._started.set_result(None)
+
+            while True:
+                try:
+                    listener = await self._listen(listener)
+                    await self._poll()
+                    await self._prune()
+                except (DatabaseError, SQLAlchemyError, OSError):
+                    Metrics.increment("change_feed", label="failed")
+                    await self._unlisten(listener)
+                    listener = None
+
+                # a held back change is fetched again once its gap may have expired
+                timeout = self.poll_interval if self._gap_since is None else min(self.poll_interval, self.gap_timeout)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+        finally:
+            corpus_generations.remove_listener(self.wake)
+            if not self._started.done():
+                self._started.cancel()
+            await asyncio.shield(self._unlisten(listener))
+            for subscription in self._subscriptions:
+                subscription.close()
+            self._subscriptions.clear()
+
+    async def _listen(self, listener: Optional[AsyncConnection]) -> Optional[AsyncConnection]:
+        """Helper method to LISTEN for the changes of the other workers on PostgreSQL, on a connection of its own."""
+        if engine.dialect.name != "postgresql":
+            return None
+        if listener is not None and not listener.closed:
+            driver_connection = (await listener.get_raw_connection()).driver_connection
+            if not driver_connection.is_closed():
+                return listener
+
+        listener = await engine.connect()
+        driver_connection = (await listener.get_raw_connection()).driver_connection
+        await driver_connection.add_listener(NoteChangeModel.NOTIFY_CHANNEL, self.wake)
+        # changes committed before the LISTEN sent no notification, they are fetched right after
+        self.wake()
+        return listener
+
+    async def _unlisten(self, listener: Optional[AsyncConnection]) -> None:
+        """Helper method to stop listening before the connection goes back to the pool."""
+        if listener is None:
+            return
+        try:
+            driver_connection = (await listener.get_raw_connection()).driver_connection
+            if not driver_connection.is_closed():
+                await driver_connection.remove_listener(NoteChangeModel.NOTIFY_CHANNEL, self.wake)
+            await listener.close()
+        except (SQLAlchemyError, OSError):
+            await listener.invalidate()
+
+    async def _poll(self) -> None:
+        """Helper method to deliver the late changes of the skipped ranges, then the changes past the last one."""
+        await self._rescan()
+        async with async_session() as session:
+            changes = await NoteChangeQuery(session, tenant_id=None).get_changes(
+                after=self.last_sequence, limit=self.page_rows
+            )
+
+        for change in changes:
+            if change["sequence"] != self.last_sequence + 1:
+                if self._gap_since is None:
+                    self._gap_since = time.monotonic()
+                if time.monotonic() - self._gap_since < self.gap_timeout:
+                    return
+                Metrics.increment("change_feed", label="gap_skipped")
+                self._skipped.append((self.last_sequence + 1, change["sequence"] - 1, time.monotonic(), set()))
+            self._gap_since = None
+            self.last_sequence = change["sequence"]
+            self._deliver(change)
+
+        if len(changes) == self.page_rows:
+            self.wake()
+
+    async def _rescan(self) -> None:
+        """Helper method to deliver the changes committed within the skipped ranges, and to give up on the old ones."""
+        now = time.monotonic()
+        expired = [gap for gap in self._skipped if now - gap[2] >= self.gap_horizon]
+        if expired:
+            Metrics.increment("change_feed", label="gap_expired", value=len(expired))
+            self._skipped = [gap for gap in self._skipped if gap not in expired]
+
+        for gap in list(self._skipped):
+            first, last, _, delivered = gap
+            async with async_session() as session:
+                changes = await NoteChangeQuery(session, tenant_id=None).get_changes(
+                    after=first - 1, until=last, limit=last - first + 1
+                )
+            for change in changes:
+                if change["sequence"] not in delivered:
+                    delivered.add(change["sequence"])
+                    Metrics.increment("change_feed", label="gap_filled")
+                    if len(delivered) == last - first + 1:
+                        self._skipped.remove(gap)
+                    self._deliver(change)
+
+    def _deliver(self, change: dict) -> None:
+        # the event ID a client resumes from, it never passes a range that may still be filled
+        change = {**change, "resume_sequence": self.resume_point(self.last_sequence)}
+        for subscription in list(self._subscriptions):
+            if subscription.tenant_id != change["tenant_id"]:
+                continue
+            if subscription.put(change):
+                Metrics.increment("change_feed", label="delivered")
+            else:
+                self.unsubscribe(subscription)
+                Metrics.increment("change_feed", label="lagging")
+
+    async def _prune(self) -> None:
+        """Helper method to delete the changes older than the retention, once an hour at most."""
+        if self._pruned_at is not None and time.monotonic() - self._pruned_at < 3600:
+            return
+        self._pruned_at = time.monotonic()
+        async with async_session() as session:
+            pruned = await NoteChangeQuery(session, tenant_id=None).prune(older_than=self.retention)
+        Metrics.increment("change_feed", label="pruned", value=pruned)
+
+
+# one reader per worker, shared by every change feed request
+change_feed = ChangeFeed(
+    poll_interval=env_config.CHANGE_FEED_POLL_INTERVAL,
+    gap_timeout=env_config.CHANGE_FEED_GAP_TIMEOUT,
+    gap_horizon=env_config.CHANGE_FEED_GAP_HORIZON,
+    queue_size=env_config.CHANGE_FEED_QUEUE_SIZE,
+    page_rows=env_config.CHANGE_FEED_PAGE_ROWS,
+    retention=timedelta(hours=env_config.CHANGE_FEED_RETENTION_HOURS),
+)
@@ -4,7 +4,14 @@ from fastapi import Depends
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
 from src.config import env_config
-from src.database.database.triggers import NoteTriggerQuery
+from src.database.database.partitions import NoteVersionPartitions
+from src.database.database.triggers import (
+    NoteTriggerQuery,
+    NoteStatsTriggerQuery,
+    NoteChangeTriggerQuery,
+    NoteKeywordTriggerQuery,
+    WordSketchTriggerQuery,
+)
 
 engine = create_async_engine(url=env_config.get_db_url, echo=False)
 
@@ -19,4 +26,11 @@ async def get_session() -> AsyncSession:
 # only 1 dependency
 SessionDepends = Annotated[AsyncSession, Depends(get_session)]
 
-_ = NoteTriggerQuery  # to registrate
+_ = (  # to registrate
+    NoteTriggerQuery,
+    NoteStatsTriggerQuery,
+    NoteChangeTriggerQuery,
+    NoteKeywordTriggerQuery,
+    WordSketchTriggerQuery,
+    NoteVersionPartitions,
+)
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Awaitable, Callable, Optional
+
+from src.backend.utils.exceptions import AnalyticsCancelledError
+from src.backend.utils.lazy import lazy_import
+from src.thirdweb.analytic.service import NoteAnalyticsService
+
+np = lazy_import("numpy")
+
+# shared memory layout: [cancel flag, notes count, offsets (count + 1)] as int64, then the UTF-8 contents
+_HEADER_ITEMS = 2
+_ITEM_SIZE = 8  # bytes of an int64
+
+
+class AnalyticsExecutor:
+    """
+    Runs NoteAnalyticsService computations in a pool of worker processes, so a large corpus never blocks the event loop.
+    Note contents are handed over through one shared memory block instead of pickled note dicts, encoded in a thread
+    so the loop keeps serving, and at most `max_concurrent_jobs` computations run at once; further requests wait
+    for a free slot. A cancelled job stops at its next phase (reading the corpus, decoding it, computing),
+    the computation itself runs to its end once started.
+    """
+
+    def __init__(self, max_workers: int = 2, max_concurrent_jobs: int = 2, min_notes: int = 1000):
+        self.max_workers = max_workers
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.min_notes = min_notes
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def run(
+            self,
+            method: str,
+            contents: list[str],
+            is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+            **kwargs,
+    ) -> Any:
+        """
+        Call `method` of NoteAnalyticsService over notes with the given contents.
+
+        :param method: Name of the NoteAnalyticsService method, it must return plain data (no note dicts).
+        :type method: str
+        :param contents: Contents of every note of the corpus.
+        :type contents: list[str]
+        :param is_disconnected: Polled while the job runs, the job is abandoned once it returns True.
+        :type is_disconnected: Optional[Callable[[], Awaitable[bool]]]
+        :returns: Whatever the analytics method returns.
+        :raises AnalyticsCancelledError: If the client disconnected before the result was ready.
+        """
+        if len(contents) < self.min_notes:
+            # below this size spawning the job costs more than the computation itself
+            service = NoteAnalyticsService(notes=[{"content": content} for content in contents])
+            return getattr(service, method)(**kwargs)
+
+        loop = asyncio.get_running_loop()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent_jobs)
+        await self._slots.acquire()
+
+        try:
+            memory = self._share(*await asyncio.to_thread(self._encode, contents))
+            future = self._get_pool().submit(_run_job, memory.name, method, kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        # the slot and the memory are only freed once the worker is really done, even if the request gave up earlier
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._finish, memory))
+        return await self._wait(future, memory, is_disconnected)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _wait(
+            self,
+            future: Future,
+            memory: SharedMemory,
+            is_disconnected: Optional[Callable[[], Awaitable[bool]]],
+    ) -> Any:
+        """Helper method to await the job while watching for a client disconnect."""
+        wrapped = asyncio.wrap_future(future)
+        try:
+            while True:
+                if is_disconnected is not None and await is_disconnected():
+                    raise AnalyticsCancelledError("The client disconnected before the analytics were computed.")
+                done, _ = await asyncio.wait({wrapped}, timeout=0.1)
+                if done:
+                    return wrapped.result()
+        except (asyncio.CancelledError, AnalyticsCancelledError):
+            self._cancel(future, memory)
+            raise
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Helper method to start the worker processes on first use."""
+        if self._pool is None:
+            # forking a process running an event loop is unsafe, the workers are spawned instead
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    @staticmethod
+    def _encode(contents: list[str]) -> tuple[np.ndarray, bytes]:
+        """Helper method to encode note contents as UTF-8, run in a thread: the offset of every note and the data."""
+        encoded = [content.encode() for content in contents]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(item) for item in encoded], out=offsets[1:])
+        return offsets, b"".join(encoded)
+
+    @staticmethod
+    def _share(offsets: np.ndarray, data: bytes) -> SharedMemory:
+        """Helper method to copy encoded note contents into a new shared memory block."""
+        data_start = (_HEADER_ITEMS + len(offsets)) * _ITEM_SIZE
+        memory = SharedMemory(create=True, size=max(data_start + len(data), 1))
+        header = np.ndarray((_HEADER_ITEMS + len(offsets),), dtype=np.int64, buffer=memory.buf)
+        header[0] = 0
+        header[1] = len(offsets) - 1
+        header[_HEADER_ITEMS:] = offsets
+        memory.buf[data_start:data_start + len(data)] = data
+        del header
+        return memory
+
+    @staticmethod
+    def _cancel(future: Future, memory: SharedMemory) -> None:
+        """Helper method to drop a queued job, or tell a started one to stop at its next phase."""
+        if not future.cancel():
+            try:
+                np.ndarray((1,), dtype=np.int64, buffer=memory.buf)[0] = 1
+            except (TypeError, ValueError):
+                pass  # the memory was already released, the job is over
+
+    def _finish(self, memory: SharedMemory) -> None:
+        """Helper method to release the resources of a finished job."""
+        memory.close()
+        memory.unlink()
+        self._slots.release()
+
+
+def _run_job(name: str, method: str, kwargs: dict) -> Any:
+    """
+    Entry point of the worker processes, reads the corpus from shared memory and runs the analytics.
+    The cancel flag is checked before every phase, a job abandoned meanwhile returns None.
+    """
+    memory = SharedMemory(name=name)
+    try:
+        if _is_cancelled(memory):
+            return None
+        count = int(np.ndarray((_HEADER_ITEMS,), dtype=np.int64, buffer=memory.buf)[1])
+        header = np.ndarray((_HEADER_ITEMS + count + 1,), dtype=np.int64, buffer=memory.buf)
+        offsets = header[_HEADER_ITEMS:].tolist()
+        del header
+
+        data_start = (_HEADER_ITEMS + count + 1) * _ITEM_SIZE
+        data = bytes(memory.buf[data_start:data_start + offsets[-1]])
+        if _is_cancelled(memory):
+            return None
+
+        notes = [{"content": data[start:end].decode()} for start, end in zip(offsets, offsets[1:])]
+        if _is_cancelled(memory):
+            return None
+        return getattr(NoteAnalyticsService(notes=notes), method)(**kwargs)
+    finally:
+        memory.close()
+
+
+def _is_cancelled(memory: SharedMemory) -> bool:
+    """Reads the cancel flag of a job."""
+    return bool(np.ndarray((1,), dtype=np.int64, buffer=memory.buf)[0])
@@ -1,8 +1,28 @@
-import numpy as np
+from __future__ import annotations
+
+import math
 import string
+from array import array
 from collections import Counter
+from datetime import date, timedelta
+
+from src.backend.utils.lazy import lazy_import
 from src.config import STOPWORDS
 
+np = lazy_import("numpy")
+
+_PHRASE_BOUNDARIES = (".", "!", "?", ";", ":", ",")
+# odd 64-bit constant (2^64 / golden ratio), spreads the word ids over the whole hash space
+_PHRASE_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+class _IdAssigner(dict):
+    """Maps keys to consecutive ids, a missing key gets the next one on lookup."""
+
+    def __missing__(self, key):
+        self[key] = value = len(self)
+        return value
+
 
 class NoteAnalyticsService:
     def __init__(self, notes: list[dict]):
@@ -31,17 +51,56 @@ class NoteAnalyticsService:
             if count > min_count
         }
 
+    def get_vocabulary_size(self) -> int:
+        """Returns the number of distinct words across all notes, excluding stopwords."""
+        return len({word for note in self.notes for word in NoteKeywordService.tokenize(note["content"])})
+
+    def get_most_common_phrases(self, n=2, min_count=3) -> dict:
+        """
+        Returns the most common phrases of `n` consecutive words across all notes, the most common first.
+        Phrases never span a stopword, a sentence or clause boundary (punctuation) or the end of a note.
+        """
+        word_ids, vocabulary, starts = self._encode_words()
+        windows = len(word_ids) - n + 1
+        if windows <= 0:
+            return {}
+
+        # a window is a phrase when its first and last words belong to the same run of words
+        runs = np.cumsum(starts)
+        positions = np.flatnonzero(runs[:windows] == runs[n - 1:])
+
+        # one 64-bit id per phrase, hashed from its word ids, so counting is a sort of integers
+        hashes, multiplier = np.zeros(len(positions), dtype=np.uint64), np.uint64(_PHRASE_HASH_MULTIPLIER)
+        for offset in range(n):
+            hashes = hashes * multiplier + word_ids[positions + offset].astype(np.uint64)
+        _, first, counts = np.unique(hashes, return_index=True, return_counts=True)
+
+        frequent = np.flatnonzero(counts > min_count)
+        phrases = {
+            " ".join(vocabulary[word_id] for word_id in word_ids[positions[first[index]]:][:n]): int(counts[index])
+            for index in frequent
+        }
+        return dict(sorted(phrases.items(), key=lambda item: (-item[1], item[0])))
+
     def get_longest_notes(self, top_n=3) -> list[dict]:
         """Returns the top N the longest notes based on word count."""
-        word_counts = self._get_word_counts()
-        sorted_indices = np.argsort(word_counts)[-top_n:]
-        return [self.notes[i] for i in sorted_indices[::-1]]
+        return [self.notes[i] for i in self.get_longest_note_indices(top_n=top_n)]
 
     def get_shortest_notes(self, top_n=3) -> list[dict]:
         """Returns the top N the shortest notes based on word count."""
+        return [self.notes[i] for i in self.get_shortest_note_indices(top_n=top_n)]
+
+    def get_longest_note_indices(self, top_n=3) -> list[int]:
+        """Returns the positions of the top N the longest notes, the longest first."""
+        word_counts = self._get_word_counts()
+        sorted_indices = np.argsort(word_counts)[-top_n:]
+        return [int(i) for i in sorted_indices[::-1]]
+
+    def get_shortest_note_indices(self, top_n=3) -> list[int]:
+        """Returns the positions of the top N the shortest notes, the shortest first."""
         word_counts = self._get_word_counts()
         sorted_indices = np.argsort(word_counts)[:top_n]
-        return [self.notes[i] for i in sorted_indices]
+        return [int(i) for i in sorted_indices]
 
     def _get_word_counts(self) -> np.ndarray:
         """Helper method to get word counts for all notes."""
@@ -50,6 +109,41 @@ class NoteAnalyticsService:
             dtype=int
         )
 
+    def _encode_words(self) -> tuple[np.ndarray, list[str], np.ndarray]:
+        """
+        Helper method to encode the words of all notes, stopwords left out, as integer ids.
+        Every distinct raw token is normalized once, the corpus itself only goes through dict lookups
+        and is held as one integer per token.
+
+        :returns: The id of every word, the vocabulary (word by id) and whether every word starts a run
+            of words, i.e. follows a stopword, a sentence or clause boundary or the beginning of a note.
+        """
+        raw_ids = _IdAssigner()
+        tokens, note_starts = array("q"), array("q")
+        for note in self.notes:
+            note_starts.append(len(tokens))
+            tokens.extend(map(raw_ids.__getitem__, note["content"].split()))
+        tokens = np.frombuffer(tokens, dtype=np.int64)
+
+        vocabulary: dict[str, int] = {}
+        raw_word_ids = np.empty(len(raw_ids), dtype=np.int64)
+        raw_ends_run = np.empty(len(raw_ids), dtype=bool)
+        for raw, index in raw_ids.items():
+            word = raw.lower().strip(string.punctuation)
+            stopword = not word or word in STOPWORDS
+            raw_word_ids[index] = -1 if stopword else vocabulary.setdefault(word, len(vocabulary))
+            raw_ends_run[index] = raw.endswith(_PHRASE_BOUNDARIES)
+
+        word_ids = raw_word_ids[tokens]
+        kept = word_ids >= 0
+        # a token starts a run after a dropped token, a boundary mark or at the beginning of a note
+        starts = np.ones(len(tokens), dtype=bool)
+        starts[1:] = ~kept[:-1] | raw_ends_run[tokens[:-1]]
+        note_starts = np.frombuffer(note_starts, dtype=np.int64)
+        starts[note_starts[note_starts < len(tokens)]] = True
+
+        return word_ids[kept], list(vocabulary), starts[kept]
+
     def _extract_filtered_words(self) -> list[str]:
         """Helper method to extract words from notes and filter out stopwords."""
         all_words = " ".join(note["content"] for note in self.notes).split()
@@ -58,3 +152,76 @@ class NoteAnalyticsService:
             for word in all_words
             if word.lower() not in STOPWORDS
         ]
+
+
+class NoteTimelineService:
+    COUNTERS = ("notes_created", "words_created", "notes_updated", "words_updated", "notes_deleted")
+
+    def __init__(self, daily_stats: list[dict]):
+        self.daily_stats = daily_stats
+
+    def get_buckets(self, granularity: str = "day") -> list[dict]:
+        """Returns the daily counters summed per day, week (starting on Monday) or month, in time order."""
+        buckets: dict[date, dict] = {}
+        for row in self.daily_stats:
+            period = self._period_start(row["day"], granularity)
+            bucket = buckets.setdefault(period, dict.fromkeys(self.COUNTERS, 0))
+            for counter in self.COUNTERS:
+                bucket[counter] += row[counter]
+
+        return [
+            {"period": period.isoformat(), **counters}
+            for period, counters in sorted(buckets.items())
+        ]
+
+    def get_total(self, counter: str) -> int:
+        """Returns the sum of one daily counter over all days."""
+        return sum(row[counter] for row in self.daily_stats)
+
+    @staticmethod
+    def _period_start(day: date, granularity: str) -> date:
+        """Helper method to map a day onto the first day of its period."""
+        if granularity == "week":
+            return day - timedelta(days=day.weekday())
+        if granularity == "month":
+            return day.replace(day=1)
+        return day
+
+
+class NoteKeywordService:
+    """
+    Ranks the words of one note by TF-IDF. The document frequencies are handed in by the caller,
+    which keeps them up to date on every write, so no request ever has to scan the whole corpus.
+    """
+
+    def __init__(self, top_n: int = 10):
+        self.top_n = top_n
+
+    @staticmethod
+    def tokenize(text: str) -> list[str]:
+        """Returns the lowercased words of the text, without punctuation and stopwords."""
+        words = (raw.lower().strip(string.punctuation) for raw in text.split())
+        return [word for word in words if word and word not in STOPWORDS]
+
+    def get_keywords(self, words: list[str], document_frequencies: dict[str, int], documents_count: int) -> list[dict]:
+        """
+        Returns the `top_n` keywords of a note, best first.
+
+        :param words: The tokenized note content, see `tokenize`.
+        :type words: list[str]
+        :param document_frequencies: Number of notes containing each word of the note.
+        :type document_frequencies: dict[str, int]
+        :param documents_count: Number of notes in the corpus.
+        :type documents_count: int
+        :returns: A list of {"term": ..., "score": ...} dictionaries.
+        :rtype: list[dict]
+        """
+        if not words:
+            return []
+
+        scores = {
+            term: count / len(words) * (math.log((1 + documents_count) / (1 + document_frequencies.get(term, 0))) + 1)
+            for term, count in Counter(words).items()
+        }
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:self.top_n]
+        return [{"term": term, "score": round(score, 6)} for term, score in best]
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import hashlib
+import math
+from typing import Optional
+
+from src.backend.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+
+def hash_terms(terms: list[str]) -> np.ndarray:
+    """Returns a 64-bit hash of every term, stable across processes and restarts (unlike `hash`)."""
+    digests = b"".join(hashlib.blake2b(term.encode(), digest_size=8).digest() for term in terms)
+    return np.frombuffer(digests, dtype="<u8").astype(np.uint64)
+
+
+class CountMinSketch:
+    """
+    Count-Min sketch (Cormode & Muthukrishnan) of word counts: `depth` rows of `width` counters, every word
+    increments one counter per row and its count is estimated by the smallest of them.
+    With N words counted, an estimate is never below the true count, and exceeds it by more than
+    e / width * N with probability at most exp(-depth) (0.13% of N with 98% confidence for 2048 x 4).
+    Counts can be decremented, the bounds hold as long as no true count goes negative.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4, table: Optional[np.ndarray] = None):
+        self.width = width
+        self.depth = depth
+        self.table = table if table is not None else np.zeros((depth, width), dtype=np.int64)
+
+    @property
+    def total(self) -> int:
+        """Number of words counted (N), every row sums to it."""
+        return int(self.table[0].sum())
+
+    @property
+    def error_bound(self) -> float:
+        """Overestimation that an estimate exceeds with probability at most exp(-depth)."""
+        return math.e / self.width * self.total
+
+    def positions(self, terms: list[str]) -> np.ndarray:
+        """
+        Column of every term in every row.
+
+        :returns: An array of shape (len(terms), depth).
+        :rtype: np.ndarray
+        """
+        hashes = hash_terms(terms)
+        # double hashing, the rows need independent columns but one hash is enough to derive them
+        first, second = hashes & np.uint64(0xFFFFFFFF), (hashes >> np.uint64(32)) | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64)
+        return ((first[:, None] + rows[None, :] * second[:, None]) % np.uint64(self.width)).astype(np.int64)
+
+    def increments(self, counts: dict[str, int]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Counter increments for the given word counts, summed per counter.
+
+        :returns: The row, column and increment of every counter that changes.
+        :rtype: tuple[np.ndarray, np.ndarray, np.ndarray]
+        """
+        delta = np.zeros(self.depth * self.width, dtype=np.int64)
+        if counts:
+            flat = self.positions(list(counts)) + np.arange(self.depth) * self.width
+            np.add.at(delta, flat.ravel(), np.repeat(np.fromiter(counts.values(), dtype=np.int64), self.depth))
+        changed = np.flatnonzero(delta)
+        return changed // self.width, changed % self.width, delta[changed]
+
+    def add(self, counts: dict[str, int]) -> None:
+        """Counts the words, negative counts remove them."""
+        rows, columns, values = self.increments(counts)
+        self.table[rows, columns] += values
+
+    def estimate(self, terms: list[str]) -> np.ndarray:
+        """Returns the estimated count of every term."""
+        if not terms:
+            return np.zeros(0, dtype=np.int64)
+        return self.table[np.arange(self.depth)[None, :], self.positions(terms)].min(axis=1)
+
+
+class HyperLogLog:
+    """
+    HyperLogLog (Flajolet et al.) of distinct words: every word is routed to one of 2 ** precision registers,
+    which keeps the longest run of leading zero bits seen among the hashes routed to it.
+    The distinct count is estimated with a relative standard error of 1.04 / sqrt(2 ** precision)
+    (1.6% for precision 12); small cardinalities fall back to linear counting.
+    Registers only grow, a word keeps being counted after every note containing it is gone.
+    """
+
+    def __init__(self, precision: int = 12, registers: Optional[np.ndarray] = None):
+        self.precision = precision
+        self.registers = registers if registers is not None else np.zeros(1 << precision, dtype=np.int64)
+
+    @property
+    def relative_error(self) -> float:
+        """Relative standard error of the estimate."""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def ranks(self, terms: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Register updates for the given words, the highest rank per register.
+
+        :returns: The index and the rank of every register the words reach.
+        :rtype: tuple[np.ndarray, np.ndarray]
+        """
+        ranks = np.zeros(len(self.registers), dtype=np.int64)
+        if terms:
+            hashes = hash_terms(terms)
+            bits = 64 - self.precision
+            indices = (hashes >> np.uint64(bits)).astype(np.int64)
+            remainders = hashes & np.uint64((1 << bits) - 1)
+            # exact bit lengths, float logarithms round up just below powers of two
+            values = np.fromiter((bits - int(value).bit_length() + 1 for value in remainders), dtype=np.int64)
+            np.maximum.at(ranks, indices, values)
+        reached = np.flatnonzero(ranks)
+        return reached, ranks[reached]
+
+    def add(self, terms: list[str]) -> None:
+        """Counts the words."""
+        indices, ranks = self.ranks(terms)
+        self.registers[indices] = np.maximum(self.registers[indices], ranks)
+
+    def count(self) -> int:
+        """Returns the estimated number of distinct words."""
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * size and zeros:
+            estimate = size * math.log(size / zeros)
+        return int(round(estimate))
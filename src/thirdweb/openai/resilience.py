@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import re
+import time
+from email.utils import parsedate_to_datetime
+from enum import StrEnum
+from typing import Optional
+
+from src.backend.utils.lazy import lazy_import
+
+httpx = lazy_import("httpx")
+
+
+class RetryPolicy:
+    """
+    Decides whether a failed AI API call should be retried and how long to wait before the next attempt.
+    Delays grow exponentially with "full jitter", unless the server tells us how long to wait.
+    """
+
+    RETRYABLE_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504})
+    _DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+    _DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 20.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def is_retryable(self, status_code: int) -> bool:
+        """
+        Check whether a response with the given status code is worth retrying.
+
+        :param status_code: HTTP status code returned by the AI API.
+        :type status_code: int
+        :returns: True for throttling, timeouts and server-side errors.
+        :rtype: bool
+        """
+        return status_code in self.RETRYABLE_STATUS_CODES
+
+    def backoff(self, attempt: int, headers: Optional[httpx.Headers] = None) -> float:
+        """
+        Compute the delay before the next attempt.
+
+        :param attempt: Zero-based number of the attempt that just failed.
+        :type attempt: int
+        :param headers: Headers of the failed response, if there was a response at all.
+        :type headers: Optional[Headers]
+        :returns: Delay in seconds.
+        :rtype: float
+        """
+        hint = self.server_delay(headers) if headers is not None else None
+        if hint is not None:
+            return min(hint, self.max_delay) + random.uniform(0, self.base_delay)
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    @classmethod
+    def server_delay(cls, headers: httpx.Headers) -> Optional[float]:
+        """
+        Read how long the server asks us to wait from `Retry-After` or from the rate-limit reset headers.
+
+        :param headers: Response headers.
+        :type headers: Headers
+        :returns: Delay in seconds, or None if the server gave no hint.
+        :rtype: Optional[float]
+        """
+        retry_after = headers.get("retry-after-ms")
+        if retry_after is not None:
+            try:
+                return max(float(retry_after) / 1000, 0.0)
+            except ValueError:
+                pass
+
+        retry_after = headers.get("retry-after")
+        if retry_after is not None:
+            try:
+                return max(float(retry_after), 0.0)
+            except ValueError:
+                try:
+                    return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+                except (TypeError, ValueError):
+                    pass
+
+        return cls.rate_limit_reset(headers)
+
+    @classmethod
+    def rate_limit_reset(cls, headers: httpx.Headers) -> Optional[float]:
+        """
+        Return the time until an exhausted rate-limit window resets.
+        Only windows with no remaining requests or tokens are taken into account.
+        """
+        delays = []
+        for dimension in ("requests", "tokens"):
+            remaining = headers.get(f"x-ratelimit-remaining-{dimension}")
+            reset = headers.get(f"x-ratelimit-reset-{dimension}")
+            if remaining is None or reset is None:
+                continue
+            try:
+                exhausted = int(float(remaining)) <= 0
+            except ValueError:
+                continue
+
+            duration = cls.parse_duration(reset)
+            if exhausted and duration is not None:
+                delays.append(duration)
+
+        return max(delays) if delays else None
+
+    @classmethod
+    def parse_duration(cls, value: str) -> Optional[float]:
+        """Parse durations such as '20ms', '1s' or '6m0s' into seconds."""
+        parts = cls._DURATION_PATTERN.findall(value.strip())
+        if not parts:
+            try:
+                return float(value)
+            except ValueError:
+                return None
+        return sum(float(amount) * cls._DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class CircuitState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Stops calling the AI API after several consecutive failures, so a broken upstream is not hammered.
+    After `reset_timeout` seconds a single trial call is let through; its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may be sent upstream right now.
+
+        :returns: False while the circuit is open or a half-open trial call is already running.
+        :rtype: bool
+        """
+        if self.state == CircuitState.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = CircuitState.HALF_OPEN
+            self._trial_in_flight = False
+
+        if self.state == CircuitState.HALF_OPEN:
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+
+        return True
+
+    def record_success(self) -> None:
+        """Close the circuit and forget previous failures."""
+        self.state = CircuitState.CLOSED
+        self._failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Count a failure and open the circuit once the threshold is reached."""
+        self._failures += 1
+        if self.state == CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+            self.state = CircuitState.OPEN
+            self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def record_cancelled(self) -> None:
+        """
+        Account for a call abandoned before its outcome was known (timeout, cancelled request, closed stream).
+        It says nothing about the upstream, except for a half-open trial: that one counts as a failure,
+        otherwise the circuit would wait for its outcome forever.
+        """
+        if self.state == CircuitState.HALF_OPEN and self._trial_in_flight:
+            self.record_failure()
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limits the number of in-flight AI API calls with an AIMD (additive increase, multiplicative decrease) policy.
+    Every successful call raises the limit by roughly one per round trip, every throttled call halves it,
+    so concurrency converges to what the quota allows instead of collapsing into a retry storm.
+    """
+
+    def __init__(
+            self,
+            initial_limit: float = 4,
+            min_limit: float = 1,
+            max_limit: float = 32,
+            decrease_factor: float = 0.5,
+            decrease_cooldown: float = 1.0,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        """Wait until a call slot is free and the upstream is not asking us to hold off."""
+        async with self._condition:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), timeout=pause)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                if self.in_flight < max(int(self.limit), 1):
+                    self.in_flight += 1
+                    return
+
+                await self._condition.wait()
+
+    async def release(self) -> None:
+        """Free a call slot taken by `acquire`."""
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self) -> None:
+        """Additive increase: about +1 to the limit once the whole window succeeded."""
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def on_throttled(self) -> None:
+        """Multiplicative decrease, applied at most once per cooldown so one burst of 429s counts once."""
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every new call for `seconds`, e.g. until an exhausted rate-limit window resets."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
@@ -0,0 +1,134 @@
+import asyncio
+import time
+from collections import deque
+from enum import IntEnum
+from typing import Optional
+
+from src.backend.utils.metrics import Metrics
+from src.thirdweb.openai.utils import PromptUtils
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class TokenBudget:
+    """
+    Per-minute budget refilled continuously (a token bucket holding at most one minute of quota).
+    A non-positive `per_minute` means the budget is unlimited.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._rate = per_minute / 60
+        self._updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def time_until(self, cost: float, now: float) -> float:
+        """Returns how many seconds are left until `cost` fits into the budget."""
+        if self.unlimited:
+            return 0.0
+
+        self.level = min(self.capacity, self.level + (now - self._updated) * self._rate)
+        self._updated = now
+        return 0.0 if self.level >= cost else (cost - self.level) / self._rate
+
+    def consume(self, cost: float) -> None:
+        """Takes `cost` out of the budget, `time_until` must have returned 0 just before."""
+        if not self.unlimited:
+            self.level -= cost
+
+
+class SummarizationScheduler:
+    """
+    Admits AI API calls under the requests-per-minute and tokens-per-minute quotas.
+    Waiting calls are queued in priority lanes: a background call is only admitted when no interactive call waits,
+    so a bulk job can never starve interactive note edits. Within a lane calls are admitted in arrival order.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self._requests = TokenBudget(requests_per_minute)
+        self._tokens = TokenBudget(tokens_per_minute)
+        self._lanes: dict[Priority, deque[tuple[float, asyncio.Future]]] = {
+            priority: deque() for priority in Priority
+        }
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def acquire(self, prompt: str, priority: Priority = Priority.INTERACTIVE) -> None:
+        """
+        Wait until the prompt can be sent without exceeding the quotas.
+
+        :param prompt: The prompt about to be sent, its token cost is estimated from it.
+        :type prompt: str
+        :param priority: The lane the call waits in.
+        :type priority: Priority
+        """
+        cost = PromptUtils.estimate_tokens(prompt)
+        if not self._tokens.unlimited:
+            # a prompt larger than the whole budget would wait forever otherwise
+            cost = min(cost, self._tokens.capacity)
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (cost, future)
+        self._lanes[priority].append(waiter)
+        started = time.monotonic()
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if waiter in self._lanes[priority]:
+                self._lanes[priority].remove(waiter)
+            self._dispatch()
+            raise
+        finally:
+            Metrics.observe(f"scheduler_wait_seconds_{priority.name.lower()}", time.monotonic() - started)
+
+    def queue_depth(self, priority: Priority) -> int:
+        """Returns how many calls wait in the given lane."""
+        return len(self._lanes[priority])
+
+    def _dispatch(self) -> None:
+        """Helper method to admit as many waiting calls as the budgets allow, highest priority first."""
+        now = time.monotonic()
+        try:
+            for priority in Priority:
+                lane = self._lanes[priority]
+                while lane:
+                    cost, future = lane[0]
+                    if future.done():
+                        lane.popleft()
+                        continue
+
+                    wait = max(self._requests.time_until(1, now), self._tokens.time_until(cost, now))
+                    if wait > 0:
+                        # lower lanes wait as well, otherwise they would eat the budget the head call waits for
+                        self._schedule(wait)
+                        return
+
+                    self._requests.consume(1)
+                    self._tokens.consume(cost)
+                    lane.popleft()
+                    future.set_result(None)
+        finally:
+            for priority in Priority:
+                Metrics.set_gauge(f"scheduler_queue_depth_{priority.name.lower()}", self.queue_depth(priority))
+
+    def _schedule(self, delay: float) -> None:
+        """Helper method to run the dispatcher again once the budget refilled."""
+        loop = asyncio.get_running_loop()
+        when = loop.time() + delay
+        if self._timer is not None and not self._timer.cancelled() and self._timer.when() <= when:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = loop.call_at(when, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
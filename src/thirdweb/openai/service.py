@@ -1,6 +1,15 @@
-from typing import Optional
+from __future__ import annotations
 
-from httpx import AsyncClient, Response, Timeout
+import asyncio
+import json
+from typing import AsyncIterator, Optional
+
+from src.backend.utils.lazy import lazy_import
+
+from src.thirdweb.openai.resilience import AdaptiveConcurrencyLimiter, CircuitBreaker, RetryPolicy
+from src.thirdweb.openai.scheduler import Priority, SummarizationScheduler
+
+httpx = lazy_import("httpx")
 
 
 class OpenAIService:
@@ -10,9 +19,45 @@ class OpenAIService:
 
     BASE_URL = "https://api.openai.com/v1/chat/completions"
 
-    def __init__(self, api_key: str, model: str):
+    # shared by every instance, the quota belongs to the API key and not to a single request
+    _retry_policy = RetryPolicy()
+    _circuit_breaker = CircuitBreaker()
+    _limiter = AdaptiveConcurrencyLimiter()
+    # one connection pool for every call, created on first use (or by the warm-up) and closed on shutdown
+    _client: Optional[httpx.AsyncClient] = None
+
+    def __init__(
+            self,
+            api_key: str,
+            model: str,
+            retry_policy: Optional[RetryPolicy] = None,
+            circuit_breaker: Optional[CircuitBreaker] = None,
+            limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+            scheduler: Optional[SummarizationScheduler] = None,
+            priority: Priority = Priority.INTERACTIVE,
+    ):
         self._api_key = api_key
         self.model = model
+        self.retry_policy = retry_policy or self._retry_policy
+        self.circuit_breaker = circuit_breaker or self._circuit_breaker
+        self.limiter = limiter or self._limiter
+        # every request sent, retries included, is charged to the quotas in the lane of `priority`
+        self.scheduler = scheduler
+        self.priority = priority
+
+    @classmethod
+    def get_client(cls) -> httpx.AsyncClient:
+        """Returns the shared HTTP client, creating it (and its TLS context) on first use."""
+        if cls._client is None or cls._client.is_closed:
+            cls._client = httpx.AsyncClient()
+        return cls._client
+
+    @classmethod
+    async def close_client(cls) -> None:
+        """Closes the shared HTTP client and its connections."""
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
 
     def _prepare_headers(self) -> dict:
         """
@@ -26,21 +71,46 @@ class OpenAIService:
             "Content-Type": "application/json",
         }
 
-    def _prepare_request_payload(self, user_prompt: str) -> dict:
+    def _prepare_request_payload(self, user_prompt: str, stream: bool = False) -> dict:
         """
         Prepare the request payload for the AI API, including the model and the user-provided prompt.
 
         :param user_prompt: The input prompt provided by the user to be sent to the AI.
         :type user_prompt: str
+        :param stream: Whether the completion should be streamed back token by token.
+        :type stream: bool
         :returns: A dictionary containing the request payload to be sent to the API.
         :rtype: dict
         """
-        return {
+        payload = {
             "model": self.model,
             "messages": [{"role": "user", "content": user_prompt}],
         }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    @staticmethod
+    def _parse_stream_line(line: str) -> Optional[str]:
+        """
+        Extract the content delta from one line of a streamed (server-sent events) completion.
 
-    async def _send_request(self, request_data: dict, headers: dict) -> Response:
+        :param line: A single line of the event stream.
+        :type line: str
+        :returns: The content delta, or None for keep-alives, role-only chunks and the final '[DONE]' marker.
+        :rtype: Optional[str]
+        """
+        if not line.startswith("data:"):
+            return None
+
+        data = line[len("data:"):].strip()
+        if not data or data == "[DONE]":
+            return None
+
+        choices = json.loads(data).get("choices") or [{}]
+        return choices[0].get("delta", {}).get("content") or None
+
+    async def _send_request(self, request_data: dict, headers: dict) -> httpx.Response:
         """
         Send an HTTP POST request to the AI API with the provided data and headers.
 
@@ -51,13 +121,12 @@ class OpenAIService:
         :returns: The response object returned by the AI API.
         :rtype: Response
         """
-        async with AsyncClient() as client:
-            timeout = Timeout(10.0)
-            return await client.post(
-                self.BASE_URL, json=request_data, headers=headers, timeout=timeout
-            )
+        timeout = httpx.Timeout(10.0)
+        return await self.get_client().post(
+            self.BASE_URL, json=request_data, headers=headers, timeout=timeout
+        )
 
-    async def get_response(self, user_prompt: str) -> Response:
+    async def get_response(self, user_prompt: str) -> httpx.Response:
         """
         Prepare the request, send it to the AI service, and return the response.
 
@@ -70,17 +139,157 @@ class OpenAIService:
         request_data = self._prepare_request_payload(user_prompt=user_prompt)
         return await self._send_request(request_data=request_data, headers=headers)
 
+    async def get_response_with_retries(self, user_prompt: str) -> Optional[httpx.Response]:
+        """
+        Send the prompt through the circuit breaker, the scheduler and the concurrency limiter,
+        retrying throttled or failed calls with jittered exponential backoff. Every attempt waits for the scheduler.
+
+        :param user_prompt: The input prompt to be sent to the AI service.
+        :type user_prompt: str
+        :returns: The last response of the AI API, or None if no response was received
+            (open circuit or transport errors on every attempt).
+        :rtype: Optional[Response]
+        """
+        response = None
+        for attempt in range(self.retry_policy.max_retries + 1):
+            if not self.circuit_breaker.allow_request():
+                return response
+
+            try:
+                await self._schedule(user_prompt)
+                await self.limiter.acquire()
+                try:
+                    response = await self.get_response(user_prompt=user_prompt)
+                except httpx.TransportError:
+                    response = None
+                finally:
+                    await self.limiter.release()
+            except asyncio.CancelledError:
+                self.circuit_breaker.record_cancelled()
+                raise
+
+            if response is not None and response.status_code < 400:
+                self._record_accepted(response)
+                return response
+            self._record_rejected(response)
+
+            if response is not None and not self.retry_policy.is_retryable(response.status_code):
+                return response
+            if attempt == self.retry_policy.max_retries:
+                return response
+
+            delay = self.retry_policy.backoff(
+                attempt=attempt,
+                headers=response.headers if response is not None else None,
+            )
+            if response is not None and response.status_code == 429:
+                self.limiter.pause(delay)
+            await asyncio.sleep(delay)
+
+        return response
+
+    async def stream_data(self, user_prompt: str) -> AsyncIterator[str]:
+        """
+        Stream the AI-generated response token by token, as soon as the model produces them.
+        Goes through the circuit breaker, the scheduler and the concurrency limiter like the blocking calls.
+        Throttled or failed calls are retried with the same backoff as long as no token has been yielded;
+        once one has, the call cannot be replayed transparently and a failure ends the stream.
+
+        :param user_prompt: The input provided by the user.
+        :type user_prompt: str
+        :returns: An async iterator over content deltas; it yields nothing if the request fails.
+        :rtype: AsyncIterator[str]
+        """
+        headers = self._prepare_headers()
+        request_data = self._prepare_request_payload(user_prompt=user_prompt, stream=True)
+        # only the connection is bounded, tokens may keep coming for longer than a blocking call takes
+        timeout = httpx.Timeout(10.0, read=None)
+
+        for attempt in range(self.retry_policy.max_retries + 1):
+            if not self.circuit_breaker.allow_request():
+                return
+
+            try:
+                await self._schedule(user_prompt)
+                await self.limiter.acquire()
+            except asyncio.CancelledError:
+                self.circuit_breaker.record_cancelled()
+                raise
+            response = None
+            yielded = False
+            try:
+                async with self.get_client().stream(
+                    "POST", self.BASE_URL, json=request_data, headers=headers, timeout=timeout
+                ) as response:
+                    if response.status_code == 200:
+                        async for line in response.aiter_lines():
+                            delta = self._parse_stream_line(line)
+                            if delta:
+                                yielded = True
+                                yield delta
+            except httpx.TransportError:
+                response = None
+            except (asyncio.CancelledError, GeneratorExit):
+                # the client went away mid-stream
+                self.circuit_breaker.record_cancelled()
+                raise
+            finally:
+                await self.limiter.release()
+
+            if response is not None and response.status_code == 200:
+                self._record_accepted(response)
+                return
+            self._record_rejected(response)
+
+            if yielded:
+                return
+            if response is not None and not self.retry_policy.is_retryable(response.status_code):
+                return
+            if attempt == self.retry_policy.max_retries:
+                return
+
+            delay = self.retry_policy.backoff(
+                attempt=attempt,
+                headers=response.headers if response is not None else None,
+            )
+            if response is not None and response.status_code == 429:
+                self.limiter.pause(delay)
+            await asyncio.sleep(delay)
+
+    def _record_accepted(self, response: httpx.Response) -> None:
+        """Helper method to report a successful call to the circuit breaker and the limiter."""
+        self.circuit_breaker.record_success()
+        self.limiter.on_success()
+        reset = self.retry_policy.rate_limit_reset(response.headers)
+        if reset:
+            self.limiter.pause(reset)
+
+    def _record_rejected(self, response: Optional[httpx.Response]) -> None:
+        """Helper method to report a failed call, None if no response came, to the circuit breaker and the limiter."""
+        if response is None or response.status_code >= 500:
+            self.circuit_breaker.record_failure()
+        else:
+            # the upstream answered, throttling only shrinks concurrency and does not open the circuit
+            self.circuit_breaker.record_success()
+            if response.status_code == 429:
+                self.limiter.on_throttled()
+
+    async def _schedule(self, user_prompt: str) -> None:
+        """Helper method to wait until the scheduler admits the prompt, if there is a scheduler."""
+        if self.scheduler is not None:
+            await self.scheduler.acquire(user_prompt, priority=self.priority)
+
     async def fetch_data(self, user_prompt: str) -> Optional[str]:
         """
         Main method to fetch data from the AI API based on the user's prompt.
 
         :param user_prompt: The input provided by the user.
         :type user_prompt: str
-        :returns: The AI-generated response, or None if the request fails.
+        :returns: The AI-generated response, or None if the request fails after all retries.
         :rtype: Optional[str]
         """
-        response = await self.get_response(user_prompt=user_prompt)
-        if response.status_code == 200:
+        response = await self.get_response_with_retries(user_prompt=user_prompt)
+        if response is not None and response.status_code == 200:
             return response.json()["choices"][0]["message"]["content"]
         else:
             return None
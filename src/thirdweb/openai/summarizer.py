@@ -0,0 +1,73 @@
+import asyncio
+from typing import Optional
+
+from src.thirdweb.openai.service import OpenAIService
+from src.thirdweb.openai.utils import PromptUtils
+from src.thirdweb.summarizer.service import BaseSummarizer
+
+
+class OpenAISummarizer(BaseSummarizer):
+    """
+    Summarizes note content with the AI API.
+    Content longer than one chunk is summarized map-reduce style: it is split at sentence boundaries,
+    the chunks are summarized concurrently (at most `max_parallel` at once) and the partial summaries are merged.
+    """
+
+    def __init__(
+            self,
+            service: OpenAIService,
+            chunk_words: int = 500,
+            max_parallel: int = 4,
+            merge_with_model: bool = False,
+    ):
+        self.service = service
+        self.chunk_words = chunk_words
+        self.max_parallel = max_parallel
+        self.merge_with_model = merge_with_model
+
+    async def summarize(self, text: str) -> Optional[str]:
+        """
+        Summarize the given text, in a single call when it fits into one chunk.
+
+        :param text: The note content.
+        :type text: str
+        :returns: The summary, or None if any part of it could not be generated.
+        :rtype: Optional[str]
+        """
+        chunks = PromptUtils.split_into_chunks(text=text, max_words=self.chunk_words)
+        if len(chunks) <= 1:
+            return await self._summarize_chunk(text)
+
+        semaphore = asyncio.Semaphore(self.max_parallel)
+
+        async def summarize_bounded(chunk: str) -> Optional[str]:
+            async with semaphore:
+                return await self._summarize_chunk(chunk)
+
+        summaries = await asyncio.gather(*(summarize_bounded(chunk) for chunk in chunks))
+        if any(summary is None for summary in summaries):
+            return None
+
+        return await self._merge(summaries)
+
+    async def _summarize_chunk(self, text: str) -> Optional[str]:
+        """Helper method to summarize a single chunk with one AI API call."""
+        prompt = PromptUtils.create_prompt_for_summarization(text=text)
+        return await self._fetch(prompt)
+
+    async def _merge(self, summaries: list[str]) -> str:
+        """
+        Helper method to reduce partial summaries into one.
+        Joining them keeps the total latency at about one chunk's latency,
+        a model merge reads better but costs one more round trip.
+        """
+        joined = "\n\n".join(summary.strip() for summary in summaries)
+        if not self.merge_with_model:
+            return joined
+
+        merged = await self._fetch(PromptUtils.create_prompt_for_merging(summaries))
+        return merged or joined
+
+    async def _fetch(self, prompt: str) -> Optional[str]:
+        """Helper method to send a prompt, the service waits for the quotas on every attempt."""
+        return await self.service.fetch_data(prompt)
@@ -1,7 +1,129 @@
+import math
+import re
+
+
 class PromptUtils:
+    _SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+    # OpenAI tokenizers average about 4 characters of English text per token
+    _CHARS_PER_TOKEN = 4
+
     @staticmethod
     def create_prompt_for_summarization(text: str) -> str:
         prompt = (f"Please summarize the following note's content and return "
                   f"the summary without any additional comments or explanations."
                   f" Ensure the summary is at least half the length of the original content. TEXT: {text}")
         return prompt
+
+    @staticmethod
+    def create_prompt_for_merging(summaries: list[str]) -> str:
+        parts = "\n\n".join(f"PART {index}: {summary}" for index, summary in enumerate(summaries, start=1))
+        prompt = (f"The following texts are summaries of consecutive parts of one note. "
+                  f"Please merge them into a single coherent summary, keeping the original order of events, "
+                  f"and return it without any additional comments or explanations. {parts}")
+        return prompt
+
+    @staticmethod
+    def estimate_tokens(prompt: str) -> int:
+        """
+        Estimates the tokens a summarization prompt costs against the quota: the prompt itself
+        plus the completion, which is asked to be at least half as long as the summarized text.
+        """
+        prompt_tokens = math.ceil(len(prompt) / PromptUtils._CHARS_PER_TOKEN)
+        return prompt_tokens + math.ceil(prompt_tokens / 2)
+
+    @staticmethod
+    def split_into_chunks(text: str, max_words: int) -> list[str]:
+        """Splits text into chunks of at most `max_words` words, cutting at sentence boundaries when possible."""
+        chunks, current, current_words = [], [], 0
+
+        for sentence in PromptUtils._SENTENCE_BOUNDARY.split(text.strip()):
+            words = sentence.split()
+            if not words:
+                continue
+
+            # a single sentence longer than a chunk can only be cut between words
+            while len(words) > max_words:
+                if current:
+                    chunks.append(" ".join(current))
+                    current, current_words = [], 0
+                chunks.append(" ".join(words[:max_words]))
+                words = words[max_words:]
+
+            if current_words + len(words) > max_words:
+                chunks.append(" ".join(current))
+                current, current_words = [], 0
+
+            current.append(" ".join(words))
+            current_words += len(words)
+
+        if current:
+            chunks.append(" ".join(current))
+        return chunks
+
+
+class ContentUtils:
+    _NON_WORD = re.compile(r"[^\w\s]+")
+
+    @staticmethod
+    def normalize(text: str) -> list[str]:
+        """Returns the words of the text ignoring case, punctuation and whitespace layout."""
+        return ContentUtils._NON_WORD.sub(" ", text.lower()).split()
+
+    @staticmethod
+    def edit_distance(old: list[str], new: list[str], max_distance: int) -> int:
+        """
+        Returns the word-level Levenshtein distance between two texts, capped at `max_distance + 1`.
+        Only the cells within a band around the diagonal are computed, the band being doubled up to `max_distance`
+        until the distance fits in it, so the cost is O(n * distance) instead of O(n * m).
+        """
+        # edits are usually local, the unchanged head and tail do not need to be compared
+        start = 0
+        while start < len(old) and start < len(new) and old[start] == new[start]:
+            start += 1
+        end = 0
+        while end < len(old) - start and end < len(new) - start and old[-1 - end] == new[-1 - end]:
+            end += 1
+        old, new = old[start:len(old) - end], new[start:len(new) - end]
+
+        limit = max_distance + 1
+        if abs(len(old) - len(new)) >= limit:
+            return limit
+        if not old or not new:
+            return max(len(old), len(new))
+
+        # a distance within the band is exact, a larger one is only known to exceed it
+        band = max(1, abs(len(old) - len(new)))
+        while True:
+            band = min(band, max_distance)
+            distance = ContentUtils._banded_distance(old, new, band)
+            if distance <= band or band == max_distance:
+                return distance
+            band *= 2
+
+    @staticmethod
+    def _banded_distance(old: list[str], new: list[str], band: int) -> int:
+        """Helper method to compute the distance capped at `band + 1`, keeping `2 * band + 1` cells per row."""
+        cap = band + 1
+        width = 2 * band + 1
+        # the cell k of the row i holds the distance between old[:i] and new[:i - band + k]
+        previous = [j if 0 <= j <= len(new) else cap for j in range(-band, band + 1)]
+        for i in range(1, len(old) + 1):
+            offset = i - band
+            current = [cap] * width
+            word = old[i - 1]
+            for k in range(max(0, -offset), min(width, len(new) - offset + 1)):
+                j = offset + k
+                if j == 0:
+                    current[k] = i if i < cap else cap
+                    continue
+                cell = previous[k] + (word != new[j - 1])
+                if k + 1 < width and previous[k + 1] < cell:
+                    cell = previous[k + 1] + 1
+                if k > 0 and current[k - 1] < cell:
+                    cell = current[k - 1] + 1
+                current[k] = cell if cell < cap else cap
+            if min(current) >= cap:
+                return cap
+            previous = current
+
+        return previous[len(new) - len(old) + band]
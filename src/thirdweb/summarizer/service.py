@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import re
+import string
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from src.backend.utils.lazy import lazy_import
+from src.backend.utils.metrics import Metrics
+from src.config import STOPWORDS
+
+np = lazy_import("numpy")
+
+
+class BaseSummarizer(ABC):
+    """
+    Interface of every summarization engine.
+    """
+
+    @abstractmethod
+    async def summarize(self, text: str) -> Optional[str]:
+        """
+        Summarize the given text.
+
+        :param text: The note content.
+        :type text: str
+        :returns: The summary, or None if it could not be generated.
+        :rtype: Optional[str]
+        """
+
+
+class ExtractiveSummarizer(BaseSummarizer):
+    """
+    Local, network-free summarizer picking the most informative sentences of the note.
+    Sentences are scored by the TF-IDF weight of their words, where every sentence of the note
+    is a document, and the best ones are returned in their original order.
+    """
+
+    _SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+    def __init__(self, ratio: float = 0.3):
+        self.ratio = ratio
+
+    async def summarize(self, text: str) -> Optional[str]:
+        # the scoring is CPU-bound, it runs in a thread to keep the loop serving while the upstream is degraded
+        return await asyncio.to_thread(self.summarize_text, text)
+
+    def summarize_text(self, text: str) -> Optional[str]:
+        """
+        Synchronous variant of `summarize`, for bulk use outside the event loop.
+
+        :param text: The note content.
+        :type text: str
+        :returns: The extracted sentences, or None for empty content.
+        :rtype: Optional[str]
+        """
+        sentences = [sentence for sentence in self._SENTENCE_BOUNDARY.split(text.strip()) if sentence]
+        if len(sentences) <= 1:
+            return sentences[0] if sentences else None
+
+        scores = self._score_sentences(sentences)
+        keep = max(1, math.ceil(self.ratio * len(sentences)))
+        best = np.sort(np.argpartition(-scores, keep - 1)[:keep])
+        return " ".join(sentences[index] for index in best)
+
+    @staticmethod
+    def _score_sentences(sentences: list[str]) -> np.ndarray:
+        """
+        Helper method to compute one TF-IDF relevance score per sentence.
+        Only the (sentence, term) pairs that occur are held, never a sentences x terms matrix,
+        so the memory stays linear in the length of the text.
+        """
+        vocabulary: dict[str, int] = {}
+        term_ids, sentence_ids, lengths = [], [], []
+
+        for index, sentence in enumerate(sentences):
+            words = [
+                word
+                for word in (raw.lower().strip(string.punctuation) for raw in sentence.split())
+                if word and word not in STOPWORDS
+            ]
+            lengths.append(len(words))
+            term_ids.extend(vocabulary.setdefault(word, len(vocabulary)) for word in words)
+            sentence_ids.extend([index] * len(words))
+
+        if not vocabulary:
+            return np.zeros(len(sentences))
+
+        sentences_count, terms_count = len(sentences), len(vocabulary)
+        term_ids, sentence_ids = np.asarray(term_ids, dtype=np.int64), np.asarray(sentence_ids, dtype=np.int64)
+        # every distinct (sentence, term) pair once, as a single integer
+        pairs = np.unique(sentence_ids * terms_count + term_ids)
+
+        document_frequency = np.bincount(pairs % terms_count, minlength=terms_count)
+        idf = np.log((1 + sentences_count) / (1 + document_frequency)) + 1
+        term_weights = np.bincount(term_ids, minlength=terms_count) * idf
+
+        # the score of a sentence sums the weight of each of its words, once per occurrence
+        scores = np.bincount(sentence_ids, weights=term_weights[term_ids], minlength=sentences_count)
+        # square-root length normalization favors informative sentences without simply picking the longest
+        return scores / np.sqrt(np.maximum(np.asarray(lengths), 1))
+
+
+class FallbackSummarizer(BaseSummarizer):
+    """
+    Tries the primary engine and falls back to a secondary one when the primary
+    gives up or does not answer within `timeout` seconds.
+    """
+
+    def __init__(self, primary: BaseSummarizer, fallback: BaseSummarizer, timeout: Optional[float] = None):
+        self.primary = primary
+        self.fallback = fallback
+        self.timeout = timeout
+
+    async def summarize(self, text: str) -> Optional[str]:
+        try:
+            summary = await asyncio.wait_for(self.primary.summarize(text), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            summary = None
+
+        if summary is not None:
+            return summary
+
+        Metrics.increment("summarization_fallback", label=type(self.fallback).__name__)
+        return await self.fallback.summarize(text)
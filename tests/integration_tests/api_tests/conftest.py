@@ -3,7 +3,20 @@ import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
 
 from src.backend.api import app
-from src.database.database.models import Base, NoteModel, NoteVersionModel
+from src.database.database.models import (
+    Base,
+    NoteModel,
+    NoteVersionModel,
+    NoteVersionArchiveModel,
+    NoteChangeModel,
+    NoteDailyStatsModel,
+    TermStatsModel,
+    NoteKeywordsModel,
+    WordCountSketchModel,
+    WordHeavyHitterModel,
+    WordVocabularySketchModel,
+)
+from src.database.cache import note_cache
 from src.database.session import engine
 
 # To ensure optimal performance, please avoid running all test functions simultaneously.
@@ -32,14 +45,37 @@ async def setup_db():
     This fixture automatically drops and recreates the specified database tables
     before each test to ensure a clean state and avoid data persistence issues.
     """
+    note_cache.clear()
     async with engine.begin() as conn:
         await conn.run_sync(
             Base.metadata.drop_all,
-            tables=[NoteModel.__table__, NoteVersionModel.__table__],
+            tables=[
+                NoteModel.__table__,
+                NoteVersionModel.__table__,
+                NoteVersionArchiveModel.__table__,
+                NoteChangeModel.__table__,
+                NoteDailyStatsModel.__table__,
+                TermStatsModel.__table__,
+                NoteKeywordsModel.__table__,
+                WordCountSketchModel.__table__,
+                WordHeavyHitterModel.__table__,
+                WordVocabularySketchModel.__table__,
+            ],
         )
         await conn.run_sync(
             Base.metadata.create_all,
-            tables=[NoteModel.__table__, NoteVersionModel.__table__],
+            tables=[
+                NoteModel.__table__,
+                NoteVersionModel.__table__,
+                NoteVersionArchiveModel.__table__,
+                NoteChangeModel.__table__,
+                NoteDailyStatsModel.__table__,
+                TermStatsModel.__table__,
+                NoteKeywordsModel.__table__,
+                WordCountSketchModel.__table__,
+                WordHeavyHitterModel.__table__,
+                WordVocabularySketchModel.__table__,
+            ],
         )
 
 
@@ -1,12 +1,22 @@
+import asyncio
+from datetime import date, timedelta
+
 import pytest
 
 from src.backend.utils.enums import ErrorMessages
+from src.backend.utils.metrics import Metrics
 from tests.integration_tests.conftest import (
     skip_total_word_count,
     skip_average_note_length,
     skip_common_words,
+    skip_common_phrases,
     skip_longest_notes,
-    skip_shortest_note
+    skip_shortest_note,
+    skip_timeline,
+    skip_keywords,
+    skip_vocabulary_size,
+    skip_tenant_analytics,
+    skip_coalesced_analytics,
 )
 
 # ----------------------------TOTAL WORD COUNT----------------------------------------------------
@@ -77,9 +87,66 @@ async def test_most_common_words_error(client):
 
     assert response.status_code == 404
     assert response.json()["detail"] == ErrorMessages.NOT_FOUND_MULTI
+@pytest.mark.skipif(skip_common_words, reason="The flag 'skip_common_words' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_most_common_words_approx(client, prepare_data):
+    """Test estimating the most common words from the word sketches via the /analytic/common_words endpoint"""
+    response = await client.get("/analytics/common_words?min_count=1&approx=true")
+
+    assert response.status_code == 200
+    assert response.json() == {"note": 4, "longer": 2, "tiny": 2}
 # ----------------------------COMMON WORDS----------------------------------------------------
 
 
+# ----------------------------COMMON PHRASES----------------------------------------------------
+@pytest.mark.skipif(skip_common_phrases, reason="The flag 'skip_common_phrases' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_most_common_phrases_success(client, prepare_data):
+    """Test retrieving the most common phrases via the /analytic/common_phrases endpoint"""
+    response = await client.get("/analytics/common_phrases?n=2&min_count=0")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "longer note": 1, "much longer": 1, "note note": 1, "tiny note": 1, "woah longer": 1,
+    }
+
+
+@pytest.mark.skipif(skip_common_phrases, reason="The flag 'skip_common_phrases' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_most_common_phrases_error(client, prepare_data):
+    """Test retrieving phrases of an unsupported length via the /analytic/common_phrases endpoint"""
+    response = await client.get("/analytics/common_phrases?n=4")
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == ErrorMessages.NOT_CONFORM_SCHEMA
+# ----------------------------COMMON PHRASES----------------------------------------------------
+
+
+# ----------------------------VOCABULARY SIZE----------------------------------------------------
+@pytest.mark.skipif(skip_vocabulary_size, reason="The flag 'skip_vocabulary_size' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_vocabulary_size_success(client, prepare_data):
+    """Test counting the distinct words of all notes via the /analytic/vocabulary_size endpoint"""
+    exact = await client.get("/analytics/vocabulary_size")
+    approx = await client.get("/analytics/vocabulary_size?approx=true")
+
+    assert exact.status_code == 200 and approx.status_code == 200
+    assert exact.json() == {"vocabulary_size": 5}
+    assert approx.json() == exact.json()
+
+
+@pytest.mark.skipif(skip_vocabulary_size, reason="The flag 'skip_vocabulary_size' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_vocabulary_size_error(client):
+    """Test counting the distinct words without any note via the /analytic/vocabulary_size endpoint"""
+    response = await client.get("/analytics/vocabulary_size")
+    assert response.status_code == 404
+
+    response = await client.get("/analytics/vocabulary_size?approx=true")
+    assert response.json() == {"vocabulary_size": 0}
+# ----------------------------VOCABULARY SIZE----------------------------------------------------
+
+
 # ----------------------------LONGEST NOTES----------------------------------------------------
 @pytest.mark.skipif(skip_longest_notes, reason="The flag 'skip_longest_notes' is active!")
 @pytest.mark.asyncio(loop_scope="session")
@@ -124,3 +191,106 @@ async def test_shortest_notes_error(client):
     assert response.status_code == 404
     assert response.json()["detail"] == ErrorMessages.NOT_FOUND_MULTI
 # ----------------------------SHORTEST NOTES----------------------------------------------------
+
+
+# ----------------------------TIMELINE----------------------------------------------------
+@pytest.mark.skipif(skip_timeline, reason="The flag 'skip_timeline' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_timeline_success(client, prepare_data):
+    """Test retrieving note activity per period via the /analytic/timeline endpoint"""
+    response = await client.get("/analytics/timeline?granularity=month")
+
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    assert response.json()[0]["notes_created"] == 2
+    assert response.json()[0]["words_created"] == 13
+
+
+@pytest.mark.skipif(skip_timeline, reason="The flag 'skip_timeline' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_time_range_analytics(client, prepare_data):
+    """Test the word count and average length of notes created within a range of days"""
+    today = date.today()
+    yesterday = (today - timedelta(days=1)).isoformat()
+    response = await client.get(f"/analytics/total_words?from={yesterday}")
+
+    assert response.status_code == 200
+    assert response.json()["word_count"] == 13
+
+    response = await client.get(f"/analytics/length?to={yesterday}")
+    assert response.status_code == 200
+    assert response.json()["average_note_length"] == 0.0
+# ----------------------------TIMELINE----------------------------------------------------
+
+
+# ----------------------------KEYWORDS----------------------------------------------------
+@pytest.mark.skipif(skip_keywords, reason="The flag 'skip_keywords' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_keywords_success(client, id):
+    """Test retrieving the stored keywords of a note via the /analytic/keywords/{id} endpoint"""
+    response = await client.get(f"/analytics/keywords/{id}")
+
+    assert response.status_code == 200
+    assert response.json()["note_id"] == id
+    assert [keyword["term"] for keyword in response.json()["keywords"]] == ["content", "test"]
+
+
+@pytest.mark.skipif(skip_keywords, reason="The flag 'skip_keywords' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_keywords_error(client):
+    """Test retrieving the keywords of a missing note via the /analytic/keywords/{id} endpoint"""
+    response = await client.get("/analytics/keywords/999")
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == ErrorMessages.NOT_FOUND_SINGLE
+# ----------------------------KEYWORDS----------------------------------------------------
+
+
+# ----------------------------TENANTS----------------------------------------------------
+@pytest.mark.skipif(skip_tenant_analytics, reason="The flag 'skip_tenant_analytics' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_analytics_scoped_to_tenant(client, prepare_data):
+    """Test that the analytics of a tenant only count its own notes"""
+    acme = {"X-Tenant-ID": "acme"}
+    await client.post(
+        url="/crud/post?engine=extractive", json={"title": "Short", "content": "Acme acme acme"}, headers=acme
+    )
+
+    response = await client.get("/analytics/total_words", headers=acme)
+    assert response.json()["word_count"] == 3
+
+    response = await client.get("/analytics/common_words?min_count=1", headers=acme)
+    assert response.json() == {"acme": 3}
+
+    response = await client.get("/analytics/common_words?min_count=1&approx=true", headers=acme)
+    assert response.json() == {"acme": 3}
+
+    response = await client.get("/analytics/timeline", headers=acme)
+    assert response.json()[0]["notes_created"] == 1
+
+    response = await client.get("/analytics/common_words?min_count=1&approx=true")
+    assert response.json() == {"note": 4, "longer": 2, "tiny": 2}
+
+    response = await client.get("/analytics/total_words", headers={"X-Tenant-ID": "initech"})
+    assert response.status_code == 404
+# ----------------------------TENANTS----------------------------------------------------
+
+
+# ----------------------------COALESCING----------------------------------------------------
+@pytest.mark.skipif(skip_coalesced_analytics, reason="The flag 'skip_coalesced_analytics' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_concurrent_analytics_coalesced(client, prepare_data):
+    """Test that concurrent identical analytics requests share one computation, and that a write is seen after it"""
+    before = Metrics.snapshot()["counters"].get("analytics_single_flight", {})
+
+    responses = await asyncio.gather(*[client.get("/analytics/common_words?min_count=1") for _ in range(10)])
+    assert all(response.json() == responses[0].json() for response in responses)
+
+    counters = Metrics.snapshot()["counters"]["analytics_single_flight"]
+    assert counters["leader"] - before.get("leader", 0) < 10
+    assert counters["coalesced"] - before.get("coalesced", 0) > 0
+
+    await client.post(url="/crud/post?engine=extractive", json={"title": "New", "content": "Fresh fresh"})
+    response = await client.get("/analytics/common_words?min_count=1")
+    assert response.json()["fresh"] == 2
+# ----------------------------COALESCING----------------------------------------------------
@@ -1,16 +1,41 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+from datetime import timedelta
 from random import randint
 
 import pytest
 from pydantic import ValidationError
+from sqlalchemy import insert, select
 
+from src.backend.utils.admission import AdmissionController
 from src.backend.utils.enums import ErrorMessages
+from src.backend.utils.helper import ApiHelper
+from src.backend.utils.metrics import Metrics
 from src.backend.utils.schemas import NoteGetSchemaResponse
+from src.config import env_config
+from src.database.database.models import NoteModel, NoteChangeModel, NoteVersionModel
+from src.database.database.queries import NoteChangeQuery
+from src.database.feed import change_feed
+from src.database.session import async_session, engine
 from tests.integration_tests.conftest import (
     note_skip_create,
     note_skip_get,
     note_skip_gets,
     note_skip_update,
-    note_skip_delete
+    note_skip_delete,
+    note_skip_stream_summarization,
+    note_skip_export,
+    note_skip_import,
+    note_skip_etag,
+    note_skip_cache,
+    note_skip_bulk,
+    note_skip_tenants,
+    note_skip_readiness,
+    note_skip_admission,
+    note_skip_changes,
 )
 
 
@@ -32,6 +57,23 @@ async def test_create_note_success(client):
     assert "note_id" in response.json()
 
 
+@pytest.mark.skipif(note_skip_create, reason="The flag 'note_skip_create' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_create_note_extractive(client):
+    """Test creating a note summarized by the local extractive engine via the /post endpoint"""
+    response = await client.post(
+        url="/crud/post?engine=extractive",
+        json={
+            "title": "Release notes",
+            "content": "The release was delayed. The release pipeline failed on the release tests. We had lunch.",
+        },
+    )
+
+    assert response.status_code == 201
+    note = (await client.get(f"/crud/get/{response.json()['note_id']}")).json()
+    assert note["summarization"] == "The release pipeline failed on the release tests."
+
+
 @pytest.mark.skipif(note_skip_create, reason="The flag 'note_skip_create' is active!")
 @pytest.mark.asyncio(loop_scope="session")
 @pytest.mark.parametrize(
@@ -156,6 +198,26 @@ async def test_get_all_notes_success(client, id):
         pytest.fail(f"Assertion error: {str(e)}")
 
 
+@pytest.mark.skipif(note_skip_gets, reason="The flag 'note_skip_gets' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_notes_filtered(client, prepare_data):
+    """Test filtering and sorting the notes via the /get endpoint"""
+    response = await client.get("/crud/get", params={"sort": "word_count", "descending": "true"})
+    assert [note["title"] for note in response.json()] == ["Long", "Short"]
+
+    response = await client.get("/crud/get", params={"title_prefix": "Sh", "created_from": "2000-01-01T00:00:00"})
+    assert [note["title"] for note in response.json()] == ["Short"]
+
+    response = await client.get("/crud/get", params={"min_words": 4})
+    assert [note["title"] for note in response.json()] == ["Long"]
+
+    response = await client.get("/crud/get", params={"max_words": 1})
+    assert response.status_code == 404
+
+    response = await client.get("/crud/get", params={"sort": "content"})
+    assert response.status_code == 400
+
+
 @pytest.mark.skipif(note_skip_gets, reason="The flag 'note_skip_gets' is active!")
 @pytest.mark.asyncio(loop_scope="session")
 async def test_get_notes_error(client):
@@ -177,6 +239,36 @@ async def test_update_note_success(client, id):
     assert update_response.status_code == 204
 
 
+@pytest.mark.skipif(note_skip_update, reason="The flag 'note_skip_update' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+@pytest.mark.parametrize(
+    "content, expected_calls",
+    [
+        ("test content", 0),
+        ("Test   content!!", 0),
+        ("Completely different text", 1),
+    ],
+)
+async def test_update_note_reuses_summarization(client, id, monkeypatch, content, expected_calls):
+    """Test that the summarization is only regenerated when the content changed meaningfully"""
+    calls = []
+
+    async def mock_fetch_data(self, user_prompt):
+        calls.append(user_prompt)
+        return "New summary"
+
+    monkeypatch.setattr("src.thirdweb.openai.service.OpenAIService.fetch_data", mock_fetch_data)
+    old_summarization = (await client.get(f"/crud/get/{id}")).json()["summarization"]
+    update_response = await client.put(f"/crud/update/{id}", json={"content": content})
+
+    assert update_response.status_code == 204
+    assert len(calls) == expected_calls
+
+    note = (await client.get(f"/crud/get/{id}")).json()
+    assert note["content"] == content
+    assert note["summarization"] == ("New summary" if expected_calls else old_summarization)
+
+
 @pytest.mark.skipif(note_skip_update, reason="The flag 'note_skip_update' is active!")
 @pytest.mark.asyncio(loop_scope="session")
 @pytest.mark.parametrize(
@@ -206,6 +298,59 @@ async def test_update_note_error(
 # ----------------------------UPDATE NOTE----------------------------------------------------
 
 
+# ----------------------------STREAM SUMMARIZATION----------------------------------------------------
+@pytest.mark.skipif(note_skip_stream_summarization, reason="The flag 'note_skip_stream_summarization' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_stream_summarization_success(client, id, monkeypatch):
+    """Test streaming a summarization via the /summarize/{id}/stream endpoint and storing the final text"""
+    async def mock_stream_data(self, user_prompt):
+        for delta in ("Streamed", " summary"):
+            yield delta
+
+    monkeypatch.setattr("src.thirdweb.openai.service.OpenAIService.stream_data", mock_stream_data)
+    response = await client.get(f"/crud/summarize/{id}/stream")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.count("event: token") == 2
+    assert "event: done" in response.text
+
+    note = (await client.get(f"/crud/get/{id}")).json()
+    assert note["summarization"] == "Streamed summary"
+    assert note["version_number"] == 2
+
+
+@pytest.mark.skipif(note_skip_stream_summarization, reason="The flag 'note_skip_stream_summarization' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_stream_summarization_conflict(client, id, monkeypatch):
+    """Test that a note edited while it is summarized keeps the edit and the stream ends with a conflict event"""
+    async def mock_stream_data(self, user_prompt):
+        yield "Stale"
+        await client.put(url=f"/crud/update/{id}", json={"title": "Edited meanwhile"})
+        yield " summary"
+
+    monkeypatch.setattr("src.thirdweb.openai.service.OpenAIService.stream_data", mock_stream_data)
+    response = await client.get(f"/crud/summarize/{id}/stream")
+
+    assert "event: conflict" in response.text
+    assert ErrorMessages.SUMMARIZATION_CONFLICT.value in response.text
+    note = (await client.get(f"/crud/get/{id}")).json()
+    assert note["title"] == "Edited meanwhile"
+    assert note["summarization"] != "Stale summary"
+    assert note["version_number"] == 2
+
+
+@pytest.mark.skipif(note_skip_stream_summarization, reason="The flag 'note_skip_stream_summarization' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_stream_summarization_error(client):
+    """Test streaming a summarization of a note that does not exist via the /summarize/{id}/stream endpoint"""
+    response = await client.get(f"/crud/summarize/{randint(50, 100)}/stream")
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == ErrorMessages.NOT_FOUND_SINGLE.value
+# ----------------------------STREAM SUMMARIZATION----------------------------------------------------
+
+
 # ----------------------------DELETE NOTE----------------------------------------------------
 @pytest.mark.skipif(note_skip_delete, reason="The flag 'note_skip_delete' is active!")
 @pytest.mark.asyncio(loop_scope="session")
@@ -226,3 +371,449 @@ async def test_delete_note_error(client):
     assert delete_response.status_code == 404
     assert delete_response.json()["detail"] == ErrorMessages.NOT_FOUND_SINGLE.value
 # ----------------------------DELETE NOTE----------------------------------------------------
+
+
+# ----------------------------EXPORT NOTES----------------------------------------------------
+@pytest.mark.skipif(note_skip_export, reason="The flag 'note_skip_export' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_export_notes_ndjson(client, id):
+    """Test exporting notes with their versions as gzip-compressed NDJSON via the /export endpoint"""
+    await client.put(url=f"/crud/update/{id}", json={"title": "Renamed note"})
+    response = await client.get("/crud/export?include_versions=true")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    rows = [json.loads(line) for line in gzip.decompress(response.content).decode().splitlines()]
+    assert [row["type"] for row in rows] == ["note", "version", "version"]
+    assert rows[0]["title"] == "Renamed note"
+    assert [row["version_number"] for row in rows[1:]] == [1, 2]
+
+
+@pytest.mark.skipif(note_skip_export, reason="The flag 'note_skip_export' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_export_notes_csv_since_id(client, id):
+    """Test resuming a CSV export after a note ID via the /export endpoint"""
+    await client.post(url="/crud/post", json={"title": "Second note", "content": "Second content"})
+
+    response = await client.get(f"/crud/export?format=csv&since_id={id}")
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.content).decode())))
+
+    assert response.status_code == 200
+    assert len(rows) == 1
+    assert rows[0]["title"] == "Second note"
+
+    response = await client.get(f"/crud/export?format=csv&since_id={id + 1}")
+    assert gzip.decompress(response.content).decode().startswith("type,id,note_id")
+# ----------------------------EXPORT NOTES----------------------------------------------------
+
+
+# ----------------------------IMPORT NOTES----------------------------------------------------
+@pytest.mark.skipif(note_skip_import, reason="The flag 'note_skip_import' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_import_notes_ndjson(client, id):
+    """Test importing a streamed NDJSON body with valid, invalid and duplicate lines via the /import endpoint"""
+    lines = [
+        {"type": "note", "title": "Imported note", "content": "Imported content.", "summarization": "Imported."},
+        {"type": "version", "title": "Ignored version", "content": "Ignored."},
+        {"title": "Project Update: March 2025", "content": "Duplicate title."},
+        {"title": "", "content": "Empty title."},
+        {"title": "No summarization", "content": "The summary is extracted locally."},
+    ]
+    body = "\n".join(json.dumps(line) for line in lines) + "\n{not json\n"
+
+    async def stream():
+        for start in range(0, len(body), 16):
+            yield body[start:start + 16].encode()
+
+    response = await client.post(url="/crud/import", content=stream())
+
+    assert response.status_code == 200
+    assert response.json()["imported"] == 2
+    assert response.json()["skipped"] == 3
+    assert [error["line"] for error in response.json()["errors"]] == [4, 6, 3]
+    assert response.json()["errors"][2]["detail"] == ErrorMessages.DUPLICATE_DATA
+
+    notes = (await client.get("/crud/get")).json()
+    assert {note["title"] for note in notes} == {"Project Update: March 2025", "Imported note", "No summarization"}
+
+
+@pytest.mark.skipif(note_skip_import, reason="The flag 'note_skip_import' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_import_notes_from_export(client, id):
+    """Test that a gzip-compressed export can be imported back via the /import endpoint"""
+    dump = (await client.get("/crud/export?include_versions=true")).content
+    await client.delete(f"/crud/delete/{id}")
+
+    response = await client.post(url="/crud/import", content=dump)
+
+    assert response.status_code == 200
+    assert response.json() == {"imported": 1, "skipped": 0, "errors": []}
+# ----------------------------IMPORT NOTES----------------------------------------------------
+
+
+# ----------------------------ETAG----------------------------------------------------
+@pytest.mark.skipif(note_skip_etag, reason="The flag 'note_skip_etag' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_note_not_modified(client, id):
+    """Test that a note is not sent again while its ETag matches 'If-None-Match'"""
+    response = await client.get(f"/crud/get/{id}")
+    etag = response.headers["etag"]
+    assert etag == f'"{id}-1"'
+
+    response = await client.get(f"/crud/get/{id}", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+    await client.put(url=f"/crud/update/{id}", json={"title": "Renamed note"})
+    response = await client.get(f"/crud/get/{id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] == f'"{id}-2"'
+
+    response = await client.get("/crud/get/999", headers={"If-None-Match": etag})
+    assert response.status_code == 404
+
+
+@pytest.mark.skipif(note_skip_etag, reason="The flag 'note_skip_etag' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_conditional_update_and_delete(client, id):
+    """Test that 'If-Match' rejects writes based on an outdated version with a 412"""
+    etag = (await client.get(f"/crud/get/{id}")).headers["etag"]
+
+    response = await client.put(url=f"/crud/update/{id}", json={"title": "First writer"}, headers={"If-Match": etag})
+    assert response.status_code == 204
+    assert response.headers["etag"] == f'"{id}-2"'
+
+    response = await client.put(url=f"/crud/update/{id}", json={"title": "Second writer"}, headers={"If-Match": etag})
+    assert response.status_code == 412
+    assert response.json()["detail"] == ErrorMessages.PRECONDITION_FAILED
+
+    response = await client.delete(f"/crud/delete/{id}", headers={"If-Match": etag})
+    assert response.status_code == 412
+
+    response = await client.delete(f"/crud/delete/{id}", headers={"If-Match": f'"{id}-2"'})
+    assert response.status_code == 204
+
+
+@pytest.mark.skipif(note_skip_etag, reason="The flag 'note_skip_etag' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_update_content_written_elsewhere(client, id, monkeypatch):
+    """Test that a content update based on a cached note written by another worker is retried on the stored one"""
+    async def mock_fetch_data(self, user_prompt):
+        return "New summary"
+
+    async def write_elsewhere():
+        async with async_session() as session:
+            note = await session.get(NoteModel, id)
+            note.content = f"Written elsewhere {note.version_number}"
+            note.version_number += 1
+            await session.commit()
+
+    monkeypatch.setattr("src.thirdweb.openai.service.OpenAIService.fetch_data", mock_fetch_data)
+    await client.get(f"/crud/get/{id}")
+    await write_elsewhere()
+    Metrics.reset()
+
+    # the client has the version written elsewhere, newer than the cached one
+    response = await client.put(f"/crud/update/{id}", json={"content": "First edit"}, headers={"If-Match": f'"{id}-2"'})
+    assert response.status_code == 204
+    assert response.headers["etag"] == f'"{id}-3"'
+
+    response = await client.put(f"/crud/update/{id}", json={"content": "Stale edit"}, headers={"If-Match": f'"{id}-1"'})
+    assert response.status_code == 412
+
+    await write_elsewhere()
+    response = await client.put(f"/crud/update/{id}", json={"content": "Second edit"})
+    assert response.status_code == 204
+    assert response.headers["etag"] == f'"{id}-5"'
+    assert Metrics.snapshot()["counters"]["note_update_conflict"] == {"retried": 1}
+    assert (await client.get(f"/crud/get/{id}")).json()["content"] == "Second edit"
+
+
+@pytest.mark.skipif(note_skip_etag, reason="The flag 'note_skip_etag' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_update_content_conflict(client, id, monkeypatch):
+    """Test that a content update losing every race to concurrent writes is answered with a 409"""
+    async def lose_race(self, id, data, expected_versions=None):
+        return None
+
+    monkeypatch.setattr("src.database.database.queries.NoteQuery.update_returning", lose_race)
+    Metrics.reset()
+    response = await client.put(f"/crud/update/{id}", json={"content": "test content"})
+
+    assert response.status_code == 409
+    assert response.json()["detail"] == ErrorMessages.CONFLICT
+    assert Metrics.snapshot()["counters"]["note_update_conflict"] == {
+        "retried": env_config.NOTE_UPDATE_ATTEMPTS - 1, "failed": 1
+    }
+# ----------------------------ETAG----------------------------------------------------
+
+
+# ----------------------------NOTE CACHE----------------------------------------------------
+@pytest.mark.skipif(note_skip_cache, reason="The flag 'note_skip_cache' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_note_cached(client, id):
+    """Test that repeated reads are served from the cache and that writes invalidate it"""
+    Metrics.reset()
+    first = await client.get(f"/crud/get/{id}")
+    second = await client.get(f"/crud/get/{id}")
+
+    assert second.json() == first.json()
+    assert Metrics.snapshot()["counters"]["note_cache"] == {"miss": 1, "hit": 1}
+
+    await client.put(url=f"/crud/update/{id}", json={"title": "Renamed note"})
+    response = await client.get(f"/crud/get/{id}")
+
+    assert response.json()["title"] == "Renamed note"
+    assert Metrics.snapshot()["counters"]["note_cache"]["invalidated"] == 1
+
+
+@pytest.mark.skipif(note_skip_cache, reason="The flag 'note_skip_cache' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_note_cache_written_elsewhere(client, id):
+    """Test that a cached note written by another worker is detected through its version number"""
+    await client.get(f"/crud/get/{id}")
+    async with async_session() as session:
+        # simulates a write of another worker, which cannot invalidate this worker's cache
+        note = await session.get(NoteModel, id)
+        note.title = "Written elsewhere"
+        note.version_number += 1
+        await session.commit()
+
+    response = await client.get(f"/crud/get/{id}")
+    assert response.json()["title"] == "Written elsewhere"
+# ----------------------------NOTE CACHE----------------------------------------------------
+
+
+# ----------------------------BULK----------------------------------------------------
+@pytest.mark.skipif(note_skip_bulk, reason="The flag 'note_skip_bulk' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_bulk_update_notes(client, prepare_data):
+    """Test setting the content of the notes matching a filter via the /bulk endpoint"""
+    notes = (await client.get("/crud/get")).json()
+    short_id = next(note["id"] for note in notes if note["title"] == "Short")
+
+    response = await client.patch(
+        url="/crud/bulk?engine=extractive",
+        json={"filter": {"title_contains": "Shor"}, "content": "Rewritten in bulk."},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"note_ids": [short_id]}
+
+    note = (await client.get(f"/crud/get/{short_id}")).json()
+    assert note["content"] == "Rewritten in bulk."
+    assert note["summarization"] == "Rewritten in bulk."
+    assert note["version_number"] == 2
+
+
+@pytest.mark.skipif(note_skip_bulk, reason="The flag 'note_skip_bulk' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_bulk_delete_notes(client, prepare_data):
+    """Test deleting the notes matching a filter, with their versions, via the /bulk endpoint"""
+    ids = sorted(note["id"] for note in (await client.get("/crud/get")).json())
+    await client.put(url=f"/crud/update/{ids[0]}", json={"title": "Renamed note"})
+
+    response = await client.request("DELETE", "/crud/bulk", json={"ids": ids + [999]})
+    assert response.status_code == 200
+    assert sorted(response.json()["note_ids"]) == ids
+
+    async with async_session() as session:
+        versions = (await session.execute(select(NoteVersionModel))).scalars().all()
+    assert versions == []
+
+    response = await client.request("DELETE", "/crud/bulk", json={"ids": ids})
+    assert response.status_code == 404
+
+
+@pytest.mark.skipif(note_skip_bulk, reason="The flag 'note_skip_bulk' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_bulk_empty_filter(client, prepare_data):
+    """Test that a filter selecting every note is rejected"""
+    response = await client.request("DELETE", "/crud/bulk", json={})
+    assert response.status_code == 400
+    assert response.json()["detail"] == ErrorMessages.FILTER_EMPTY.value
+
+    response = await client.patch(url="/crud/bulk", json={"filter": {"ids": []}, "content": "Rewritten."})
+    assert response.status_code == 400
+    assert response.json()["detail"] == ErrorMessages.FILTER_EMPTY.value
+# ----------------------------BULK----------------------------------------------------
+
+
+# ----------------------------TENANTS----------------------------------------------------
+@pytest.mark.skipif(note_skip_tenants, reason="The flag 'note_skip_tenants' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_notes_scoped_to_tenant(client, id, monkeypatch):
+    """Test that a tenant only reads, writes and deletes its own notes, and may reuse the titles of others"""
+    acme = {"X-Tenant-ID": "acme"}
+    response = await client.post(
+        url="/crud/post?engine=extractive",
+        json={"title": "Project Update: March 2025", "content": "Acme content."},
+        headers=acme,
+    )
+    assert response.status_code == 201
+    acme_id = response.json()["note_id"]
+
+    assert [note["id"] for note in (await client.get("/crud/get", headers=acme)).json()] == [acme_id]
+    assert [note["id"] for note in (await client.get("/crud/get")).json()] == [id]
+
+    # cached for the default tenant, served without asking the database
+    monkeypatch.setattr(env_config, "NOTE_CACHE_VERIFY_VERSION", False)
+    await client.get(f"/crud/get/{id}")
+    assert (await client.get(f"/crud/get/{id}", headers=acme)).status_code == 404
+
+    response = await client.put(url=f"/crud/update/{id}", json={"title": "Taken over"}, headers=acme)
+    assert response.status_code == 404
+    assert (await client.delete(f"/crud/delete/{id}", headers=acme)).status_code == 404
+    assert (await client.get(f"/crud/get/{id}")).json()["title"] == "Project Update: March 2025"
+
+
+@pytest.mark.skipif(note_skip_tenants, reason="The flag 'note_skip_tenants' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_invalid_tenant(client):
+    """Test that a malformed tenant header is rejected"""
+    response = await client.get("/crud/get", headers={"X-Tenant-ID": "not a tenant"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == ErrorMessages.NOT_CONFORM_SCHEMA.value
+
+
+@pytest.mark.skipif(note_skip_tenants, reason="The flag 'note_skip_tenants' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_tenant_requires_gateway_secret(client, id, monkeypatch):
+    """Test that the tenant header is only accepted with the gateway secret once one is configured"""
+    monkeypatch.setattr(env_config, "TENANT_HEADER_SECRET", "gateway-secret")
+
+    response = await client.get("/crud/get", headers={"X-Tenant-ID": "acme"})
+    assert response.status_code == 401
+    assert response.json()["detail"] == ErrorMessages.TENANT_UNTRUSTED.value
+    response = await client.get("/crud/get", headers={"X-Tenant-ID": "acme", "X-Gateway-Secret": "guess"})
+    assert response.status_code == 401
+
+    response = await client.get("/crud/get", headers={"X-Gateway-Secret": "gateway-secret"})
+    assert response.status_code == 200
+    assert [note["id"] for note in response.json()] == [id]
+# ----------------------------TENANTS----------------------------------------------------
+
+
+# ----------------------------READINESS----------------------------------------------------
+@pytest.mark.skipif(note_skip_readiness, reason="The flag 'note_skip_readiness' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_readiness_after_warm_up(client):
+    """Test that the readiness probe answers 503 until the worker has warmed up"""
+    assert (await client.get("/ready")).status_code == 503
+
+    await ApiHelper.warm_up(engine=engine, connections=2, retry_interval=0.01)
+    try:
+        response = await client.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["ready"] is True
+        assert response.json()["lazy_imports"]["numpy"] is not None
+        assert response.json()["lazy_imports"]["httpx"] is not None
+    finally:
+        await ApiHelper.shutdown()
+# ----------------------------READINESS----------------------------------------------------
+
+
+# ----------------------------ADMISSION CONTROL----------------------------------------------------
+@pytest.mark.skipif(note_skip_admission, reason="The flag 'note_skip_admission' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_model_bound_requests_shed(client, monkeypatch):
+    """Test that model-bound writes beyond the admission limits get a 503 with Retry-After"""
+    full = AdmissionController(name="summarization", max_concurrent=0, max_queue=0, retry_after=2.5)
+    monkeypatch.setattr(ApiHelper, "_admission", full)
+    note = {"title": "Shed note", "content": "Summarized by the model."}
+
+    response = await client.post(url="/crud/post", json=note)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    assert response.json()["detail"] == ErrorMessages.OVERLOADED.value
+    assert Metrics.snapshot()["counters"]["summarization_admission"]["shed_queue_full"] >= 1
+    # the local summarizer does not wait on the model
+    assert (await client.post(url="/crud/post?engine=extractive", json=note)).status_code == 201
+# ----------------------------ADMISSION CONTROL----------------------------------------------------
+
+
+# ----------------------------CHANGE FEED----------------------------------------------------
+async def _next_change(events) -> dict:
+    """Reads the next server-sent event of a change stream."""
+    event = await asyncio.wait_for(anext(events), timeout=5)
+    fields = dict(line.split(": ", 1) for line in event.strip().splitlines())
+    return {"id": int(fields["id"]), "event": fields["event"], "data": json.loads(fields["data"])}
+
+
+@pytest.mark.skipif(note_skip_changes, reason="The flag 'note_skip_changes' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_change_feed_pushes_and_resumes(client):
+    """Test that the change feed pushes the writes of notes, and replays the missed ones to a resuming client"""
+    # the test client buffers whole responses, the stream is read from the helper instead
+    events = (await ApiHelper.stream_changes(tenant_id=NoteModel.DEFAULT_TENANT)).body_iterator
+    try:
+        response = await client.post(
+            url="/crud/post?engine=extractive", json={"title": "Watched", "content": "Watched note."}
+        )
+        note_id = response.json()["note_id"]
+        await client.post(
+            url="/crud/post?engine=extractive", json={"title": "Other", "content": "Other tenant."},
+            headers={"X-Tenant-ID": "acme"},
+        )
+        await client.put(f"/crud/update/{note_id}", json={"title": "Renamed"})
+        await client.delete(f"/crud/delete/{note_id}")
+
+        changes = [await _next_change(events) for _ in range(3)]
+        assert [(change["event"], change["data"]["note_id"], change["data"]["version_number"]) for change in changes] \
+            == [("created", note_id, 1), ("updated", note_id, 2), ("deleted", note_id, 2)]
+        await events.aclose()
+
+        resumed = await ApiHelper.stream_changes(tenant_id=NoteModel.DEFAULT_TENANT, since=changes[0]["id"])
+        events = resumed.body_iterator
+        assert [(await _next_change(events))["id"] for _ in range(2)] == [change["id"] for change in changes[1:]]
+        await events.aclose()
+
+        async with async_session() as session:
+            await NoteChangeQuery(session, tenant_id=None).prune(older_than=timedelta(days=-1))
+        events = (await ApiHelper.stream_changes(tenant_id=NoteModel.DEFAULT_TENANT, since=0)).body_iterator
+        assert (await _next_change(events))["event"] == "reset"
+        await events.aclose()
+
+        assert (await client.get("/crud/changes?since=-1")).status_code == 400
+    finally:
+        await change_feed.close()
+
+
+@pytest.mark.skipif(note_skip_changes, reason="The flag 'note_skip_changes' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_change_feed_delivers_late_commits(client, monkeypatch):
+    """Test that a change committed after a later sequence was skipped past is still delivered"""
+    monkeypatch.setattr(change_feed, "gap_timeout", 0.05)
+
+    async def commit_change(sequence: int) -> None:
+        async with async_session() as session:
+            await session.execute(insert(NoteChangeModel).values(
+                sequence=sequence, tenant_id=NoteModel.DEFAULT_TENANT, note_id=sequence, action="created",
+                version_number=1,
+            ))
+            await session.commit()
+        change_feed.wake()
+
+    events = (await ApiHelper.stream_changes(tenant_id=NoteModel.DEFAULT_TENANT)).body_iterator
+    try:
+        start = change_feed.last_sequence
+        # the transaction of `start + 1` commits after the one of `start + 2`
+        await commit_change(start + 2)
+        early = await _next_change(events)
+        assert early["data"]["sequence"] == start + 2
+        # a reconnecting client would resume before the open gap
+        assert early["id"] == start
+
+        await commit_change(start + 1)
+        late = await _next_change(events)
+        assert late["data"]["sequence"] == start + 1
+        assert late["id"] == start + 2
+
+        await commit_change(start + 3)
+        assert (await _next_change(events))["data"]["sequence"] == start + 3
+        await events.aclose()
+    finally:
+        await change_feed.close()
+# ----------------------------CHANGE FEED----------------------------------------------------
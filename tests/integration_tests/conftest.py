@@ -9,12 +9,28 @@ note_skip_get = True
 note_skip_gets = True
 note_skip_update = True
 note_skip_delete = True
+note_skip_stream_summarization = True
+note_skip_export = True
+note_skip_import = True
+note_skip_etag = True
+note_skip_cache = True
+note_skip_bulk = True
+note_skip_tenants = True
+note_skip_readiness = True
+note_skip_admission = True
+note_skip_changes = True
 
 skip_total_word_count = True
 skip_average_note_length = True
 skip_common_words = True
+skip_common_phrases = True
 skip_longest_notes = True
 skip_shortest_note = True
+skip_timeline = True
+skip_keywords = True
+skip_vocabulary_size = True
+skip_tenant_analytics = True
+skip_coalesced_analytics = True
 
 
 # --------------------------------- query's ---------------------------------
@@ -22,8 +38,17 @@ note_query_skip_create = True
 note_query_skip_gets = True
 note_query_skip_update = True
 note_query_skip_delete = True
+note_query_skip_daily_stats = True
+note_query_skip_keywords = True
+note_query_skip_returning = True
+note_query_skip_listing = True
+note_query_skip_sketches = True
+note_query_skip_tenants = True
+note_query_skip_archive = True
+note_query_skip_changes = True
 
 
 # --------------------------------- service's ---------------------------------
 openai_skip_send_request = True
-openai_skip_get_request = True
\ No newline at end of file
+openai_skip_get_request = True
+openai_skip_stream_data = True
@@ -3,12 +3,41 @@ import pytest_asyncio
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
 from src.config import env_config
-from src.database.database.models import Base, NoteModel, NoteVersionModel
+from src.database.database.models import (
+    Base,
+    NoteModel,
+    NoteVersionModel,
+    NoteVersionArchiveModel,
+    NoteChangeModel,
+    NoteDailyStatsModel,
+    TermStatsModel,
+    NoteKeywordsModel,
+    WordCountSketchModel,
+    WordHeavyHitterModel,
+    WordVocabularySketchModel,
+)
 from src.database.database.queries import NoteQuery
+from src.database.database.partitions import NoteVersionPartitions
+from src.database.database.triggers import (
+    NoteTriggerQuery,
+    NoteStatsTriggerQuery,
+    NoteChangeTriggerQuery,
+    NoteKeywordTriggerQuery,
+    WordSketchTriggerQuery,
+)
 
 engine = create_async_engine(env_config.TEST_DB_URL, echo=True)
 async_session = async_sessionmaker(engine, expire_on_commit=False)
 
+_ = (  # to registrate
+    NoteTriggerQuery,
+    NoteStatsTriggerQuery,
+    NoteChangeTriggerQuery,
+    NoteKeywordTriggerQuery,
+    WordSketchTriggerQuery,
+    NoteVersionPartitions,
+)
+
 
 @pytest_asyncio.fixture(scope="function", autouse=True)
 async def setup_test_db():
@@ -20,11 +49,33 @@ async def setup_test_db():
     async with engine.begin() as conn:
         await conn.run_sync(
             Base.metadata.drop_all,
-            tables=[NoteModel.__table__, NoteVersionModel.__table__],
+            tables=[
+                NoteModel.__table__,
+                NoteVersionModel.__table__,
+                NoteVersionArchiveModel.__table__,
+                NoteChangeModel.__table__,
+                NoteDailyStatsModel.__table__,
+                TermStatsModel.__table__,
+                NoteKeywordsModel.__table__,
+                WordCountSketchModel.__table__,
+                WordHeavyHitterModel.__table__,
+                WordVocabularySketchModel.__table__,
+            ],
         )
         await conn.run_sync(
             Base.metadata.create_all,
-            tables=[NoteModel.__table__, NoteVersionModel.__table__],
+            tables=[
+                NoteModel.__table__,
+                NoteVersionModel.__table__,
+                NoteVersionArchiveModel.__table__,
+                NoteChangeModel.__table__,
+                NoteDailyStatsModel.__table__,
+                TermStatsModel.__table__,
+                NoteKeywordsModel.__table__,
+                WordCountSketchModel.__table__,
+                WordHeavyHitterModel.__table__,
+                WordVocabularySketchModel.__table__,
+            ],
         )
 
     await engine.dispose()
@@ -1,11 +1,42 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
 import pytest
+from sqlalchemy import func, select, text
 
 from tests.integration_tests.conftest import (
     note_query_skip_create,
     note_query_skip_gets,
     note_query_skip_update,
-    note_query_skip_delete
+    note_query_skip_delete,
+    note_query_skip_daily_stats,
+    note_query_skip_keywords,
+    note_query_skip_returning,
+    note_query_skip_listing,
+    note_query_skip_sketches,
+    note_query_skip_tenants,
+    note_query_skip_archive,
+    note_query_skip_changes,
+)
+from src.config import env_config
+from src.database.database.models import (
+    NoteModel,
+    TermStatsModel,
+    NoteVersionModel,
+    NoteVersionArchiveModel,
+    NoteKeywordsModel,
+    WordCountSketchModel,
 )
+from src.database.database.partitions import NoteVersionPartitions
+from src.database.database.queries import (
+    NoteQuery,
+    NoteStatsQuery,
+    NoteKeywordQuery,
+    WordSketchQuery,
+    NoteVersionArchiveQuery,
+    NoteChangeQuery,
+)
+from tests.integration_tests.query_tests.conftest import async_session
 
 # ----------------------------CREATE NOTE SUCCESS----------------------------------------------------
 @pytest.mark.skipif(note_query_skip_create, reason="The flag 'note_query_skip_create' is active!")
@@ -57,12 +88,28 @@ async def test_update_note_success(create_data, note_repo):
     note = await note_repo.get_by_id(create_data[0]["id"])
     assert note.version_number == 1
 
-    await note_repo.put(note, {"title": "Updated", "content": "New content"})
+    await note_repo.update_returning(id=note.id, data={"title": "Updated", "content": "New content"})
     updated_note = await note_repo.get_by_id(create_data[0]["id"])
+    await note_repo.session.refresh(updated_note)
 
     assert updated_note.title == "Updated"
     assert updated_note.content == "New content"
     assert updated_note.version_number == 2
+
+
+@pytest.mark.skipif(note_query_skip_update, reason="The flag 'note_query_skip_update' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_concurrent_update_rejected(create_data, note_repo):
+    """Tests that an update based on a version changed by another session fails instead of overwriting it."""
+    id = create_data[0]["id"]
+    version_number = await note_repo.get_version_number(id)
+    async with async_session() as other_session:
+        await NoteQuery(other_session).update_returning(id=id, data={"title": "Concurrent title"})
+
+    assert await note_repo.update_returning(
+        id=id, data={"title": "Stale title"}, expected_versions=[version_number]
+    ) is None
+    assert await note_repo.get_version_number(id) == 2
 # ----------------------------UPDATE NOTE SUCCESS----------------------------------------------------
 
 # ----------------------------DELETE NOTE SUCCESS----------------------------------------------------
@@ -72,7 +119,401 @@ async def test_delete_note_success(create_data, note_repo):
     """Tests deleting a note."""
     note = await note_repo.get_by_id(create_data[0]["id"])
     assert note is not None
-    await note_repo.delete(note)
+    await note_repo.delete_returning(note.id)
     deleted_note = await note_repo.get_by_id(create_data[0]["id"])
     assert deleted_note is None
 # ----------------------------DELETE NOTE SUCCESS----------------------------------------------------
+
+
+# ----------------------------DAILY STATS----------------------------------------------------
+@pytest.mark.skipif(note_query_skip_daily_stats, reason="The flag 'note_query_skip_daily_stats' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_daily_stats_maintained_on_write(create_data, note_repo, session):
+    """Tests that creating, updating and deleting notes keeps today's rollup up to date."""
+    await note_repo.update_returning(id=create_data[0]["id"], data={"content": "Three new words"})
+    await note_repo.update_returning(id=create_data[0]["id"], data={"title": "Only the title"})
+    await note_repo.delete_returning(create_data[1]["id"])
+
+    rows = await NoteStatsQuery(session).get_range()
+
+    assert len(rows) == 1
+    assert rows[0].notes_created == 2
+    assert rows[0].words_created == 15
+    assert rows[0].notes_updated == 2
+    assert rows[0].words_updated == 3
+    assert rows[0].notes_deleted == 1
+# ----------------------------DAILY STATS----------------------------------------------------
+
+
+# ----------------------------KEYWORDS----------------------------------------------------
+@pytest.mark.skipif(note_query_skip_keywords, reason="The flag 'note_query_skip_keywords' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_keywords_maintained_on_write(create_data, note_repo, session):
+    """Tests that writes keep the document frequencies and the stored keywords of the note up to date."""
+    keyword_repo = NoteKeywordQuery(session)
+    first = await keyword_repo.get_by_note_id(create_data[0]["id"])
+    assert first.documents_count == 1  # ranked before the second note existed, until the next refresh
+    assert "recommendation" in [keyword["term"] for keyword in first.keywords]
+
+    await note_repo.update_returning(id=create_data[0]["id"], data={"content": "Tomorrow the engine ships"})
+    await note_repo.delete_returning(create_data[1]["id"])
+
+    assert await keyword_repo.get_by_note_id(create_data[1]["id"]) is None
+    updated = await keyword_repo.get_by_note_id(create_data[0]["id"])
+    await session.refresh(updated)
+    assert {keyword["term"] for keyword in updated.keywords} == {"tomorrow", "engine", "ships"}
+
+    tomorrow = await session.get(TermStatsModel, (NoteModel.DEFAULT_TENANT, "tomorrow"))
+    recommendation = await session.get(TermStatsModel, (NoteModel.DEFAULT_TENANT, "recommendation"))
+    await session.refresh(tomorrow)
+    await session.refresh(recommendation)
+    assert (tomorrow.document_frequency, recommendation.document_frequency) == (1, 0)
+
+    # the writes only touched the shard rows of the documents count, the compaction folds them
+    documents_count = select(TermStatsModel.term, TermStatsModel.document_frequency).where(
+        TermStatsModel.term.in_([TermStatsModel.DOCUMENTS_COUNT_TERM, *TermStatsModel.DOCUMENTS_COUNT_SHARDS])
+    )
+    assert TermStatsModel.DOCUMENTS_COUNT_TERM not in dict((await session.execute(documents_count)).all())
+    assert await keyword_repo.compact() == 1
+    assert dict((await session.execute(documents_count)).all()) == {TermStatsModel.DOCUMENTS_COUNT_TERM: 1}
+
+
+@pytest.mark.skipif(note_query_skip_keywords, reason="The flag 'note_query_skip_keywords' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_keywords_rebuild(create_data, session):
+    """Tests that the periodic rebuild recounts the frequencies and re-ranks every note."""
+    keyword_repo = NoteKeywordQuery(session)
+    stale = await keyword_repo.get_by_note_id(create_data[1]["id"])
+    stale.documents_count = 0
+    await session.commit()
+
+    assert await keyword_repo.rebuild(top_n=3, batch_size=1) == 2
+
+    rebuilt = await keyword_repo.get_by_note_id(create_data[1]["id"])
+    await session.refresh(rebuilt)
+    assert rebuilt.documents_count == 2
+    assert len(rebuilt.keywords) == 3
+# ----------------------------KEYWORDS----------------------------------------------------
+
+
+# ----------------------------UPDATE / DELETE RETURNING----------------------------------------------------
+@pytest.mark.skipif(note_query_skip_returning, reason="The flag 'note_query_skip_returning' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_update_returning(create_data, note_repo, session):
+    """Tests updating a note without loading it, including its version row, rollup and keywords."""
+    id = create_data[0]["id"]
+    assert await note_repo.update_returning(id, {"title": "Stale"}, expected_versions=[2]) is None
+    assert await note_repo.update_returning(999, {"title": "Missing"}) is None
+
+    updated = await note_repo.update_returning(id, {"content": "Brand new words"}, expected_versions=[1])
+
+    assert updated["version_number"] == 2
+    assert updated["content"] == "Brand new words"
+    assert updated["old_content"] == create_data[0]["content"]
+    assert (await session.get(TermStatsModel, (NoteModel.DEFAULT_TENANT, "recommendation"))).document_frequency == 0
+    versions = await session.execute(select(NoteVersionModel.version_number).where(NoteVersionModel.note_id == id))
+    assert sorted(versions.scalars().all()) == [1, 2]
+    keywords = await session.get(NoteKeywordsModel, id)
+    await session.refresh(keywords)
+    assert {keyword["term"] for keyword in keywords.keywords} == {"brand", "new", "words"}
+    rows = await NoteStatsQuery(session).get_range()
+    assert (rows[0].notes_updated, rows[0].words_updated) == (1, 3)
+
+
+@pytest.mark.skipif(note_query_skip_returning, reason="The flag 'note_query_skip_returning' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_delete_returning(create_data, note_repo, session):
+    """Tests deleting a note and its versions without loading them."""
+    id = create_data[0]["id"]
+    assert await note_repo.delete_returning(id, expected_versions=[2]) is None
+
+    deleted = await note_repo.delete_returning(id, expected_versions=[1])
+
+    assert deleted["id"] == id
+    assert await note_repo.get_by_id(id) is None
+    versions = await session.execute(select(NoteVersionModel).where(NoteVersionModel.note_id == id))
+    assert versions.scalars().all() == []
+    assert await session.get(NoteKeywordsModel, id) is None
+    assert (await NoteStatsQuery(session).get_range())[0].notes_deleted == 1
+
+
+@pytest.mark.skipif(note_query_skip_returning, reason="The flag 'note_query_skip_returning' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_returning_writes_match_recount(create_data, note_repo, session):
+    """Tests that the derived tables maintained by the RETURNING writes match a recount of the remaining notes."""
+    await note_repo.update_returning(create_data[0]["id"], {"content": "Engine engine ships tomorrow"})
+    await note_repo.delete_returning(create_data[1]["id"])
+    await NoteKeywordQuery(session).compact()
+
+    async def snapshot() -> tuple[dict, dict]:
+        frequencies = await session.execute(
+            select(TermStatsModel.term, TermStatsModel.document_frequency).where(TermStatsModel.document_frequency != 0)
+        )
+        counters = await session.execute(
+            select(WordCountSketchModel.row_index, WordCountSketchModel.column_index, WordCountSketchModel.count)
+            .where(WordCountSketchModel.count != 0)
+        )
+        return dict(frequencies.all()), {(row, column): count for row, column, count in counters.all()}
+
+    maintained = await snapshot()
+    await NoteKeywordQuery(session).rebuild()
+    await WordSketchQuery(session).rebuild()
+    assert await snapshot() == maintained
+    assert maintained[0][TermStatsModel.DOCUMENTS_COUNT_TERM] == 1
+
+
+@pytest.mark.skipif(note_query_skip_returning, reason="The flag 'note_query_skip_returning' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_bulk_update_and_delete(create_data, note_repo, session):
+    """Tests updating and deleting every note matching a filter with one statement per table."""
+    ids = sorted(note["id"] for note in create_data)
+    assert await note_repo.bulk_update({"ids": [999]}, {"content": "Nothing"}) == []
+
+    updated = await note_repo.bulk_update({"ids": ids}, {"content": "Shared words", "summarization": "Same."})
+
+    assert sorted(updated) == ids
+    # the replaced contents are subtracted, only the shared content is counted
+    await NoteKeywordQuery(session).compact()
+    frequencies = await session.execute(
+        select(TermStatsModel.term, TermStatsModel.document_frequency).where(TermStatsModel.document_frequency > 0)
+    )
+    assert dict(frequencies.all()) == dict.fromkeys(["shared", "words", TermStatsModel.DOCUMENTS_COUNT_TERM], len(ids))
+    versions = await session.execute(select(NoteVersionModel.version_number).where(NoteVersionModel.note_id.in_(ids)))
+    assert sorted(versions.scalars().all()) == [1] * len(ids) + [2] * len(ids)
+    assert (await NoteStatsQuery(session).get_range())[0].notes_updated == len(ids)
+
+    deleted = await note_repo.bulk_delete({"ids": ids})
+
+    assert sorted(deleted) == ids
+    assert await note_repo.get_all() == []
+    assert (await session.execute(select(NoteVersionModel))).scalars().all() == []
+    assert (await NoteStatsQuery(session).get_range())[0].notes_deleted == len(ids)
+# ----------------------------UPDATE / DELETE RETURNING----------------------------------------------------
+
+
+# ----------------------------FILTERED LISTING----------------------------------------------------
+@pytest.mark.skipif(note_query_skip_listing, reason="The flag 'note_query_skip_listing' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_filtered(create_data, note_repo):
+    """Tests filtering the notes by title prefix, time and word count ranges, and sorting them."""
+    update_id, delete_id = create_data[0]["id"], create_data[1]["id"]
+
+    notes = await note_repo.get_filtered({"title_prefix": "Project U"})
+    assert [note.id for note in notes] == [update_id]
+    assert await note_repo.get_filtered({"title_prefix": "project"}) == []
+
+    notes = await note_repo.get_filtered({"min_words": 7, "max_words": 7})
+    assert [note.word_count for note in notes] == [7]
+
+    notes = await note_repo.get_filtered({"created_from": datetime(2000, 1, 1)}, sort="word_count", descending=True)
+    assert [note.id for note in notes] == [update_id, delete_id]
+
+    await note_repo.update_returning(id=notes[0].id, data={"content": "Now short"})
+    note_repo.session.expire_all()
+    notes = await note_repo.get_filtered({"max_words": 2})
+    assert [(note.id, note.word_count) for note in notes] == [(update_id, 2)]
+
+
+@pytest.mark.skipif(note_query_skip_listing, reason="The flag 'note_query_skip_listing' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+@pytest.mark.parametrize(
+    "filters, sort",
+    [
+        ({"title_prefix": "Project"}, "title"),
+        ({"created_from": datetime(2025, 1, 1), "created_to": datetime(2025, 2, 1)}, "created_at"),
+        ({"updated_from": datetime(2025, 1, 1)}, "updated_at"),
+        ({"min_words": 10, "max_words": 100}, "word_count"),
+        ({}, "created_at"),
+        ({}, "id"),
+    ],
+)
+async def test_get_filtered_uses_indexes(session, filters, sort):
+    """Tests that every supported filter and sort key is answered from an index, without a sequential scan."""
+    connection = await session.connection()
+    dialect = connection.dialect.name
+    stmt = NoteQuery.listing_statement(filters, sort=sort, descending=False, dialect=dialect)
+    compiled = stmt.compile(dialect=connection.dialect)
+    parameters = tuple(compiled.params[name] for name in compiled.positiontup)
+
+    if dialect == "postgresql":
+        # on a nearly empty table a sequential scan is always cheapest, only check that an index can be used
+        await connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = [row[0] for row in await connection.exec_driver_sql(f"EXPLAIN {compiled}", parameters)]
+        assert not any("Seq Scan" in line for line in plan), plan
+    else:
+        plan = [row[-1] for row in await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", parameters)]
+        assert not any(line == "SCAN note" for line in plan), plan
+        assert not any("TEMP B-TREE" in line for line in plan), plan
+        # the tenant leads every index, even an unfiltered listing only reads the rows of one tenant
+        assert any(line.startswith("SEARCH note USING") for line in plan), plan
+# ----------------------------FILTERED LISTING----------------------------------------------------
+
+
+# ----------------------------WORD SKETCHES----------------------------------------------------
+@pytest.mark.skipif(note_query_skip_sketches, reason="The flag 'note_query_skip_sketches' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_word_sketches_follow_writes(create_data, note_repo, session, monkeypatch):
+    """Tests that creating, updating and deleting notes keeps the word sketches in line with the notes."""
+    repo = WordSketchQuery(session)
+    assert await repo.get_heavy_hitters(min_count=0) == {
+        "today": 1, "successfully": 1, "integrated": 1, "new": 1, "recommendation": 1, "engine": 1,
+        "tomorrow": 1, "project's": 1, "going": 1, "deleted": 1,
+    }
+    assert await repo.get_vocabulary_size() == 10
+
+    await note_repo.update_returning(id=create_data[0]["id"], data={"content": "Engine engine deleted"})
+    assert await repo.get_heavy_hitters(min_count=1) == {"engine": 2, "deleted": 2}
+
+    await note_repo.delete_returning(create_data[1]["id"])
+    assert await repo.get_heavy_hitters(min_count=0) == {"engine": 2, "deleted": 1}
+
+    # writes only add candidates, the compaction trims them
+    monkeypatch.setattr(env_config, "WORD_SKETCH_TOP_WORDS", 1)
+    assert await repo.get_heavy_hitters(min_count=0) == {"engine": 2}
+    assert await repo.trim_heavy_hitters() == 9
+    monkeypatch.setattr(env_config, "WORD_SKETCH_TOP_WORDS", 10)
+    assert await repo.get_heavy_hitters(min_count=0) == {"engine": 2}
+
+
+@pytest.mark.skipif(note_query_skip_sketches, reason="The flag 'note_query_skip_sketches' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_word_sketches_rebuild(create_data, note_repo, session):
+    """Tests that bulk updates subtract the replaced words, and that a rebuild recounts the same words."""
+    repo = WordSketchQuery(session)
+    ids = [note["id"] for note in create_data]
+    await note_repo.bulk_update({"ids": ids}, {"content": "Shared words words"})
+    assert await repo.get_heavy_hitters(min_count=1) == {"words": 4, "shared": 2}
+
+    assert await repo.rebuild(batch_size=1) == len(ids)
+
+    assert await repo.get_heavy_hitters(min_count=0) == {"words": 4, "shared": 2}
+    assert await repo.get_vocabulary_size() == 2
+# ----------------------------WORD SKETCHES----------------------------------------------------
+
+
+# ----------------------------TENANTS----------------------------------------------------
+@pytest.mark.skipif(note_query_skip_tenants, reason="The flag 'note_query_skip_tenants' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_notes_scoped_to_tenant(create_data, note_repo, session):
+    """Tests that the notes of a tenant, and the rollups and sketches derived from them, are invisible to others."""
+    acme = NoteQuery(session, tenant_id="acme")
+    # titles are only unique within a tenant
+    note = {key: value for key, value in create_data[0].items() if key != "id"}
+    acme_id = await acme.create({**note, "content": "Acme engine"})
+
+    assert [note.id for note in await acme.get_all()] == [acme_id]
+    assert await acme.get_by_id(create_data[0]["id"]) is None
+    assert await acme.delete_returning(create_data[1]["id"]) is None
+    assert await acme.bulk_delete({"ids": [note["id"] for note in create_data]}) == []
+    assert len(await note_repo.get_all()) == 2
+
+    assert (await NoteStatsQuery(session, tenant_id="acme").get_range())[0].notes_created == 1
+    assert (await NoteStatsQuery(session).get_range())[0].notes_created == 2
+    assert await WordSketchQuery(session, tenant_id="acme").get_heavy_hitters(min_count=0) == {"acme": 1, "engine": 1}
+    assert "acme" not in await WordSketchQuery(session).get_heavy_hitters(min_count=0)
+    assert await NoteKeywordQuery(session, tenant_id="acme").get_by_note_id(create_data[0]["id"]) is None
+    assert await NoteKeywordQuery(session).get_tenant_ids() == ["acme", NoteModel.DEFAULT_TENANT]
+# ----------------------------TENANTS----------------------------------------------------
+
+
+# ----------------------------VERSION ARCHIVE----------------------------------------------------
+@pytest.mark.skipif(note_query_skip_archive, reason="The flag 'note_query_skip_archive' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_archive_versions(create_data, note_repo, session, tmp_path):
+    """Tests that archived versions leave the table and are still returned, merged with the live ones."""
+    ids = [note["id"] for note in create_data]
+    versions = await note_repo.get_versions(ids)
+    next_month = (datetime.now().replace(day=1) + timedelta(days=32)).replace(day=1)
+
+    entries = await NoteVersionArchiveQuery(session).archive(before=next_month, directory=tmp_path, chunk_size=1)
+
+    # a month partition goes to one file on PostgreSQL, elsewhere every chunk gets its own file and transaction
+    connection = await session.connection()
+    chunks = [len(versions)] if connection.dialect.name == "postgresql" else [1] * len(versions)
+    assert [entry["rows_count"] for entry in entries] == chunks
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(Path(entry["path"]).name for entry in entries)
+    assert (await session.execute(select(NoteVersionModel))).scalars().all() == []
+    assert (await session.execute(select(NoteVersionArchiveModel.path))).scalars().all() == [
+        entry["path"] for entry in entries
+    ]
+    assert await note_repo.get_versions(ids) == versions
+
+    await note_repo.update_returning(id=ids[0], data={"title": "Archived once"})
+    merged = await note_repo.get_versions([ids[0]])
+    assert [version["version_number"] for version in merged] == [1, 2]
+    assert merged[1]["title"] == "Archived once"
+    assert await NoteVersionArchiveQuery(session).archive(before=datetime(2000, 1, 1), directory=tmp_path) == []
+
+
+@pytest.mark.skipif(note_query_skip_archive, reason="The flag 'note_query_skip_archive' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_versions_stamped_with_own_creation_time(create_data, note_repo, session, tmp_path):
+    """Tests that the versions of an old note are created now, so archiving its creation month leaves them."""
+    id = await note_repo.create({**create_data[0], "id": None, "title": "Old note", "created_at": datetime(2020, 1, 1)})
+    await note_repo.update_returning(id=id, data={"content": "Rewritten today"})
+
+    versions = await note_repo.get_versions([id])
+    assert [version["version_number"] for version in versions] == [1, 2]
+    assert all(version["created_at"] > datetime(2020, 2, 1) for version in versions)
+    assert await NoteVersionArchiveQuery(session).archive(before=datetime(2021, 1, 1), directory=tmp_path) == []
+
+
+@pytest.mark.skipif(note_query_skip_archive, reason="The flag 'note_query_skip_archive' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_upcoming_partitions_created(create_data, note_repo, session):
+    """
+    Tests that a missing partition of the current month is created, taking its versions out of the DEFAULT
+    partition, and that the partitioned table keeps a primary key.
+    """
+    repo = NoteVersionArchiveQuery(session)
+    assert await repo.create_upcoming_partitions() == []
+    connection = await session.connection()
+    if connection.dialect.name != "postgresql":
+        return
+
+    primary_key = await session.scalar(
+        text("SELECT pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = 'note_version'::regclass "
+             "AND contype = 'p'")
+    )
+    assert primary_key == "PRIMARY KEY (id, created_at)"
+
+    month = NoteVersionPartitions.month_start(await session.scalar(text("SELECT date_trunc('month', now())")))
+    name = NoteVersionPartitions.partition_name(month)
+    await session.run_sync(lambda sync_session: NoteVersionPartitions.detach(sync_session.connection(), name))
+    await session.run_sync(lambda sync_session: NoteVersionPartitions.drop(sync_session.connection(), name))
+    await session.commit()
+    await note_repo.update_returning(id=create_data[0]["id"], data={"title": "Lands in the default partition"})
+
+    assert await repo.create_upcoming_partitions() == [name]
+    for table, count in ((NoteVersionPartitions.DEFAULT_PARTITION, 0), (name, 1)):
+        assert await session.scalar(select(func.count()).select_from(text(table))) == count
+# ----------------------------VERSION ARCHIVE----------------------------------------------------
+
+
+# ----------------------------CHANGE LOG----------------------------------------------------
+@pytest.mark.skipif(note_query_skip_changes, reason="The flag 'note_query_skip_changes' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_changes_logged(create_data, note_repo, session):
+    """Tests that every write path logs its changes, in order, and that pruning keeps the last one."""
+    ids = [note["id"] for note in create_data]
+    await note_repo.update_returning(id=ids[0], data={"title": "First"})
+    await note_repo.update_returning(id=ids[0], data={"title": "Returning"})
+    await note_repo.bulk_delete({"ids": ids})
+    await NoteQuery(session, tenant_id="acme").create({**create_data[0], "id": None})
+
+    changes = await NoteChangeQuery(session).get_changes(after=0)
+    assert [(change["note_id"], change["action"], change["version_number"]) for change in changes] == [
+        (ids[0], "created", 1),
+        (ids[1], "created", 1),
+        (ids[0], "updated", 2),
+        (ids[0], "updated", 3),
+        (ids[0], "deleted", 3),
+        (ids[1], "deleted", 1),
+    ]
+    assert [change["sequence"] for change in changes] == list(range(1, 7))
+    assert [change["sequence"] for change in await NoteChangeQuery(session).get_changes(after=2, until=4)] == [3, 4]
+    assert await NoteChangeQuery(session, tenant_id=None).get_sequence_range() == (1, 7)
+
+    assert await NoteChangeQuery(session, tenant_id=None).prune(older_than=timedelta(days=-1)) == 6
+    assert await NoteChangeQuery(session, tenant_id=None).get_sequence_range() == (7, 7)
+# ----------------------------CHANGE LOG----------------------------------------------------
@@ -1,8 +1,13 @@
 import pytest
 from httpx import Response
 
+from src.thirdweb.openai.resilience import AdaptiveConcurrencyLimiter, CircuitBreaker, RetryPolicy
 from src.thirdweb.openai.service import OpenAIService
-from tests.integration_tests.conftest import openai_skip_send_request, openai_skip_get_request
+from tests.integration_tests.conftest import (
+    openai_skip_send_request,
+    openai_skip_get_request,
+    openai_skip_stream_data
+)
 
 
 # ----------------------------SEND REQUEST----------------------------------------------------
@@ -31,9 +36,99 @@ async def test_send_request_error(mock_post, monkeypatch):
     result = await service.fetch_data(user_prompt=user_prompt)
 
     assert result is None
+
+
+@pytest.mark.skipif(openai_skip_send_request, reason="The flag 'openai_skip_send_request' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_send_request_retries_throttled(monkeypatch):
+    """Test that 'fetch_data' retries a throttled request and honors the 'Retry-After' header."""
+    service = OpenAIService(
+        api_key="test_api_key",
+        model="gpt-3.5-turbo",
+        retry_policy=RetryPolicy(max_retries=2, base_delay=0.001),
+        circuit_breaker=CircuitBreaker(),
+        limiter=AdaptiveConcurrencyLimiter(),
+    )
+    responses = [
+        Response(status_code=429, headers={"retry-after": "0.01"}, json={"error": "Rate limit"}),
+        Response(status_code=200, json={"choices": [{"message": {"content": "AI response"}}]}),
+    ]
+
+    async def mock_post_throttled(self, url, **kwargs):
+        return responses.pop(0)
+
+    monkeypatch.setattr("httpx.AsyncClient.post", mock_post_throttled)
+    result = await service.fetch_data(user_prompt="Explain SOLID principles")
+
+    assert result == "AI response"
+    assert not responses
+
+
+@pytest.mark.skipif(openai_skip_send_request, reason="The flag 'openai_skip_send_request' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_send_request_circuit_open(monkeypatch):
+    """Test that 'fetch_data' stops calling the API once the circuit breaker is open."""
+    service = OpenAIService(
+        api_key="test_api_key",
+        model="gpt-3.5-turbo",
+        retry_policy=RetryPolicy(max_retries=3, base_delay=0.001),
+        circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60.0),
+        limiter=AdaptiveConcurrencyLimiter(),
+    )
+    calls = []
+
+    async def mock_post_unavailable(self, url, **kwargs):
+        calls.append(url)
+        return Response(status_code=503, json={"error": "Unavailable"})
+
+    monkeypatch.setattr("httpx.AsyncClient.post", mock_post_unavailable)
+
+    assert await service.fetch_data(user_prompt="Explain SOLID principles") is None
+    assert await service.fetch_data(user_prompt="Explain SOLID principles") is None
+    assert len(calls) == 2
 # ----------------------------SEND REQUEST----------------------------------------------------
 
 
+# ----------------------------STREAM DATA----------------------------------------------------
+@pytest.mark.skipif(openai_skip_stream_data, reason="The flag 'openai_skip_stream_data' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_stream_data(monkeypatch):
+    """Test that the 'stream_data' method of OpenAIService yields content deltas in order."""
+    service = OpenAIService(api_key="test_api_key", model="gpt-3.5-turbo")
+    body = (
+        'data: {"choices": [{"delta": {"role": "assistant"}}]}\n\n'
+        'data: {"choices": [{"delta": {"content": "AI"}}]}\n\n'
+        ': keep-alive\n\n'
+        'data: {"choices": [{"delta": {"content": " response"}}]}\n\n'
+        'data: [DONE]\n\n'
+    )
+
+    async def mock_send(self, request, **kwargs):
+        assert request.url == OpenAIService.BASE_URL
+        return Response(status_code=200, content=body.encode(), request=request)
+
+    monkeypatch.setattr("httpx.AsyncClient.send", mock_send)
+    deltas = [delta async for delta in service.stream_data(user_prompt="Explain SOLID principles")]
+
+    assert deltas == ["AI", " response"]
+
+
+@pytest.mark.skipif(openai_skip_stream_data, reason="The flag 'openai_skip_stream_data' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_stream_data_error(monkeypatch):
+    """Test that the 'stream_data' method of OpenAIService yields nothing when the request fails."""
+    service = OpenAIService(api_key="test_api_key", model="gpt-3.5-turbo")
+
+    async def mock_send(self, request, **kwargs):
+        return Response(status_code=400, json={"error": "Bad request"}, request=request)
+
+    monkeypatch.setattr("httpx.AsyncClient.send", mock_send)
+    deltas = [delta async for delta in service.stream_data(user_prompt="Explain SOLID principles")]
+
+    assert deltas == []
+# ----------------------------STREAM DATA----------------------------------------------------
+
+
 # ----------------------------GET RESPONSE----------------------------------------------------
 @pytest.mark.skipif(openai_skip_get_request, reason="The flag 'openai_skip_get_request' is active!")
 @pytest.mark.asyncio(loop_scope="session")
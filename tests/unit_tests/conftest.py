@@ -2,5 +2,25 @@
 analytic_skip_word_count = True
 analytic_skip_avg_note_length = True
 analytic_skip_common_word = True
+analytic_skip_common_phrases = True
 analytic_skip_longest_note = True
-analytic_skip_shortest_note = True
\ No newline at end of file
+analytic_skip_shortest_note = True
+analytic_skip_timeline = True
+openai_skip_retry_policy = True
+openai_skip_circuit_breaker = True
+openai_skip_concurrency_limiter = True
+summarizer_skip_split_chunks = True
+summarizer_skip_map_reduce = True
+content_skip_normalize = True
+content_skip_edit_distance = True
+scheduler_skip_budget = True
+scheduler_skip_priority = True
+summarizer_skip_extractive = True
+summarizer_skip_fallback = True
+analytic_skip_executor = True
+analytic_skip_keywords = True
+cache_skip_note_cache = True
+analytic_skip_sketches = True
+lazy_skip_imports = True
+admission_skip_control = True
+single_flight_skip_coalescing = True
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from src.backend.utils.admission import AdmissionController
+from src.backend.utils.exceptions import OverloadedError
+from src.backend.utils.metrics import Metrics
+from tests.unit_tests.conftest import admission_skip_control
+
+
+# ----------------------------ADMISSION CONTROL----------------------------------------------------
+@pytest.mark.skipif(admission_skip_control, reason="The flag 'admission_skip_control' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_admission_queues_then_sheds():
+    """Test that requests beyond the slots wait in the queue, and requests beyond the queue are shed at once."""
+    admission = AdmissionController(name="test_queue", max_concurrent=1, max_queue=1, queue_timeout=5, retry_after=3)
+    release = asyncio.Event()
+    order = []
+
+    async def request(number: int) -> None:
+        async with admission.admit():
+            order.append(number)
+            await release.wait()
+
+    first = asyncio.create_task(request(1))
+    second = asyncio.create_task(request(2))
+    await asyncio.sleep(0.01)
+    assert (admission.in_flight, admission.waiting) == (1, 1)
+    assert Metrics.snapshot()["gauges"]["test_queue_admission_queue_depth"] == 1
+
+    with pytest.raises(OverloadedError) as error:
+        await request(3)
+    assert error.value.retry_after == 3
+    with pytest.raises(OverloadedError):
+        admission.check()
+
+    release.set()
+    await asyncio.gather(first, second)
+    assert order == [1, 2]
+    assert (admission.in_flight, admission.waiting) == (0, 0)
+    assert Metrics.snapshot()["counters"]["test_queue_admission"] == {"admitted": 2, "shed_queue_full": 2}
+
+
+@pytest.mark.skipif(admission_skip_control, reason="The flag 'admission_skip_control' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_admission_sheds_after_queue_timeout():
+    """Test that a request waiting longer than 'queue_timeout' is shed and leaves the queue."""
+    admission = AdmissionController(name="test_timeout", max_concurrent=1, max_queue=10, queue_timeout=0.01)
+
+    async with admission.admit():
+        with pytest.raises(OverloadedError):
+            async with admission.admit():
+                pass
+        assert admission.waiting == 0
+
+    async with admission.admit():
+        assert admission.in_flight == 1
+    assert Metrics.snapshot()["counters"]["test_timeout_admission"] == {"admitted": 2, "shed_timeout": 1}
+
+
+@pytest.mark.skipif(admission_skip_control, reason="The flag 'admission_skip_control' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_admission_wakeup_survives_cancelled_waiter():
+    """Test that a slot released to a waiter being cancelled goes to the next waiter."""
+    admission = AdmissionController(name="test_wakeup", max_concurrent=1, max_queue=10, queue_timeout=5)
+    await admission._acquire()
+
+    cancelled = asyncio.create_task(admission._acquire())
+    waiting = asyncio.create_task(admission._acquire())
+    await asyncio.sleep(0.01)
+    assert admission.waiting == 2
+
+    # the waiter is cancelled, but only leaves the queue after the release has picked it
+    cancelled.cancel()
+    await admission._release()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+
+    await asyncio.wait_for(waiting, timeout=1)
+    assert (admission.in_flight, admission.waiting) == (1, 0)
+    await admission._release()
+# ----------------------------ADMISSION CONTROL----------------------------------------------------
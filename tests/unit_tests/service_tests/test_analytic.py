@@ -1,12 +1,18 @@
+from datetime import date
+
 import pytest
 
 from tests.unit_tests.conftest import (
     analytic_skip_word_count,
     analytic_skip_avg_note_length,
     analytic_skip_common_word,
+    analytic_skip_common_phrases,
     analytic_skip_longest_note,
-    analytic_skip_shortest_note
+    analytic_skip_shortest_note,
+    analytic_skip_timeline,
+    analytic_skip_keywords
 )
+from src.thirdweb.analytic.service import NoteAnalyticsService, NoteTimelineService, NoteKeywordService
 from tests.unit_tests.service_tests.conftest import analytics_service
 
 
@@ -58,6 +64,40 @@ def test_get_most_common_words(analytics_service, min_count, expected_common_wor
 # ----------------------------COMMON WORDS----------------------------------------------------
 
 
+# ----------------------------COMMON PHRASES----------------------------------------------------
+@pytest.mark.skipif(analytic_skip_common_phrases, reason="The flag 'analytic_skip_common_phrases' is active!")
+@pytest.mark.parametrize(
+    "n, min_count, expected_common_phrases",
+    [
+        (2, 1, {"machine learning": 4, "learning models": 2}),
+        (3, 0, {"machine learning models": 2, "deep machine learning": 1, "learning models rock": 1}),
+    ]
+)
+def test_get_most_common_phrases(n, min_count, expected_common_phrases):
+    """Test that the 'get_most_common_phrases' method counts the phrases of 'n' words, most common first,
+       without crossing stopwords, punctuation or notes."""
+    analytics_service = NoteAnalyticsService(notes=[
+        {"content": "Machine learning models. Machine learning is fun, machine learning for the win"},
+        {"content": "Deep machine learning models rock"},
+        {"content": "Machine"},
+        {"content": "learning"},
+    ])
+
+    common_phrases = analytics_service.get_most_common_phrases(n=n, min_count=min_count)
+    assert common_phrases == expected_common_phrases
+    assert list(common_phrases.values()) == sorted(common_phrases.values(), reverse=True)
+
+
+@pytest.mark.skipif(analytic_skip_common_phrases, reason="The flag 'analytic_skip_common_phrases' is active!")
+def test_get_most_common_phrases_short_corpus(analytics_service):
+    """Test that a corpus shorter than 'n' words gives no phrases, and that 'min_count' 0 keeps every phrase."""
+    assert NoteAnalyticsService(notes=[{"content": "Note"}]).get_most_common_phrases(n=2, min_count=0) == {}
+    assert analytics_service.get_most_common_phrases(n=2, min_count=0) == {
+        "another note": 1, "short note": 1, "simple note": 1,
+    }
+# ----------------------------COMMON PHRASES----------------------------------------------------
+
+
 # ----------------------------LONGEST NOTES----------------------------------------------------
 @pytest.mark.skipif(analytic_skip_longest_note, reason="The flag 'analytic_skip_longest_note' is active!")
 @pytest.mark.parametrize(
@@ -88,3 +128,53 @@ def test_get_shortest_notes(analytics_service, top_n, expected_shortest_notes):
     assert analytics_service.get_shortest_notes(top_n) == expected_shortest_notes
     assert type(analytics_service.get_shortest_notes(top_n)) == list
 # ----------------------------SHORTEST NOTES----------------------------------------------------
+
+
+# ----------------------------TIMELINE----------------------------------------------------
+@pytest.mark.skipif(analytic_skip_timeline, reason="The flag 'analytic_skip_timeline' is active!")
+@pytest.mark.parametrize(
+    "granularity, expected_periods, expected_words",
+    [
+        ("day", ["2025-03-02", "2025-03-03", "2025-04-01"], [10, 20, 40]),
+        ("week", ["2025-02-24", "2025-03-03", "2025-03-31"], [10, 20, 40]),
+        ("month", ["2025-03-01", "2025-04-01"], [30, 40]),
+    ]
+)
+def test_get_buckets(granularity, expected_periods, expected_words):
+    """Test that 'get_buckets' sums the daily rollups per day, week (from Monday) or month."""
+    counters = dict.fromkeys(NoteTimelineService.COUNTERS, 0)
+    timeline = NoteTimelineService(daily_stats=[
+        {**counters, "day": date(2025, 3, 2), "notes_created": 1, "words_created": 10},
+        {**counters, "day": date(2025, 3, 3), "notes_created": 1, "words_created": 20},
+        {**counters, "day": date(2025, 4, 1), "notes_created": 2, "words_created": 40},
+    ])
+    buckets = timeline.get_buckets(granularity=granularity)
+
+    assert [bucket["period"] for bucket in buckets] == expected_periods
+    assert [bucket["words_created"] for bucket in buckets] == expected_words
+    assert timeline.get_total("notes_created") == 4
+# ----------------------------TIMELINE----------------------------------------------------
+
+
+# ----------------------------KEYWORDS----------------------------------------------------
+@pytest.mark.skipif(analytic_skip_keywords, reason="The flag 'analytic_skip_keywords' is active!")
+def test_tokenize():
+    """Test that 'tokenize' lowercases words and drops punctuation and stopwords."""
+    assert NoteKeywordService.tokenize("The Engine, the engine! And -- tests.") == ["engine", "engine", "tests"]
+
+
+@pytest.mark.skipif(analytic_skip_keywords, reason="The flag 'analytic_skip_keywords' is active!")
+def test_get_keywords():
+    """Test that 'get_keywords' ranks rare terms above terms found in every note."""
+    service = NoteKeywordService(top_n=2)
+    words = NoteKeywordService.tokenize("Engine release engine notes")
+    keywords = service.get_keywords(
+        words=words,
+        document_frequencies={"engine": 1, "release": 10, "notes": 10},
+        documents_count=10,
+    )
+
+    assert [keyword["term"] for keyword in keywords] == ["engine", "notes"]
+    assert keywords[0]["score"] > keywords[1]["score"]
+    assert service.get_keywords(words=[], document_frequencies={}, documents_count=10) == []
+# ----------------------------KEYWORDS----------------------------------------------------
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from src.backend.utils.exceptions import AnalyticsCancelledError
+from src.thirdweb.analytic.executor import AnalyticsExecutor, _run_job
+from tests.unit_tests.conftest import analytic_skip_executor
+
+
+@pytest.fixture(scope="module")
+def executor():
+    """
+    Fixture that returns an AnalyticsExecutor offloading every job, whatever the corpus size.
+    The worker processes are stopped once the module's tests are done.
+    """
+    executor = AnalyticsExecutor(max_workers=1, max_concurrent_jobs=1, min_notes=0)
+    yield executor
+    executor.shutdown()
+
+
+# ----------------------------PROCESS POOL----------------------------------------------------
+@pytest.mark.skipif(analytic_skip_executor, reason="The flag 'analytic_skip_executor' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+@pytest.mark.parametrize(
+    "method, kwargs, expected_result",
+    [
+        ("get_total_word_count", {}, 12),
+        ("get_average_note_length", {}, 4.0),
+        ("get_most_common_words", {"min_count": 2}, {"note": 3}),
+        ("get_longest_note_indices", {"top_n": 1}, [1]),
+        ("get_shortest_note_indices", {"top_n": 1}, [2]),
+    ]
+)
+async def test_executor_matches_service(executor, notes, method, kwargs, expected_result):
+    """Test that analytics computed in a worker process through shared memory match the in-process ones."""
+    contents = [note["content"] for note in notes]
+
+    assert await executor.run(method, contents=contents, **kwargs) == expected_result
+
+
+@pytest.mark.skipif(analytic_skip_executor, reason="The flag 'analytic_skip_executor' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_executor_unicode_contents(executor):
+    """Test that multibyte contents survive the trip through shared memory."""
+    contents = ["Café déjà vu naïve", "", "日本語 テキスト"]
+
+    assert await executor.run("get_total_word_count", contents=contents) == 6
+
+
+@pytest.mark.skipif(analytic_skip_executor, reason="The flag 'analytic_skip_executor' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_executor_cancelled_on_disconnect(executor, notes):
+    """Test that a job is abandoned when the client disconnects, and that its slot is released afterwards."""
+    async def is_disconnected():
+        return True
+
+    contents = [note["content"] for note in notes]
+    with pytest.raises(AnalyticsCancelledError):
+        await executor.run("get_total_word_count", contents=contents, is_disconnected=is_disconnected)
+
+    result = await asyncio.wait_for(executor.run("get_total_word_count", contents=contents), timeout=30)
+    assert result == 12
+
+
+@pytest.mark.skipif(analytic_skip_executor, reason="The flag 'analytic_skip_executor' is active!")
+def test_job_stops_once_cancelled(notes):
+    """Test that a job flagged as cancelled after it was handed to a worker returns without computing."""
+    memory = AnalyticsExecutor._share(*AnalyticsExecutor._encode([note["content"] for note in notes]))
+    try:
+        assert _run_job(memory.name, "get_total_word_count", {}) == 12
+
+        AnalyticsExecutor._cancel(_StartedFuture(), memory)
+        assert _run_job(memory.name, "get_total_word_count", {}) is None
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+class _StartedFuture:
+    """A future whose job already started, it can no longer be cancelled."""
+
+    def cancel(self) -> bool:
+        return False
+# ----------------------------PROCESS POOL----------------------------------------------------
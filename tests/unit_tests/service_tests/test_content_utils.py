@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from src.thirdweb.openai.utils import ContentUtils
+from tests.unit_tests.conftest import content_skip_normalize, content_skip_edit_distance
+
+
+# ----------------------------NORMALIZE----------------------------------------------------
+@pytest.mark.skipif(content_skip_normalize, reason="The flag 'content_skip_normalize' is active!")
+@pytest.mark.parametrize(
+    "old, new",
+    [
+        ("Meeting at noon.", "meeting   at noon"),
+        ("Ship it, then test!", "Ship it then test"),
+        ("Line one\nline two", "line one line two"),
+    ]
+)
+def test_normalize_ignores_trivial_differences(old, new):
+    """Test that 'normalize' ignores case, punctuation and whitespace."""
+    assert ContentUtils.normalize(old) == ContentUtils.normalize(new)
+# ----------------------------NORMALIZE----------------------------------------------------
+
+
+# ----------------------------EDIT DISTANCE----------------------------------------------------
+@pytest.mark.skipif(content_skip_edit_distance, reason="The flag 'content_skip_edit_distance' is active!")
+@pytest.mark.parametrize(
+    "old, new, max_distance, expected_distance",
+    [
+        ("a b c d", "a b c d", 2, 0),
+        ("a b c d", "a x c d", 2, 1),
+        ("a b c d", "a c d", 2, 1),
+        ("a b c d", "b a c d e", 5, 3),
+        ("a b c d", "w x y z", 2, 3),
+        ("a b", "a b c d e f", 2, 3),
+        ("", "a b", 5, 2),
+    ]
+)
+def test_edit_distance(old, new, max_distance, expected_distance):
+    """Test that 'edit_distance' returns the word-level distance, capped at 'max_distance + 1'."""
+    distance = ContentUtils.edit_distance(old.split(), new.split(), max_distance=max_distance)
+
+    assert distance == expected_distance
+
+
+@pytest.mark.skipif(content_skip_edit_distance, reason="The flag 'content_skip_edit_distance' is active!")
+def test_edit_distance_long_texts_edited_at_both_ends():
+    """Test that 'edit_distance' compares long texts edited at both ends within the band, not row by row."""
+    old = [f"word{i % 997}" for i in range(50_000)]
+    new = ["first"] + old[1:-2] + ["last", "words", "added"]
+
+    started = time.perf_counter()
+    distance = ContentUtils.edit_distance(old, new, max_distance=1_000)
+
+    assert distance == 4
+    assert time.perf_counter() - started < 5
+# ----------------------------EDIT DISTANCE----------------------------------------------------
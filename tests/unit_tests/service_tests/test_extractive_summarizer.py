@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from src.thirdweb.summarizer.service import BaseSummarizer, ExtractiveSummarizer, FallbackSummarizer
+from tests.unit_tests.conftest import summarizer_skip_extractive, summarizer_skip_fallback
+
+
+class StaticSummarizer(BaseSummarizer):
+    """Summarizer answering with a fixed summary after an optional delay."""
+
+    def __init__(self, summary, delay=0.0):
+        self.summary = summary
+        self.delay = delay
+
+    async def summarize(self, text):
+        await asyncio.sleep(self.delay)
+        return self.summary
+
+
+# ----------------------------EXTRACTIVE----------------------------------------------------
+@pytest.mark.skipif(summarizer_skip_extractive, reason="The flag 'summarizer_skip_extractive' is active!")
+def test_extractive_keeps_informative_sentences_in_order():
+    """Test that the most informative sentences are extracted and keep their original order."""
+    text = (
+        "The database migration finished overnight. "
+        "It was fine. "
+        "The migration moved every database table to the new cluster. "
+        "We had lunch."
+    )
+    summary = ExtractiveSummarizer(ratio=0.5).summarize_text(text)
+
+    assert summary == (
+        "The database migration finished overnight. "
+        "The migration moved every database table to the new cluster."
+    )
+
+
+@pytest.mark.skipif(summarizer_skip_extractive, reason="The flag 'summarizer_skip_extractive' is active!")
+@pytest.mark.parametrize(
+    "text, expected_summary",
+    [
+        ("Single sentence without a stop", "Single sentence without a stop"),
+        ("   ", None),
+    ]
+)
+def test_extractive_short_content(text, expected_summary):
+    """Test that content with at most one sentence is returned as is."""
+    assert ExtractiveSummarizer().summarize_text(text) == expected_summary
+
+
+@pytest.mark.skipif(summarizer_skip_extractive, reason="The flag 'summarizer_skip_extractive' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_extractive_long_transcript():
+    """
+    Test that a transcript with tens of thousands of sentences and distinct terms is summarized off the loop,
+    where a sentences x terms matrix would take gigabytes.
+    """
+    text = " ".join(f"Speaker{i} mentions topic{i} and item{i} again item{i}." for i in range(30_000))
+
+    summary = await ExtractiveSummarizer(ratio=0.001).summarize(text)
+
+    assert len(summary.split(". ")) == 30
+# ----------------------------EXTRACTIVE----------------------------------------------------
+
+
+# ----------------------------FALLBACK----------------------------------------------------
+@pytest.mark.skipif(summarizer_skip_fallback, reason="The flag 'summarizer_skip_fallback' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+@pytest.mark.parametrize(
+    "primary, expected_summary",
+    [
+        (StaticSummarizer("AI summary"), "AI summary"),
+        (StaticSummarizer(None), "local summary"),
+        (StaticSummarizer("AI summary", delay=1.0), "local summary"),
+    ]
+)
+async def test_fallback_summarizer(primary, expected_summary):
+    """Test that the fallback engine is used when the primary one fails or times out."""
+    summarizer = FallbackSummarizer(primary=primary, fallback=StaticSummarizer("local summary"), timeout=0.05)
+
+    assert await summarizer.summarize("Some text.") == expected_summary
+# ----------------------------FALLBACK----------------------------------------------------
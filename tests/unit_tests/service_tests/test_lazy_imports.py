@@ -0,0 +1,32 @@
+import subprocess
+import sys
+
+import pytest
+
+from src.backend.utils.lazy import LazyModule
+from tests.unit_tests.conftest import lazy_skip_imports
+
+
+# ----------------------------LAZY IMPORTS----------------------------------------------------
+@pytest.mark.skipif(lazy_skip_imports, reason="The flag 'lazy_skip_imports' is active!")
+def test_lazy_module_imports_on_first_use():
+    """Test that a stand-in imports its module on the first attribute access and reports how long it took."""
+    module = LazyModule("colorsys")
+    assert LazyModule.report()["colorsys"] is None
+
+    assert module.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert LazyModule.report()["colorsys"] >= 0
+    assert "rgb_to_hsv" in vars(module)  # copied, later accesses skip __getattr__
+
+
+@pytest.mark.skipif(lazy_skip_imports, reason="The flag 'lazy_skip_imports' is active!")
+def test_application_import_defers_heavy_modules():
+    """Test that importing the application imports neither numpy nor httpx."""
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, src.backend.api; print('numpy' in sys.modules, 'httpx' in sys.modules)"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.split() == ["False", "False"]
+# ----------------------------LAZY IMPORTS----------------------------------------------------
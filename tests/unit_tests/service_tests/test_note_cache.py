@@ -0,0 +1,37 @@
+import pytest
+
+from src.database.cache import NoteCache
+from tests.unit_tests.conftest import cache_skip_note_cache
+
+
+# ----------------------------NOTE CACHE----------------------------------------------------
+@pytest.mark.skipif(cache_skip_note_cache, reason="The flag 'cache_skip_note_cache' is active!")
+def test_cache_evicts_least_recently_used():
+    """Test that the cache keeps at most 'max_entries' notes and drops the least recently read first."""
+    cache = NoteCache(max_entries=2, ttl=60)
+    cache.put(id=1, version_number=1, payload={"id": 1})
+    cache.put(id=2, version_number=1, payload={"id": 2})
+    assert cache.get(1) == (1, {"id": 1})
+
+    cache.put(id=3, version_number=1, payload={"id": 3})
+
+    assert cache.get(2) is None
+    assert cache.get(1) is not None
+    assert cache.get(3) is not None
+
+
+@pytest.mark.skipif(cache_skip_note_cache, reason="The flag 'cache_skip_note_cache' is active!")
+def test_cache_expires_and_invalidates(monkeypatch):
+    """Test that entries expire after 'ttl' seconds and disappear when invalidated."""
+    now = [100.0]
+    monkeypatch.setattr("src.database.cache.time.monotonic", lambda: now[0])
+    cache = NoteCache(max_entries=10, ttl=5)
+    cache.put(id=1, version_number=1, payload={"id": 1})
+    cache.put(id=2, version_number=3, payload={"id": 2})
+
+    cache.invalidate(2)
+    assert cache.get(2) is None
+
+    now[0] += 5
+    assert cache.get(1) is None
+# ----------------------------NOTE CACHE----------------------------------------------------
@@ -0,0 +1,207 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from httpx import Headers
+
+from src.thirdweb.openai.resilience import (
+    AdaptiveConcurrencyLimiter,
+    CircuitBreaker,
+    CircuitState,
+    RetryPolicy
+)
+from src.thirdweb.openai.service import OpenAIService
+from tests.unit_tests.conftest import (
+    openai_skip_retry_policy,
+    openai_skip_circuit_breaker,
+    openai_skip_concurrency_limiter
+)
+
+
+# ----------------------------RETRY POLICY----------------------------------------------------
+@pytest.mark.skipif(openai_skip_retry_policy, reason="The flag 'openai_skip_retry_policy' is active!")
+@pytest.mark.parametrize(
+    "headers, expected_delay",
+    [
+        ({"retry-after": "7"}, 7.0),
+        ({"retry-after-ms": "250"}, 0.25),
+        ({"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "1m2s"}, 62.0),
+        ({"x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "20ms"}, 0.02),
+        ({"x-ratelimit-remaining-tokens": "10", "x-ratelimit-reset-tokens": "20ms"}, None),
+        ({}, None),
+    ]
+)
+def test_server_delay(headers, expected_delay):
+    """Test that 'server_delay' honors Retry-After and exhausted rate-limit windows."""
+    delay = RetryPolicy.server_delay(Headers(headers))
+
+    if expected_delay is None:
+        assert delay is None
+    else:
+        assert delay == pytest.approx(expected_delay)
+
+
+@pytest.mark.skipif(openai_skip_retry_policy, reason="The flag 'openai_skip_retry_policy' is active!")
+def test_backoff_is_capped_and_jittered():
+    """Test that the backoff never exceeds the exponential bound nor the maximal delay."""
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+
+    for attempt in range(10):
+        delay = policy.backoff(attempt=attempt)
+        assert 0 <= delay <= min(5.0, 2 ** attempt)
+
+    assert policy.is_retryable(429) and policy.is_retryable(503)
+    assert not policy.is_retryable(400)
+
+
+@pytest.mark.skipif(openai_skip_retry_policy, reason="The flag 'openai_skip_retry_policy' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_stream_retried_before_first_token(monkeypatch):
+    """Test that a throttled stream honors Retry-After, backs the limiter off and is retried before any token."""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, decrease_cooldown=0.0)
+    service = OpenAIService(
+        api_key="key", model="model", retry_policy=RetryPolicy(base_delay=0.0), circuit_breaker=CircuitBreaker(),
+        limiter=limiter
+    )
+    statuses = [429, 503, 200]
+    delays = []
+
+    class StreamResponse:
+        def __init__(self, status_code: int):
+            self.status_code = status_code
+            self.headers = Headers({"retry-after-ms": "50"} if status_code == 429 else {})
+
+        async def aiter_lines(self):
+            yield 'data: {"choices": [{"delta": {"content": "token"}}]}'
+
+    class Client:
+        @asynccontextmanager
+        async def stream(self, *args, **kwargs):
+            yield StreamResponse(statuses.pop(0))
+
+    async def sleep(delay: float):
+        delays.append(delay)
+
+    service.get_client = lambda: Client()
+    monkeypatch.setattr("src.thirdweb.openai.service.asyncio.sleep", sleep)
+    deltas = [delta async for delta in service.stream_data("prompt")]
+
+    assert deltas == ["token"]
+    assert statuses == []
+    assert delays == [pytest.approx(0.05), 0.0]
+    assert limiter.limit < 4
+    assert limiter.in_flight == 0
+# ----------------------------RETRY POLICY----------------------------------------------------
+
+
+# ----------------------------CIRCUIT BREAKER----------------------------------------------------
+@pytest.mark.skipif(openai_skip_circuit_breaker, reason="The flag 'openai_skip_circuit_breaker' is active!")
+def test_circuit_breaker_opens_and_recovers():
+    """Test that the circuit opens after consecutive failures and closes after a successful trial call."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.0)
+
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+
+    assert breaker.allow_request()
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow_request()
+
+
+@pytest.mark.skipif(openai_skip_circuit_breaker, reason="The flag 'openai_skip_circuit_breaker' is active!")
+def test_circuit_breaker_rejects_while_open():
+    """Test that no call is allowed before the reset timeout elapses."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+    breaker.record_failure()
+
+    assert not breaker.allow_request()
+
+
+@pytest.mark.skipif(openai_skip_circuit_breaker, reason="The flag 'openai_skip_circuit_breaker' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_circuit_breaker_cancelled_trial_ends():
+    """Test that a half-open trial call cancelled before its outcome does not keep the circuit shut for good."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    service = OpenAIService(api_key="key", model="model", circuit_breaker=breaker, limiter=AdaptiveConcurrencyLimiter())
+    hang = asyncio.Event()
+
+    async def get_response(user_prompt: str):
+        await hang.wait()
+
+    class StreamResponse:
+        status_code = 200
+
+        async def aiter_lines(self):
+            while True:
+                yield 'data: {"choices": [{"delta": {"content": "token"}}]}'
+
+    class Client:
+        @asynccontextmanager
+        async def stream(self, *args, **kwargs):
+            yield StreamResponse()
+
+    service.get_response = get_response
+    service.get_client = lambda: Client()
+
+    breaker.record_failure()
+    call = asyncio.create_task(service.fetch_data("prompt"))
+    await asyncio.sleep(0.01)
+    assert breaker.state == CircuitState.HALF_OPEN and not breaker.allow_request()
+    call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await call
+    assert breaker.state == CircuitState.OPEN
+
+    stream = service.stream_data("prompt")
+    assert await anext(stream) == "token"
+    assert breaker.state == CircuitState.HALF_OPEN and not breaker.allow_request()
+    await stream.aclose()
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.allow_request()
+# ----------------------------CIRCUIT BREAKER----------------------------------------------------
+
+
+# ----------------------------CONCURRENCY LIMITER----------------------------------------------------
+@pytest.mark.skipif(openai_skip_concurrency_limiter, reason="The flag 'openai_skip_concurrency_limiter' is active!")
+def test_limiter_aimd():
+    """Test that the limit grows additively on success and shrinks multiplicatively on throttling."""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, min_limit=1, max_limit=8, decrease_cooldown=0.0)
+
+    limiter.on_success()
+    assert limiter.limit == pytest.approx(4.25)
+
+    limiter.on_throttled()
+    assert limiter.limit == pytest.approx(2.125)
+
+    for _ in range(5):
+        limiter.on_throttled()
+    assert limiter.limit == 1
+
+
+@pytest.mark.skipif(openai_skip_concurrency_limiter, reason="The flag 'openai_skip_concurrency_limiter' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_limiter_bounds_in_flight_calls():
+    """Test that no more than 'limit' calls run concurrently."""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        await limiter.acquire()
+        try:
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+        finally:
+            await limiter.release()
+
+    await asyncio.gather(*(call() for _ in range(10)))
+
+    assert peak == 2
+    assert limiter.in_flight == 0
+# ----------------------------CONCURRENCY LIMITER----------------------------------------------------
@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+
+from src.thirdweb.openai.resilience import AdaptiveConcurrencyLimiter, CircuitBreaker, RetryPolicy
+from src.thirdweb.openai.scheduler import Priority, SummarizationScheduler, TokenBudget
+from src.thirdweb.openai.service import OpenAIService
+from src.thirdweb.openai.summarizer import OpenAISummarizer
+from src.thirdweb.openai.utils import PromptUtils
+from tests.unit_tests.conftest import scheduler_skip_budget, scheduler_skip_priority
+
+PROMPT = "x" * 40
+
+
+class Response:
+    def __init__(self, status_code: int, content: str = ""):
+        self.status_code = status_code
+        self.headers = {}
+        self.content = content
+
+    def json(self):
+        return {"choices": [{"message": {"content": self.content}}]}
+
+
+def get_service(scheduler: SummarizationScheduler, priority: Priority, get_response) -> OpenAIService:
+    service = OpenAIService(
+        api_key="key",
+        model="model",
+        retry_policy=RetryPolicy(max_retries=2, base_delay=0.0),
+        circuit_breaker=CircuitBreaker(),
+        limiter=AdaptiveConcurrencyLimiter(),
+        scheduler=scheduler,
+        priority=priority,
+    )
+    service.get_response = get_response
+    return service
+
+
+# ----------------------------BUDGET----------------------------------------------------
+@pytest.mark.skipif(scheduler_skip_budget, reason="The flag 'scheduler_skip_budget' is active!")
+def test_token_budget_refills_over_time():
+    """Test that the budget tells how long to wait for a cost and refills linearly."""
+    budget = TokenBudget(per_minute=60)
+    budget.consume(60)
+
+    assert budget.time_until(1, now=budget._updated) == pytest.approx(1.0)
+    assert budget.time_until(1, now=budget._updated + 1.0) == 0.0
+    assert TokenBudget(per_minute=0).time_until(10 ** 9, now=0.0) == 0.0
+
+
+@pytest.mark.skipif(scheduler_skip_budget, reason="The flag 'scheduler_skip_budget' is active!")
+def test_estimate_tokens():
+    """Test that the estimated cost covers the prompt and a completion half as long."""
+    assert PromptUtils.estimate_tokens(PROMPT) == 15
+
+
+@pytest.mark.skipif(scheduler_skip_budget, reason="The flag 'scheduler_skip_budget' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_scheduler_waits_for_budget():
+    """Test that a call exceeding the remaining budget waits until it refills."""
+    scheduler = SummarizationScheduler(requests_per_minute=0, tokens_per_minute=60_000)
+    scheduler._tokens.level = 0
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await scheduler.acquire(PROMPT)
+
+    assert loop.time() - started >= 0.01
+# ----------------------------BUDGET----------------------------------------------------
+
+
+# ----------------------------PRIORITY----------------------------------------------------
+@pytest.mark.skipif(scheduler_skip_priority, reason="The flag 'scheduler_skip_priority' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_scheduler_admits_interactive_first():
+    """Test that waiting interactive calls are admitted before earlier background ones."""
+    scheduler = SummarizationScheduler(requests_per_minute=0, tokens_per_minute=60_000)
+    scheduler._tokens.level = 0
+    admitted = []
+
+    async def call(name, priority):
+        await scheduler.acquire(PROMPT, priority=priority)
+        admitted.append(name)
+
+    tasks = [asyncio.create_task(call("background", Priority.BACKGROUND))]
+    await asyncio.sleep(0)
+    tasks += [asyncio.create_task(call(f"interactive-{i}", Priority.INTERACTIVE)) for i in range(2)]
+    await asyncio.sleep(0)
+
+    assert scheduler.queue_depth(Priority.BACKGROUND) == 1
+    assert scheduler.queue_depth(Priority.INTERACTIVE) == 2
+
+    await asyncio.gather(*tasks)
+    assert admitted == ["interactive-0", "interactive-1", "background"]
+
+
+@pytest.mark.skipif(scheduler_skip_priority, reason="The flag 'scheduler_skip_priority' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_scheduler_cancelled_call_leaves_queue():
+    """Test that a cancelled waiting call is removed from its lane."""
+    scheduler = SummarizationScheduler(requests_per_minute=0, tokens_per_minute=60)
+    scheduler._tokens.level = 0
+
+    task = asyncio.create_task(scheduler.acquire(PROMPT))
+    await asyncio.sleep(0)
+    assert scheduler.queue_depth(Priority.INTERACTIVE) == 1
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert scheduler.queue_depth(Priority.INTERACTIVE) == 0
+
+
+@pytest.mark.skipif(scheduler_skip_priority, reason="The flag 'scheduler_skip_priority' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_service_charges_every_attempt():
+    """Test that the retries of a call wait for the scheduler and are charged to its lane, like the first attempt."""
+    scheduler = SummarizationScheduler(requests_per_minute=1_000, tokens_per_minute=0)
+    statuses = [503, 429, 200]
+
+    async def get_response(user_prompt: str):
+        return Response(statuses.pop(0), content="summary")
+
+    service = get_service(scheduler, Priority.BACKGROUND, get_response)
+    level = scheduler._requests.level
+
+    assert await service.fetch_data(PROMPT) == "summary"
+    assert level - scheduler._requests.level == pytest.approx(3, abs=0.1)
+
+
+@pytest.mark.skipif(scheduler_skip_priority, reason="The flag 'scheduler_skip_priority' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_background_summaries_yield_to_interactive():
+    """Test that a waiting background summarization is sent after the interactive ones queued behind it."""
+    scheduler = SummarizationScheduler(requests_per_minute=0, tokens_per_minute=60_000)
+    scheduler._tokens.level = 0
+    sent = []
+
+    def summarizer(name: str, priority: Priority) -> OpenAISummarizer:
+        async def get_response(user_prompt: str):
+            sent.append(name)
+            return Response(200, content=name)
+
+        return OpenAISummarizer(service=get_service(scheduler, priority, get_response), chunk_words=1_000)
+
+    background = asyncio.create_task(summarizer("bulk", Priority.BACKGROUND).summarize(PROMPT))
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(summarizer("edit", Priority.INTERACTIVE).summarize(PROMPT))
+
+    assert await asyncio.gather(background, interactive) == ["bulk", "edit"]
+    assert sent == ["edit", "bulk"]
+# ----------------------------PRIORITY----------------------------------------------------
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from src.backend.utils.metrics import Metrics
+from src.backend.utils.singleflight import SingleFlight
+from tests.unit_tests.conftest import single_flight_skip_coalescing
+
+
+# ----------------------------SINGLE FLIGHT----------------------------------------------------
+@pytest.mark.skipif(single_flight_skip_coalescing, reason="The flag 'single_flight_skip_coalescing' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_single_flight_shares_result():
+    """Test that concurrent calls of a key run the work once, and that a later call runs it again."""
+    flights = SingleFlight(name="test_shared")
+    release = asyncio.Event()
+    runs = []
+
+    async def work(is_abandoned) -> int:
+        runs.append(1)
+        run = len(runs)
+        await release.wait()
+        return run
+
+    calls = [asyncio.create_task(flights.run("key", work)) for _ in range(5)]
+    other = asyncio.create_task(flights.run("other", work))
+    await asyncio.sleep(0.01)
+    assert flights.in_flight() == 2
+
+    release.set()
+    assert await asyncio.gather(*calls) == [1] * 5
+    assert await other == 2
+    assert await flights.run("key", work) == 3
+    assert flights.in_flight() == 0
+    assert Metrics.snapshot()["counters"]["test_shared_single_flight"] == {"leader": 3, "coalesced": 4}
+
+
+@pytest.mark.skipif(single_flight_skip_coalescing, reason="The flag 'single_flight_skip_coalescing' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_single_flight_propagates_errors():
+    """Test that every waiting caller gets the exception of the shared work, and that the key is freed."""
+    flights = SingleFlight(name="test_errors")
+
+    async def work(is_abandoned) -> None:
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(*[flights.run("key", work) for _ in range(3)], return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flights.in_flight() == 0
+
+
+@pytest.mark.skipif(single_flight_skip_coalescing, reason="The flag 'single_flight_skip_coalescing' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_single_flight_cancellation():
+    """Test that a cancelled caller leaves the work to the others, and that the last one leaving cancels it."""
+    flights = SingleFlight(name="test_cancel")
+    release = asyncio.Event()
+    cancelled = []
+
+    async def work(is_abandoned) -> str:
+        try:
+            await release.wait()
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+        return "done"
+
+    first = asyncio.create_task(flights.run("key", work))
+    second = asyncio.create_task(flights.run("key", work))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    await asyncio.sleep(0.01)
+    assert first.cancelled() and not cancelled
+
+    release.set()
+    assert await second == "done"
+
+    release.clear()
+    third = asyncio.create_task(flights.run("key", work))
+    await asyncio.sleep(0.01)
+    third.cancel()
+    await asyncio.sleep(0.01)
+    assert third.cancelled() and cancelled == [1]
+    assert flights.in_flight() == 0
+
+
+@pytest.mark.skipif(single_flight_skip_coalescing, reason="The flag 'single_flight_skip_coalescing' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_single_flight_abandoned_once_every_caller_disconnected():
+    """Test that the work is told to give up only when every caller with a check has disconnected."""
+    flights = SingleFlight(name="test_abandoned")
+    disconnected = {"first": False, "second": False}
+    checks = []
+    release = asyncio.Event()
+
+    async def work(is_abandoned) -> None:
+        await release.wait()
+        checks.append(await is_abandoned())
+        disconnected["second"] = True
+        checks.append(await is_abandoned())
+
+    async def first_check() -> bool:
+        return disconnected["first"]
+
+    async def second_check() -> bool:
+        return disconnected["second"]
+
+    calls = [
+        asyncio.create_task(flights.run("key", work, is_disconnected=first_check)),
+        asyncio.create_task(flights.run("key", work, is_disconnected=second_check)),
+    ]
+    await asyncio.sleep(0.01)
+    disconnected["first"] = True
+    release.set()
+    await asyncio.gather(*calls)
+    assert checks == [False, True]
+# ----------------------------SINGLE FLIGHT----------------------------------------------------
@@ -0,0 +1,69 @@
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from src.thirdweb.analytic.sketch import CountMinSketch, HyperLogLog
+from tests.unit_tests.conftest import analytic_skip_sketches
+
+
+# ----------------------------SKETCHES----------------------------------------------------
+@pytest.mark.skipif(analytic_skip_sketches, reason="The flag 'analytic_skip_sketches' is active!")
+def test_count_min_within_error_bound():
+    """Test that Count-Min estimates never underestimate and stay within e / width * N of the true counts."""
+    rng = np.random.default_rng(7)
+    words = [f"word{index}" for index in rng.zipf(1.3, size=50_000) if index < 20_000]
+    counts = Counter(words)
+    sketch = CountMinSketch(width=512, depth=4)
+    sketch.add(counts)
+
+    terms = list(counts)
+    errors = sketch.estimate(terms) - np.array([counts[term] for term in terms])
+
+    assert sketch.total == len(words)
+    assert errors.min() >= 0
+    # at most exp(-depth) (2%) of the words may exceed the bound
+    assert np.mean(errors > sketch.error_bound) <= math.exp(-4)
+    assert sketch.error_bound == pytest.approx(math.e / 512 * len(words))
+
+
+@pytest.mark.skipif(analytic_skip_sketches, reason="The flag 'analytic_skip_sketches' is active!")
+def test_count_min_removes_counts():
+    """Test that negative counts undo earlier additions."""
+    sketch = CountMinSketch(width=64, depth=3)
+    sketch.add({"note": 5, "word": 2})
+    sketch.add({"note": -5})
+
+    # only a collision with "word" can keep "note" above zero
+    assert 0 <= sketch.estimate(["note"])[0] <= 2
+    assert sketch.estimate(["word"])[0] >= 2
+    assert sketch.total == 2
+
+
+@pytest.mark.skipif(analytic_skip_sketches, reason="The flag 'analytic_skip_sketches' is active!")
+@pytest.mark.parametrize("distinct", [10, 3_000, 100_000])
+def test_hyperloglog_relative_error(distinct):
+    """Test that HyperLogLog estimates distinct counts within a few standard errors, duplicates aside."""
+    sketch = HyperLogLog(precision=12)
+    terms = [f"term{index}" for index in range(distinct)]
+    sketch.add(terms)
+    sketch.add(terms[: distinct // 2])
+
+    assert abs(sketch.count() - distinct) <= max(1, 4 * sketch.relative_error * distinct)
+
+
+@pytest.mark.skipif(analytic_skip_sketches, reason="The flag 'analytic_skip_sketches' is active!")
+def test_hyperloglog_ranks_merge_like_add():
+    """Test that register updates computed separately give the same registers as adding the words."""
+    terms = [f"term{index}" for index in range(500)]
+    added = HyperLogLog(precision=8)
+    added.add(terms)
+
+    merged = HyperLogLog(precision=8)
+    for batch in (terms[:200], terms[200:]):
+        indices, ranks = merged.ranks(batch)
+        merged.registers[indices] = np.maximum(merged.registers[indices], ranks)
+
+    assert np.array_equal(added.registers, merged.registers)
+# ----------------------------SKETCHES----------------------------------------------------
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from src.thirdweb.openai.summarizer import OpenAISummarizer
+from src.thirdweb.openai.utils import PromptUtils
+from tests.unit_tests.conftest import summarizer_skip_split_chunks, summarizer_skip_map_reduce
+
+
+class FakeAIService:
+    """Stands in for OpenAIService, echoing the summarized text back and tracking concurrency."""
+
+    def __init__(self, fail_on: str = None):
+        self.fail_on = fail_on
+        self.prompts = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def fetch_data(self, user_prompt: str):
+        self.prompts.append(user_prompt)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+
+        if self.fail_on and self.fail_on in user_prompt:
+            return None
+        return f"summary of [{user_prompt.split('TEXT: ')[-1]}]"
+
+
+# ----------------------------SPLIT INTO CHUNKS----------------------------------------------------
+@pytest.mark.skipif(summarizer_skip_split_chunks, reason="The flag 'summarizer_skip_split_chunks' is active!")
+@pytest.mark.parametrize(
+    "text, max_words, expected_chunks",
+    [
+        ("One two. Three four.", 10, ["One two. Three four."]),
+        ("One two. Three four. Five six.", 4, ["One two. Three four.", "Five six."]),
+        ("One two three four five. Six.", 2, ["One two", "three four", "five. Six."]),
+        ("   ", 5, []),
+    ]
+)
+def test_split_into_chunks(text, max_words, expected_chunks):
+    """Test that 'split_into_chunks' cuts at sentence boundaries and never exceeds the word limit."""
+    chunks = PromptUtils.split_into_chunks(text=text, max_words=max_words)
+
+    assert chunks == expected_chunks
+    assert all(len(chunk.split()) <= max_words for chunk in chunks)
+# ----------------------------SPLIT INTO CHUNKS----------------------------------------------------
+
+
+# ----------------------------MAP REDUCE----------------------------------------------------
+@pytest.mark.skipif(summarizer_skip_map_reduce, reason="The flag 'summarizer_skip_map_reduce' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_summarize_single_chunk():
+    """Test that short content is summarized with a single call."""
+    service = FakeAIService()
+    summarizer = OpenAISummarizer(service=service, chunk_words=10)
+
+    assert await summarizer.summarize("Short note.") == "summary of [Short note.]"
+    assert len(service.prompts) == 1
+
+
+@pytest.mark.skipif(summarizer_skip_map_reduce, reason="The flag 'summarizer_skip_map_reduce' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_summarize_chunks_in_parallel():
+    """Test that long content is summarized chunk by chunk with bounded parallelism and merged in order."""
+    service = FakeAIService()
+    summarizer = OpenAISummarizer(service=service, chunk_words=2, max_parallel=2)
+
+    result = await summarizer.summarize("A b. C d. E f. G h.")
+
+    assert result == "summary of [A b.]\n\nsummary of [C d.]\n\nsummary of [E f.]\n\nsummary of [G h.]"
+    assert service.peak == 2
+
+
+@pytest.mark.skipif(summarizer_skip_map_reduce, reason="The flag 'summarizer_skip_map_reduce' is active!")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_summarize_merge_with_model():
+    """Test that partial summaries are merged by the model when enabled, and that a failed chunk fails the whole."""
+    service = FakeAIService()
+    summarizer = OpenAISummarizer(service=service, chunk_words=2, merge_with_model=True)
+
+    await summarizer.summarize("A b. C d.")
+    assert len(service.prompts) == 3
+    assert "PART 2: summary of [C d.]" in service.prompts[-1]
+
+    failing = OpenAISummarizer(service=FakeAIService(fail_on="C d."), chunk_words=2)
+    assert await failing.summarize("A b. C d.") is None
+# ----------------------------MAP REDUCE----------------------------------------------------